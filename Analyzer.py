@@ -0,0 +1,420 @@
+import json
+import math
+import time
+from collections import deque
+
+from Entropy import LOWER, UPPER, DIGIT, SYMBOL, ALLSET
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except Exception:
+    HAS_NUMPY = False
+
+# ----------------------------
+# Streaming entropy-quality analyzer
+#
+# Sensor side: the low SYMBOL_BITS bits of each channel (ax, ay, az, sl)
+# form one symbol stream per channel. Every HOP new symbols the last
+# WINDOW symbols are scored with the SP 800-90B min-entropy estimators:
+#   most-common-value  on the k-bit symbols            (6.3.1)
+#   collision, Markov  on the bit expansion, x k        (6.3.2, 6.3.3)
+# and the channel estimate is the minimum of the three, in bits/symbol.
+# With numpy every pending window is scored at once from prefix sums;
+# without it only the newest window is scored.
+#
+# Password side: character counts are tested against the distribution
+# the generator policy implies (one forced char per class, rest uniform
+# over ALLSET, shuffled) with a chi-square test, and per-position class
+# counts are tested the same way to catch shuffle or position bias.
+# ----------------------------
+CHANNELS = ("ax", "ay", "az", "sl")
+SYMBOL_BITS = 4
+WINDOW = 4096
+HOP = 256
+TREND_N = 240
+PW_WINDOW = 5000
+MAX_POS = 24
+Z_99 = 2.576                    # upper 99% bound used throughout 90B
+MARKOV_LEN = 128
+H_WARN = 0.5                    # bits/symbol below which a channel is flagged
+P_FAIL = 0.001
+
+CLASSES = (LOWER, UPPER, DIGIT, SYMBOL)
+CHAR_INDEX = {ch: i for i, ch in enumerate(ALLSET)}
+CHAR_CLASS = [next(k for k, cls in enumerate(CLASSES) if ch in cls) for ch in ALLSET]
+
+
+# ----------------------------
+# Estimators (scalar forms; the numpy path mirrors them on arrays)
+# ----------------------------
+def h_mcv(max_count, n):
+    p = max_count / n
+    pu = min(1.0, p + Z_99 * math.sqrt(p * (1.0 - p) / (n - 1)))
+    return -math.log2(pu)
+
+
+def _collision_p(mean, std, v):
+    # Binary collision times are 2 or 3 with E[t] = 2 + 2p(1-p).
+    x = mean - Z_99 * std / math.sqrt(v)
+    pq = (x - 2.0) / 2.0
+    if pq >= 0.25:
+        return 0.5
+    return min(1.0, 0.5 + math.sqrt(0.25 - max(pq, -0.25)))
+
+
+def h_collision(times):
+    v = len(times)
+    if v < 2:
+        return 1.0
+    mean = sum(times) / v
+    std = math.sqrt(sum((t - mean) ** 2 for t in times) / (v - 1))
+    return -math.log2(_collision_p(mean, std, v))
+
+
+def _log2(x):
+    return math.log2(x) if x > 0 else -math.inf
+
+
+def h_markov(n0, n1, c00, c01, c10, c11):
+    n = n0 + n1
+    p0, p1 = n0 / n, n1 / n
+    p00 = c00 / (c00 + c01) if c00 + c01 else 0.0
+    p01 = 1.0 - p00 if c00 + c01 else 0.0
+    p10 = c10 / (c10 + c11) if c10 + c11 else 0.0
+    p11 = 1.0 - p10 if c10 + c11 else 0.0
+    m = MARKOV_LEN
+    L = _log2
+    best = max(
+        L(p0) + (m - 1) * L(p00),
+        L(p0) + m // 2 * L(p01) + (m // 2 - 1) * L(p10),
+        L(p0) + L(p01) + (m - 2) * L(p11),
+        L(p1) + L(p10) + (m - 2) * L(p00),
+        L(p1) + m // 2 * L(p10) + (m // 2 - 1) * L(p01),
+        L(p1) + (m - 1) * L(p11),
+    )
+    return min(1.0, -best / m)
+
+
+def collision_times(bits):
+    out = []
+    i = 0
+    n = len(bits)
+    while i + 1 < n:
+        if bits[i] == bits[i + 1]:
+            out.append(2)
+            i += 2
+        elif i + 2 < n:
+            out.append(3)
+            i += 3
+        else:
+            break
+    return out
+
+
+def chi2_sf(x, df):
+    # Wilson-Hilferty approximation of the chi-square survival function.
+    if df <= 0:
+        return 1.0
+    if x <= 0:
+        return 1.0
+    k = 2.0 / (9.0 * df)
+    z = ((x / df) ** (1.0 / 3.0) - (1.0 - k)) / math.sqrt(k)
+    return 0.5 * math.erfc(z / math.sqrt(2.0))
+
+
+def chi2(observed, expected):
+    stat = 0.0
+    df = -1
+    for o, e in zip(observed, expected):
+        if e > 0:
+            stat += (o - e) * (o - e) / e
+            df += 1
+    return stat, df, chi2_sf(stat, df)
+
+
+# ----------------------------
+# numpy window scoring
+# ----------------------------
+def _np_collision_events(bits):
+    # Collision chain over the whole buffer, vectorized by pointer doubling:
+    # f(i) = i + t(i) is a jump table and the orbit of 0 is built 2^k hops
+    # at a time. Returns (start positions, times).
+    n = len(bits)
+    if n < 3:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64)
+    eq = bits[:-1] == bits[1:]
+    step = np.where(eq, 2, 3)
+    f = np.empty(n + 1, np.int64)
+    f[:n - 1] = np.minimum(np.arange(n - 1) + step, n)
+    f[n - 1] = n
+    f[n] = n
+    orbit = np.zeros(1, np.int64)
+    jump = f
+    while orbit[-1] < n:
+        orbit = np.concatenate((orbit, jump[orbit]))
+        jump = jump[jump]
+    orbit = orbit[orbit < n - 1]
+    t = step[orbit]
+    keep = orbit + t <= n
+    return orbit[keep], t[keep]
+
+
+def _np_score(sym, ends, window, bits_per):
+    # sym: uint8 symbols; ends: window end indices into sym (exclusive).
+    m = 1 << bits_per
+    starts = ends - window
+    onehot = np.zeros((len(sym) + 1, m), np.int32)
+    onehot[np.arange(1, len(sym) + 1), sym] = 1
+    cum = np.cumsum(onehot, axis=0)
+    counts = cum[ends] - cum[starts]
+    p = counts.max(axis=1) / window
+    pu = np.minimum(1.0, p + Z_99 * np.sqrt(p * (1.0 - p) / (window - 1)))
+    mcv = -np.log2(pu)
+
+    shifts = np.arange(bits_per - 1, -1, -1, dtype=np.uint8)
+    bits = ((sym[:, None] >> shifts) & 1).astype(np.int8).ravel()
+    b0, b1 = starts * bits_per, ends * bits_per
+    nb = window * bits_per
+
+    # Markov: initial and transition counts from prefix sums.
+    ones = np.concatenate(([0], np.cumsum(bits)))
+    n1 = ones[b1] - ones[b0]
+    n0 = nb - n1
+    pair = bits[:-1] * 2 + bits[1:]
+    tc = np.zeros((len(pair) + 1, 4), np.int32)
+    tc[np.arange(1, len(pair) + 1), pair] = 1
+    tc = np.cumsum(tc, axis=0)
+    c = tc[b1 - 1] - tc[b0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r0 = c[:, 0] + c[:, 1]
+        r1 = c[:, 2] + c[:, 3]
+        p00 = np.where(r0 > 0, c[:, 0] / np.maximum(r0, 1), 0.0)
+        p01 = np.where(r0 > 0, 1.0 - p00, 0.0)
+        p10 = np.where(r1 > 0, c[:, 2] / np.maximum(r1, 1), 0.0)
+        p11 = np.where(r1 > 0, 1.0 - p10, 0.0)
+        L = np.log2
+        lp0, lp1 = L(n0 / nb), L(n1 / nb)
+        k = MARKOV_LEN
+        cand = np.stack((
+            lp0 + (k - 1) * L(p00),
+            lp0 + k // 2 * L(p01) + (k // 2 - 1) * L(p10),
+            lp0 + L(p01) + (k - 2) * L(p11),
+            lp1 + L(p10) + (k - 2) * L(p00),
+            lp1 + k // 2 * L(p10) + (k // 2 - 1) * L(p01),
+            lp1 + (k - 1) * L(p11),
+        ))
+    cand = np.nan_to_num(cand, nan=-np.inf)
+    markov = np.minimum(1.0, -cand.max(axis=0) / k)
+
+    # Collision: one chain over the buffer, windowed by event start.
+    pos, t = _np_collision_events(bits)
+    ct = np.concatenate(([0], np.cumsum(t)))
+    ct2 = np.concatenate(([0], np.cumsum(t * t)))
+    lo = np.searchsorted(pos, b0)
+    hi = np.searchsorted(pos, b1 - 2)
+    v = np.maximum(hi - lo, 2)
+    s = ct[hi] - ct[lo]
+    s2 = ct2[hi] - ct2[lo]
+    mean = s / v
+    std = np.sqrt(np.maximum(0.0, (s2 - v * mean * mean) / (v - 1)))
+    x = mean - Z_99 * std / np.sqrt(v)
+    pq = (x - 2.0) / 2.0
+    pc = np.where(pq >= 0.25, 0.5, np.minimum(1.0, 0.5 + np.sqrt(np.maximum(0.0, 0.25 - np.maximum(pq, -0.25)))))
+    coll = -np.log2(pc)
+
+    return mcv, coll * bits_per, markov * bits_per
+
+
+class EntropyAnalyzer:
+    def __init__(self, window=WINDOW, hop=HOP, bits=SYMBOL_BITS):
+        self.window = window
+        self.hop = hop
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        self.buf = {ch: [] for ch in CHANNELS}
+        self.base = 0                       # absolute index of buf[...][0]
+        self.scored = window - hop          # absolute end of the last scored window
+        self.symbols = 0
+        self.latest = {}
+        self.trend = deque(maxlen=TREND_N)  # (symbols, min H per channel...)
+        self.elapsed_s = 0.0
+
+        self.pw_window = deque()
+        self.pw_total = 0
+        self.char_obs = [0] * len(ALLSET)
+        self.char_exp = [0.0] * len(ALLSET)
+        self.foreign = 0
+        self.pos_obs = [[0] * len(CLASSES) for _ in range(MAX_POS)]
+        self.pos_exp = [[0.0] * len(CLASSES) for _ in range(MAX_POS)]
+
+    # -- input --
+    def add_samples(self, samples):
+        m = self.mask
+        b = self.buf
+        ax, ay, az, sl = b["ax"], b["ay"], b["az"], b["sl"]
+        for s in samples:
+            ax.append(s[1] & m)
+            ay.append(s[2] & m)
+            az.append(s[3] & m)
+            sl.append(s[4] & m)
+        self.symbols += len(samples)
+
+    def _pw_terms(self, pw):
+        # Per-char expected contributions for one password of this length.
+        n = len(pw)
+        fill = max(0, n - len(CLASSES)) / len(ALLSET)
+        forced = [1.0 / len(cls) for cls in CLASSES]
+        cls_p = [(1.0 + fill * len(cls)) / n for cls in CLASSES]
+        return fill, forced, cls_p
+
+    def _apply_pw(self, pw, sign):
+        fill, forced, cls_p = self._pw_terms(pw)
+        exp = self.char_exp
+        for i in range(len(ALLSET)):
+            exp[i] += sign * (forced[CHAR_CLASS[i]] + fill)
+        for p, ch in enumerate(pw[:MAX_POS]):
+            i = CHAR_INDEX.get(ch)
+            if i is None:
+                self.foreign += sign
+                continue
+            self.char_obs[i] += sign
+            self.pos_obs[p][CHAR_CLASS[i]] += sign
+            pe = self.pos_exp[p]
+            for k in range(len(CLASSES)):
+                pe[k] += sign * cls_p[k]
+
+    def add_password(self, pw):
+        if len(pw) < len(CLASSES):
+            return
+        self._apply_pw(pw, 1)
+        self.pw_window.append(pw)
+        self.pw_total += 1
+        if len(self.pw_window) > PW_WINDOW:
+            self._apply_pw(self.pw_window.popleft(), -1)
+
+    def add_passwords(self, pws):
+        for pw in pws:
+            self.add_password(pw)
+
+    # -- scoring --
+    def update(self):
+        t0 = time.perf_counter()
+        end = self.base + len(self.buf["ax"])
+        if end < self.scored + self.hop and self.latest:
+            return False
+        if end < self.window:
+            return False
+        # After a burst (fast replay) only the newest TREND_N windows matter.
+        ends = list(range(self.scored + self.hop, end + 1, self.hop))[-TREND_N:]
+        if HAS_NUMPY:
+            lo = ends[0] - self.window - self.base
+            hi = ends[-1] - self.base
+            rel = np.array(ends, np.int64) - self.base - lo
+            cols = [_np_score(np.asarray(self.buf[ch][lo:hi], np.uint8), rel, self.window, self.bits)
+                    for ch in CHANNELS]
+            for j, e in enumerate(ends):
+                row = {}
+                for ch, (mcv, coll, mk) in zip(CHANNELS, cols):
+                    row[ch] = (float(mcv[j]), float(coll[j]), float(mk[j]))
+                self._record(e, row)
+        else:
+            e = ends[-1]
+            row = {ch: self._py_score(self.buf[ch][e - self.base - self.window:e - self.base])
+                   for ch in CHANNELS}
+            self._record(e, row)
+        self.scored = ends[-1]
+        # Keep exactly one window of history behind the next hop.
+        drop = self.scored + self.hop - self.window - self.base
+        if drop > 0:
+            for ch in CHANNELS:
+                del self.buf[ch][:drop]
+            self.base += drop
+        self.elapsed_s = time.perf_counter() - t0
+        return True
+
+    def _py_score(self, sym):
+        n = len(sym)
+        counts = [0] * (1 << self.bits)
+        for v in sym:
+            counts[v] += 1
+        bits = []
+        for v in sym:
+            for k in range(self.bits - 1, -1, -1):
+                bits.append((v >> k) & 1)
+        n1 = sum(bits)
+        c = [0, 0, 0, 0]
+        for a, b in zip(bits, bits[1:]):
+            c[a * 2 + b] += 1
+        return (h_mcv(max(counts), n),
+                h_collision(collision_times(bits)) * self.bits,
+                h_markov(len(bits) - n1, n1, *c) * self.bits)
+
+    def _record(self, end, row):
+        self.latest = {}
+        for ch, r in row.items():
+            r = [max(0.0, h) for h in r]
+            self.latest[ch] = {"mcv": r[0], "collision": r[1], "markov": r[2], "min": min(r)}
+        self.trend.append((end,) + tuple(self.latest[ch]["min"] for ch in CHANNELS))
+
+    # -- results --
+    def sensor_bits(self):
+        # Credited min-entropy per telemetry sample, summed over channels.
+        return sum(v["min"] for v in self.latest.values())
+
+    def password_stats(self):
+        if not self.pw_window:
+            return None
+        stat, df, p = chi2(self.char_obs, self.char_exp)
+        worst = (None, 1.0)
+        tested = 0
+        for pos in range(MAX_POS):
+            exp = self.pos_exp[pos]
+            if min(exp) < 5.0:
+                continue
+            _, _, pp = chi2(self.pos_obs[pos], exp)
+            tested += 1
+            if pp < worst[1]:
+                worst = (pos, pp)
+        return {
+            "passwords": len(self.pw_window),
+            "total": self.pw_total,
+            "chi2": stat,
+            "df": df,
+            "p": p,
+            "foreign_chars": self.foreign,
+            "positions_tested": tested,
+            "worst_position": worst[0],
+            "worst_position_p": worst[1],
+        }
+
+    def health(self):
+        # "OK", "LOW" (a sensor channel under H_WARN) or "FAIL" (password bias).
+        pw = self.password_stats()
+        if pw:
+            npos = max(1, pw["positions_tested"])
+            if pw["p"] < P_FAIL or pw["worst_position_p"] < P_FAIL / npos or pw["foreign_chars"]:
+                return "FAIL"
+        if self.latest and min(v["min"] for v in self.latest.values()) < H_WARN:
+            return "LOW"
+        return "OK"
+
+    def report(self):
+        return {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "health": self.health(),
+            "sensor": {
+                "symbol_bits": self.bits,
+                "window": self.window,
+                "hop": self.hop,
+                "symbols_seen": self.symbols,
+                "channels": self.latest,
+                "bits_per_sample": self.sensor_bits(),
+                "trend": [dict(zip(("end",) + CHANNELS, row)) for row in self.trend],
+            },
+            "passwords": self.password_stats(),
+        }
+
+    def export(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
@@ -0,0 +1,302 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+import Client
+from Protocol import StreamDecoder, pack_samples
+from Telemetry import HAS_NUMPY
+
+# ----------------------------
+# Benchmarks for the client hot paths. Results go to stdout (or --out)
+# as one JSON document so runs can be diffed between releases.
+#
+#   python Bench.py                         # everything
+#   python Bench.py --only parse,strength   # subset
+#   xvfb-run python Bench.py --only draw    # draw needs a display
+# ----------------------------
+
+DRAW_SIZES = ("640x400", "980x560", "1600x900", "2560x1440")
+
+
+def summarize(samples_s):
+    xs = sorted(samples_s)
+    n = len(xs)
+    if not n:
+        return {"n": 0}
+
+    def pct(p):
+        return xs[min(n - 1, int(p * n))] * 1000.0
+
+    return {
+        "n": n,
+        "mean_ms": statistics.fmean(xs) * 1000.0,
+        "p50_ms": pct(0.50),
+        "p90_ms": pct(0.90),
+        "p99_ms": pct(0.99),
+        "max_ms": xs[-1] * 1000.0,
+    }
+
+
+def fake_samples(n, t0=0, dt=20, seed=1):
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        out.append((t0 + i * dt, rng.randint(-2048, 2047), rng.randint(-2048, 2047),
+                    rng.randint(-2048, 2047), rng.randint(0, 255)))
+    return out
+
+
+class _HeadlessApp(Client.App):
+    # App.init_state() without the Tk widgets, for consume_serial_queue.
+    def __init__(self):
+        self.init_state(queue_max=1 << 30)
+        self.len_var = None
+        self.words_var = None
+        self.build_metrics()
+
+    def set_state(self, st):
+        self.gen_state = st
+
+    def animate_password(self, pw, list_size=None):
+        self.last_pw = pw
+
+
+# ----------------------------
+# 1. Telemetry parse throughput
+# ----------------------------
+def bench_parse(n=200000, batch=8, chunk=4096):
+    samples = fake_samples(n)
+    text = "".join(f"S:{t},{ax},{ay},{az},{sl}\n" for t, ax, ay, az, sl in samples).encode()
+    binary = b"".join(pack_samples(samples[i:i + batch]) for i in range(0, n, batch))
+    results = {}
+    for name, stream in (("text", text), ("binary", binary)):
+        app = _HeadlessApp()
+        dec = StreamDecoder()
+        t0 = time.perf_counter()
+        for i in range(0, len(stream), chunk):
+            app.q.put_batch(dec.feed(stream[i:i + chunk]))
+        t1 = time.perf_counter()
+        app.consume_serial_queue()
+        t2 = time.perf_counter()
+        results[name] = {
+            "samples": app.tele.total,
+            "bytes": len(stream),
+            "decode_s": t1 - t0,
+            "consume_s": t2 - t1,
+            "samples_per_s": n / (t2 - t0),
+            "mb_per_s": len(stream) / (t2 - t0) / 1e6,
+        }
+    return results
+
+
+# ----------------------------
+# 2. Frame time of App.draw at several window sizes
+# ----------------------------
+def bench_draw(frames=300, sizes=DRAW_SIZES):
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        return {"skipped": f"no display ({e})"}
+    root.withdraw()
+    app = Client.App(root, transport=_NullPort())
+    root.deiconify()
+    results = {}
+    samples = fake_samples(frames * 4)
+    states = ("IDLE", "PRE", "GEN", "POST")
+    try:
+        for size in sizes:
+            root.geometry(size)
+            root.update()
+            app.draw()
+            times = []
+            for f in range(frames):
+                app.q.put_batch([samples[f * 4:f * 4 + 4]])
+                if f % 60 == 0:
+                    app.q.put_batch([f"EV:{states[(f // 60) % 4]}"])
+                app.consume_serial_queue()
+                t0 = time.perf_counter()
+                app.draw()
+                root.update_idletasks()
+                times.append(time.perf_counter() - t0)
+            results[size] = summarize(times)
+    finally:
+        root.destroy()
+    return results
+
+
+class _NullPort:
+    port = "bench"
+    in_waiting = 0
+
+    def read(self, n=1):
+        time.sleep(0.5)
+        return b""
+
+    def readinto(self, b):
+        time.sleep(0.5)
+        return 0
+
+    def write(self, data):
+        return len(data)
+
+    def close(self):
+        pass
+
+
+# ----------------------------
+# 3. Strength scoring throughput, per password and batched
+# ----------------------------
+def bench_strength(n=200000, seed=2):
+    from Strength import strength_batch
+    rng = random.Random(seed)
+    alphabet = Client.ANIM_CHARSET
+    pws = ["".join(rng.choice(alphabet) for _ in range(rng.randint(6, 32))) for _ in range(n)]
+    t0 = time.perf_counter()
+    for pw in pws:
+        Client.evaluate_strength(pw)
+    t1 = time.perf_counter()
+    strength_batch(pws)
+    t2 = time.perf_counter()
+    return {
+        "passwords": n,
+        "single": {"total_s": t1 - t0, "per_s": n / (t1 - t0)},
+        "batch": {"total_s": t2 - t1, "per_s": n / (t2 - t1)},
+    }
+
+
+# ----------------------------
+# 4. GEN -> PW: round trip against the emulated firmware on a pty
+# ----------------------------
+def bench_latency(rounds=30, speed=0.0):
+    if os.name != "posix":
+        return {"skipped": "pty transport needs POSIX"}
+    from Emulator import DeviceEmulator
+    from Transport import PtyEnd, open_serial
+    pty = PtyEnd()
+    emu = DeviceEmulator(pty, speed=speed).start()
+    ser = open_serial(pty.port, timeout=0.05)
+    dec = StreamDecoder()
+    times = []
+    timeouts = 0
+    try:
+        ser.write(b"TELEM:OFF\n")
+        time.sleep(0.2)
+        ser.reset_input_buffer()
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            ser.write(b"GEN\n")
+            got = False
+            while time.perf_counter() - t0 < 10.0:
+                for item in dec.feed(ser.read(ser.in_waiting or 1)):
+                    if isinstance(item, str) and item.startswith("PW:"):
+                        got = True
+                if got:
+                    break
+            if got:
+                times.append(time.perf_counter() - t0)
+            else:
+                timeouts += 1
+    finally:
+        ser.close()
+        emu.stop()
+        pty.close()
+    out = summarize(times)
+    out["device_speed"] = speed
+    out["timeouts"] = timeouts
+    return out
+
+
+# ----------------------------
+# 5. Replay of a recorded log through consume_serial_queue, max speed
+# ----------------------------
+def bench_replay(path=None, n=200000, batch=8):
+    import tempfile
+    from Recorder import Player, Recorder
+    tmp = None
+    if path is None:
+        # Synthesize a log: binary frames with a GEN cycle every 500 samples.
+        tmp = tempfile.mkdtemp()
+        path = os.path.join(tmp, "bench.mbrec")
+        rec = Recorder(path)
+        samples = fake_samples(n)
+        for i in range(0, n, batch):
+            items = [samples[i:i + batch]]
+            if i % 500 == 0:
+                items += ["EV:PRE", "EV:GEN", "PW:Ab3$efgh1234", "EV:POST", "EV:IDLE"]
+            rec.write_items(items)
+        rec.close()
+    app = _HeadlessApp()
+    player = Player(path, speed=0)
+    ticks = 0
+    t0 = time.perf_counter()
+    while not player.done:
+        player.pump(app.q)
+        app.consume_serial_queue()
+        ticks += 1
+    dt = time.perf_counter() - t0
+    size = player.log.size
+    player.close()
+    if tmp:
+        for f in os.listdir(tmp):
+            os.remove(os.path.join(tmp, f))
+        os.rmdir(tmp)
+    return {"samples": app.tele.total, "bytes": size, "ticks": ticks, "total_s": dt,
+            "samples_per_s": app.tele.total / dt if dt else 0.0}
+
+
+BENCHES = {
+    "parse": bench_parse,
+    "draw": bench_draw,
+    "strength": bench_strength,
+    "latency": bench_latency,
+    "replay": bench_replay,
+}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Client hot-path benchmarks (JSON output).")
+    ap.add_argument("--only", default=",".join(BENCHES), help="comma-separated subset of: " + ", ".join(BENCHES))
+    ap.add_argument("--out", help="write JSON here instead of stdout")
+    ap.add_argument("--quick", action="store_true", help="smaller workloads for smoke runs")
+    ap.add_argument("--log", help="telemetry log (.mbrec) for the replay benchmark (default: synthetic)")
+    ap.add_argument("--device-speed", type=float, default=0.0,
+                    help="emulator time acceleration for the latency run (1 = real device timing)")
+    args = ap.parse_args()
+
+    kw = {
+        "parse": {"n": 20000} if args.quick else {},
+        "draw": {"frames": 60} if args.quick else {},
+        "strength": {"n": 20000} if args.quick else {},
+        "latency": {"rounds": 5 if args.quick else 30, "speed": args.device_speed},
+        "replay": {"path": args.log, "n": 20000 if args.quick else 200000},
+    }
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "numpy": HAS_NUMPY,
+        },
+        "results": {},
+    }
+    for name in [s.strip() for s in args.only.split(",") if s.strip()]:
+        if name not in BENCHES:
+            ap.error(f"unknown benchmark: {name}")
+        report["results"][name] = BENCHES[name](**kw[name])
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
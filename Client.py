@@ -1,28 +1,47 @@
 import tkinter as tk
 from tkinter import ttk
-import threading
+from tkinter import filedialog
+import argparse
+import csv
+import queue
+import json
+import os
 import time
 import random
-import re
 import math
 from collections import deque
-import queue
-
-import serial
-from serial.tools import list_ports
 
-try:
-    import pyperclip
-    HAS_CLIPBOARD = True
-except Exception:
-    HAS_CLIPBOARD = False
+# Telemetry, Analyzer and Strength pull in NumPy; they, Entropy, Recorder
+# and Wordlist are imported where first used so the window opens first.
+from Protocol import RecordQueue, SampleReconstructor
+from Devices import SerialEngine, PORT_CACHE
+from Metrics import Registry, RateMeter
 
 BAUD = 115200
+BIN_BATCH = 8
+QUEUE_MAX = 2048
 
 ANIM_CHAR_DELAY = 0.06
+ANIM_SPINS = 9
+ANIM_CHARSET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789!@#$%^&*()-_=+[]{};:,.?/"
 FPS_MS = 33
 
-BUF_N = 140
+HISTORY_N = 180000
+ANALYZE_MS = 500
+METRICS_MS = 1000
+LINE_KINDS = ("S", "D", "EV", "PW", "PB", "BE", "ST", "LN", "TM", "SX", "MD")
+STATS_MS = 1000
+
+CHART_SPANS = (("10s", 10000), ("1m", 60000), ("10m", 600000), ("1h", 3600000), ("6h", 21600000))
+CHART_SPAN_MS = 60000
+GEN_MARKS = 64
+MAG_FULL = 2048 * math.sqrt(3)
+
+BULK_MAX = 1000
+WORDS_MIN = 3
+WORDS_MAX = 10
+WORDS_DEFAULT = 6
+HOST_BULK_MAX = 100000
 
 BG_IDLE = "#0b0f1a"
 BG_PRE  = "#101a2a"
@@ -37,49 +56,431 @@ C_AMBER = "#ffaa00"
 C_GRAY  = "#a8b0c0"
 C_WHITE = "#ffffff"
 
-def list_serial_ports():
-    return list(list_ports.comports())
+C_CANVAS = "#070a12"
+C_LED_OFF = "#111827"
+C_BAR_BG = "#0f1525"
+
+STATE_GLOW = {"IDLE": "#0c2b2b", "PRE": "#203a6b", "GEN": "#5a2b8a", "POST": "#1f5a3a"}
+BAR_COLORS = ("#66aaff", "#66ffcc", "#ffaa66")
+C_MAG = "#ff66ff"
+C_MARK = "#ffdd44"
 
-def auto_find_microbit_port():
-    ports = list_serial_ports()
-    for p in ports:
-        text = f"{p.description} {p.manufacturer or ''} {p.hwid}".lower()
-        if "micro:bit" in text or "microbit" in text or "mbed" in text or "bbc" in text:
-            return p.device
-    if len(ports) == 1:
-        return ports[0].device
-    return None
+RAMP_LEVELS = 64
 
 def evaluate_strength(pw):
-    length = len(pw)
-    classes = sum([
-        bool(re.search(r"[a-z]", pw)),
-        bool(re.search(r"[A-Z]", pw)),
-        bool(re.search(r"\d", pw)),
-        bool(re.search(r"[^A-Za-z0-9]", pw))
-    ])
-    if length >= 14 and classes == 4:
-        return "STRONG", "#00ff99"
-    if length >= 12 and classes >= 3:
-        return "GOOD", "#66ff66"
-    if length >= 10 and classes >= 2:
-        return "FAIR", "#ffaa00"
-    return "WEAK", "#ff4444"
+    from Strength import LABEL_COLORS, label as strength_label
+    label = strength_label(pw)
+    return label, LABEL_COLORS[label]
+
+_clipboard = None
+
+
+def copy_to_clipboard(text):
+    # pyperclip is optional and probes the system on import: load it on
+    # the first copy rather than at startup.
+    global _clipboard
+    if _clipboard is None:
+        try:
+            import pyperclip
+            _clipboard = pyperclip.copy
+        except Exception:
+            _clipboard = False
+    if _clipboard:
+        try:
+            _clipboard(text)
+        except Exception:
+            pass
+
 
 def clamp(x, a, b):
     return a if x < a else (b if x > b else x)
 
+def parse_hex(col):
+    col = col.lstrip("#")
+    return int(col[0:2], 16), int(col[2:4], 16), int(col[4:6], 16)
+
+class Palette:
+    # Cached colour ramps: each (color, off_color) pair is expanded once into
+    # a table of RAMP_LEVELS+1 "#rrggbb" strings, so a frame only indexes it.
+    def __init__(self, levels=RAMP_LEVELS):
+        self.levels = levels
+        self.ramps = {}
+
+    def ramp(self, color, off):
+        key = (color, off)
+        table = self.ramps.get(key)
+        if table is None:
+            r0, g0, b0 = parse_hex(color)
+            r1, g1, b1 = parse_hex(off)
+            table = []
+            for i in range(self.levels + 1):
+                t = i / self.levels
+                rr = int(r1 + (r0 - r1) * t)
+                gg = int(g1 + (g0 - g1) * t)
+                bb = int(b1 + (b0 - b1) * t)
+                table.append(f"#{rr:02x}{gg:02x}{bb:02x}")
+            self.ramps[key] = table
+        return table
+
+    def shade(self, color, off, t):
+        return self.ramp(color, off)[int(clamp(t, 0.0, 1.0) * self.levels + 0.5)]
+
+PALETTE = Palette()
+
+def score_batch(pws, list_size=None):
+    # Passphrases (list_size = words in their list) are scored by entropy.
+    from Strength import strength_batch, phrase_batch
+    from Wordlist import SEPARATOR
+    if list_size:
+        return phrase_batch(pws, list_size, SEPARATOR)
+    return strength_batch(pws)
+
+def password_rows(pws, start=0, list_size=None):
+    # (seq, password, strength, bits) rows, scored in one batch.
+    labels, bits = score_batch(pws, list_size)
+    return [(start + i, pw, lab, round(b, 1)) for i, (pw, lab, b) in enumerate(zip(pws, labels, bits))]
+
+def export_passwords(path, rows):
+    # rows: (seq, password, strength, bits) tuples. Format follows the
+    # extension: .jsonl -> one JSON object per line, anything else -> CSV.
+    if os.path.splitext(path)[1].lower() == ".jsonl":
+        with open(path, "w", encoding="utf-8") as f:
+            for seq, pw, label, bits in rows:
+                f.write(json.dumps({"seq": seq, "password": pw, "strength": label, "bits": bits}) + "\n")
+    else:
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(("seq", "password", "strength", "bits"))
+            w.writerows(rows)
+
+class BulkJob:
+    # Collects the PB:<seq>,<pw> stream of one GEN:<n>[,<len>] request until
+    # the BE:<n> completion marker arrives.
+    def __init__(self, count, length, path=None, on_done=None, list_size=None):
+        self.count = count
+        self.length = length
+        self.list_size = list_size
+        self.path = path
+        self.on_done = on_done
+        self.passwords = {}
+        self.t0 = time.monotonic()
+        self.elapsed = None
+        self.failed = None      # the GEN:<n> status when it never got to BE:
+
+    def command(self):
+        return f"GEN:{self.count},{self.length}"
+
+    def add(self, payload):
+        seq, _, pw = payload.partition(",")
+        try:
+            self.passwords[int(seq)] = pw
+        except ValueError:
+            pass
+
+    def missing(self):
+        return [i for i in range(self.count) if i not in self.passwords]
+
+    def rows(self):
+        items = sorted(self.passwords.items())
+        labels, bits = score_batch([pw for _, pw in items], self.list_size)
+        return [(i, pw, lab, round(b, 1)) for (i, pw), lab, b in zip(items, labels, bits)]
+
+    def finish(self):
+        self.elapsed = time.monotonic() - self.t0
+        if self.path and (self.failed is None or self.passwords):
+            export_passwords(self.path, self.rows())
+        if self.on_done:
+            self.on_done(self)
+
+    def fail(self, reason):
+        self.failed = reason
+        self.finish()
+
+class RevealAnimator:
+    # Slot-machine reveal driven by root.after on the Tk thread. Progress is
+    # derived from elapsed time, so each frame costs one label update however
+    # far behind the loop is. start() supersedes a running reveal.
+    def __init__(self, root, label, frame_ms=FPS_MS):
+        self.root = root
+        self.label = label
+        self.frame_ms = frame_ms
+        self.speed = 1.0
+        self.job = None
+        self.pw = ""
+        self.on_done = None
+
+    def start(self, pw, on_done=None):
+        self.cancel()
+        self.pw = pw
+        self.on_done = on_done
+        self.speed = 1.0
+        self.t0 = time.monotonic()
+        self.elapsed = 0.0
+        self.label.config(text="")
+        self.job = self.root.after(self.frame_ms, self.step)
+
+    def cancel(self):
+        if self.job is not None:
+            self.root.after_cancel(self.job)
+            self.job = None
+
+    def running(self):
+        return self.job is not None
+
+    def faster(self, factor=4.0):
+        self.set_speed(self.speed * factor)
+
+    def set_speed(self, speed):
+        now = time.monotonic()
+        if self.running():
+            self.elapsed += (now - self.t0) * self.speed
+        self.t0 = now
+        self.speed = max(0.1, speed)
+
+    def skip(self):
+        if self.running():
+            self.cancel()
+            self.finish()
+
+    def step(self):
+        self.job = None
+        pw = self.pw
+        elapsed = self.elapsed + (time.monotonic() - self.t0) * self.speed
+        spins = int(elapsed / ANIM_CHAR_DELAY)
+        i = spins // ANIM_SPINS
+        if i >= len(pw):
+            self.finish()
+            return
+        shown = pw[:i] + random.choice(ANIM_CHARSET) + " " * (len(pw) - i - 1)
+        self.label.config(text=shown)
+        self.job = self.root.after(self.frame_ms, self.step)
+
+    def finish(self):
+        self.label.config(text=self.pw)
+        if self.on_done:
+            self.on_done(self.pw)
+
+class DevicesWindow:
+    # Grid of digital twins, one per board attached to a DeviceManager.
+    TWIN_W = 230
+    TWIN_H = 150
+    COLS = 4
+
+    def __init__(self, app, manager):
+        self.app = app
+        self.manager = manager
+        self.win = tk.Toplevel(app.root)
+        self.win.title("Micro:bit devices")
+        self.win.configure(bg=BG_IDLE)
+        self.win.protocol("WM_DELETE_WINDOW", self.close)
+
+        bar = tk.Frame(self.win, bg=BG_IDLE)
+        bar.pack(fill="x", padx=10, pady=8)
+        tk.Button(bar, text="GEN ALL", font=("Consolas", 11, "bold"), bg="#00ffaa", fg="#000000",
+                  command=self.manager.gen_all).pack(side="left", padx=(0,8))
+        tk.Button(bar, text="BULK ALL", font=("Consolas", 11, "bold"), bg="#ffaa00", fg="#000000",
+                  command=self.bulk_all).pack(side="left", padx=(0,8))
+        tk.Button(bar, text="RESCAN", font=("Consolas", 11, "bold"), bg="#6688ff", fg="#000000",
+                  command=self.rescan).pack(side="left")
+        self.summary = tk.Label(bar, text="", font=("Consolas", 10), fg=C_GRAY, bg=BG_IDLE)
+        self.summary.pack(side="right")
+
+        self.canvas = tk.Canvas(self.win, bg=C_CANVAS, highlightthickness=0,
+                                width=self.COLS * self.TWIN_W, height=2 * self.TWIN_H)
+        self.canvas.pack(fill="both", expand=True)
+        self.twins = {}
+        self.bulk_rows = []
+        self.bulk_pending = 0
+        self.job = None
+        self.tick()
+
+    def rescan(self):
+        self.manager.connect_all(exclude=(self.app.port,))
+
+    def bulk_all(self):
+        try:
+            n = int(self.app.bulk_var.get().strip())
+        except Exception:
+            return
+        path = filedialog.asksaveasfilename(
+            parent=self.win, title="Export passwords", defaultextension=".csv",
+            filetypes=(("CSV", "*.csv"), ("JSON Lines", "*.jsonl")))
+        if not path:
+            return
+        self.bulk_path = path
+        self.bulk_rows = []
+        self.bulk_t0 = time.monotonic()
+        self.bulk_pending = self.manager.bulk_all(n, self.app.current_length())
+
+    def close(self):
+        if self.job is not None:
+            self.win.after_cancel(self.job)
+        self.win.destroy()
+        self.app.devices_win = None
+
+    def twin(self, port, index):
+        t = self.twins.get(port)
+        if t is None:
+            c = self.canvas
+            x = (index % self.COLS) * self.TWIN_W + 6
+            y = (index // self.COLS) * self.TWIN_H + 6
+            w = self.TWIN_W - 12
+            h = self.TWIN_H - 12
+            t = {
+                "box": c.create_rectangle(x, y, x+w, y+h, fill="#0e1424", outline="#1e2b44", width=2),
+                "port": c.create_text(x+8, y+14, text=port, font=("Consolas", 10, "bold"), fill=C_CYAN, anchor="w"),
+                "state": c.create_text(x+w-8, y+14, text="", font=("Consolas", 10, "bold"), fill=C_GRAY, anchor="e"),
+                "pw": c.create_text(x+8, y+44, text="", font=("Consolas", 12, "bold"), fill=C_WHITE, anchor="w"),
+                "bar": c.create_rectangle(x+8, y+70, x+8, y+84, fill="#66aaff", outline=""),
+                "stats": c.create_text(x+8, y+h-14, text="", font=("Consolas", 9), fill=C_GRAY, anchor="w"),
+                "geom": (x, y, w, h),
+            }
+            self.twins[port] = t
+        return t
+
+    def tick(self):
+        self.job = None
+        for kind, port, data in drain_events(self.manager.events):
+            if kind == "bulk" and self.bulk_pending:
+                # One event per dispatched share, complete or cut short.
+                pairs, mode = data
+                from Wordlist import DEVICE_WORDS
+                list_size = DEVICE_WORDS if mode == "PHRASE" else None
+                self.bulk_rows.extend(password_rows([pw for _, pw in pairs], len(self.bulk_rows), list_size))
+                self.bulk_pending -= 1
+                if not self.bulk_pending:
+                    rows = self.bulk_rows
+                    export_passwords(self.bulk_path, rows)
+                    dt = time.monotonic() - self.bulk_t0
+                    self.summary.config(text=f"Bulk: {len(rows)} in {dt:.1f}s -> {os.path.basename(self.bulk_path)}")
+            elif kind == "disconnected" and port in self.twins:
+                self.canvas.itemconfigure(self.twins[port]["state"], text="GONE", fill=C_RED)
+
+        c = self.canvas
+        links = self.manager.snapshot()
+        total_pw = 0
+        for i, link in enumerate(sorted(links, key=lambda l: l.port)):
+            t = self.twin(link.port, i)
+            x, y, w, h = t["geom"]
+            glow = STATE_GLOW.get(link.gen_state, STATE_GLOW["IDLE"])
+            c.itemconfigure(t["box"], outline=PALETTE.shade(glow, C_CANVAS, 1.0))
+            c.itemconfigure(t["state"], text=link.gen_state, fill=C_GRAY)
+            c.itemconfigure(t["pw"], text=link.last_pw[:18] or "-")
+            mag = link.tele.last("mag")
+            c.coords(t["bar"], x+8, y+70, x+8 + clamp(mag / 3000.0, 0.0, 1.0) * (w-16), y+84)
+            c.itemconfigure(t["stats"], text=f"len {link.pw_len}  pw {link.passwords}  {link.bytes_in // 1024} KiB")
+            total_pw += link.passwords
+        if not self.bulk_pending:
+            self.summary.config(text=f"{len(links)} device(s), {total_pw} password(s)")
+        self.job = self.win.after(100, self.tick)
+
+class DiagnosticsWindow:
+    # Firmware profile from the device's STATS command (SX: replies), polled
+    # once a second. Each reply covers the time since the previous one.
+    def __init__(self, app):
+        self.app = app
+        self.win = tk.Toplevel(app.root)
+        self.win.title("Micro:bit diagnostics")
+        self.win.configure(bg=BG_IDLE)
+        self.win.protocol("WM_DELETE_WINDOW", self.close)
+        self.text = tk.Label(self.win, text="Waiting for STATS...", font=("Consolas", 11),
+                             fg=C_WHITE, bg=BG_IDLE, justify="left", anchor="nw")
+        self.text.pack(fill="both", expand=True, padx=12, pady=10)
+        self.pending = None
+        self.unsupported = False
+        self.shown = None
+        self.job = None
+        self.tick()
+
+    def close(self):
+        if self.job is not None:
+            self.win.after_cancel(self.job)
+        self.win.destroy()
+        self.app.diag_win = None
+
+    def stats_done(self, req):
+        self.pending = None
+        if req.status == "rejected":
+            self.unsupported = True
+
+    def tick(self):
+        self.job = None
+        if self.unsupported:
+            self.text.config(text="This firmware does not support STATS.")
+            return
+        if self.pending is None:
+            self.pending = self.app.send_line("STATS", self.stats_done)
+        stats = self.app.device_stats
+        if stats is not None and stats is not self.shown:
+            self.shown = stats
+            self.text.config(text=format_device_stats(stats, self.app.telem_cfg["ms"]))
+        self.job = self.win.after(STATS_MS, self.tick)
+
+def parse_device_stats(text):
+    # "ms=..,loops=..,<section>=n/us/max,..." -> {"ms": .., "sections": {name: (n, us, max)}}
+    out = {"sections": {}}
+    for part in text.strip().split(","):
+        key, _, val = part.partition("=")
+        try:
+            if "/" in val:
+                out["sections"][key] = tuple(int(v) for v in val.split("/"))
+            else:
+                out[key] = int(val)
+        except ValueError:
+            pass
+    return out
+
+def format_device_stats(st, telemetry_ms):
+    ms = max(st.get("ms", 0), 1)
+    lines = [
+        f"loop       {st.get('loops', 0) * 1000.0 / ms:6.1f} Hz   ({st.get('loops', 0)} in {ms / 1000.0:.1f} s)",
+        f"telemetry  {st.get('missed', 0)} period(s) missed at {telemetry_ms} ms",
+        f"heap       free {st.get('free', 0) / 1024:.1f} KiB   min {st.get('minfree', 0) / 1024:.1f} KiB"
+        f"   gc {st.get('gcs', 0)}",
+        "",
+        f"{'section':10s} {'calls/s':>8s} {'avg us':>8s} {'max us':>8s} {'busy':>6s}",
+    ]
+    for name, (n, us, mx) in st["sections"].items():
+        avg = us / n if n else 0.0
+        lines.append(f"{name:10s} {n * 1000.0 / ms:8.1f} {avg:8.0f} {mx:8d} {us / (ms * 10.0):5.1f}%")
+    return "\n".join(lines)
+
+def drain_events(q):
+    out = []
+    while True:
+        try:
+            out.append(q.get_nowait())
+        except queue.Empty:
+            return out
+
 class App:
-    def __init__(self, root):
+    def __init__(self, root, transport=None, port=None, play=None, play_speed=1.0, port_cache=PORT_CACHE):
         self.root = root
         self.root.title("Micro:bit Password Tool + Sensor Telemetry (Animated)")
         self.root.geometry("980x560")
         self.root.configure(bg=BG_IDLE)
 
-        self.q = queue.Queue()
+        self.init_state()
+        self.port = port
+        if play:
+            from Recorder import Player
+            self.player = Player(play, play_speed)
+
+        self.build_ui()
+        self.build_metrics()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        if self.player:
+            self.status_lbl.config(text=f"Replay: {os.path.basename(play)}", fg=C_AMBER)
+        else:
+            self.link = SerialEngine(self.q, port=port, transport=transport, baud=BAUD,
+                                     exclude=self.managed_ports, cache=port_cache).start()
+            self.status_lbl.config(text="Searching for micro:bit...", fg=C_AMBER)
+        self.root.after(FPS_MS, self.ui_tick)
 
-        self.ser = None
-        self.port = None
+    def init_state(self, queue_max=QUEUE_MAX):
+        # Everything but the Tk widgets; Bench.py builds a headless App
+        # from this and build_metrics() alone.
+        self.q = RecordQueue(queue_max)
 
         self.gen_state = "IDLE"
         self.state_ts = time.time()
@@ -89,15 +490,31 @@ class App:
         self.az = 0
         self.last_pw = ""
         self.last_strength = ("", C_GRAY)
-
-        self.ax_buf = deque([0]*BUF_N, maxlen=BUF_N)
-        self.ay_buf = deque([0]*BUF_N, maxlen=BUF_N)
-        self.az_buf = deque([0]*BUF_N, maxlen=BUF_N)
-        self.mag_buf = deque([0]*BUF_N, maxlen=BUF_N)
-
-        self.build_ui()
-        self.connect_serial()
-        self.root.after(FPS_MS, self.ui_tick)
+        self.device_label = None
+        self.pw_fresh = False   # EV:GEN seen; the next PW: is a new password
+        self.bulk = None
+
+        self.pool = None        # see entropy_pool()
+        self.hostgen = None
+        self.gen_source = "DEVICE"
+
+        self.tele = None        # see history()
+        self.telem_cfg = {"ms": 120, "th": 0, "kf": 2000, "delta": False}
+        self.recon = SampleReconstructor(120, 0, 2000)
+        self.chart_span = CHART_SPAN_MS
+        self.chart_due = 0.0
+        self.gen_marks = deque(maxlen=GEN_MARKS)
+
+        self.analyzer = None    # see quality()
+        self.analyze_ts = 0.0
+        self.recorder = None
+        self.player = None
+        self.link = None
+        self.device_stats = None
+        self.pw_mode = "CHARS"
+        self.wordlist_path = None   # None: Wordlist.HOST_LIST
+        self.host_words = None
+        self.last_list_size = None
 
     def build_ui(self):
         top = tk.Frame(self.root, bg=BG_IDLE)
@@ -123,6 +540,11 @@ class App:
         self.pw_lbl = tk.Label(left, text="WAITING...", font=("Consolas", 30, "bold"),
                                fg=C_WHITE, bg=BG_IDLE, width=18, anchor="w")
         self.pw_lbl.pack(pady=(6,10), padx=6)
+        self.reveal = RevealAnimator(self.root, self.pw_lbl)
+        self.pw_lbl.bind("<Button-1>", lambda e: self.reveal.skip())
+        self.root.bind("<Escape>", lambda e: self.reveal.skip())
+        self.root.bind("<KeyPress-plus>", lambda e: self.reveal.faster())
+        self.root.bind("<F3>", self.toggle_overlay)
 
         self.str_lbl = tk.Label(left, text="STRENGTH: -", font=("Consolas", 14, "bold"),
                                 fg=C_GRAY, bg=BG_IDLE, anchor="w")
@@ -135,11 +557,33 @@ class App:
                                  bg="#00ffaa", fg="#000000", command=self.send_gen)
         self.gen_btn.pack(fill="x", pady=(0,8))
 
+        self.src_btn = tk.Button(btns, text="Source: DEVICE", font=("Consolas", 12, "bold"),
+                                 bg="#334455", fg=C_WHITE, command=self.toggle_source)
+        self.src_btn.pack(fill="x", pady=(0,8))
+        if self.player:
+            # Replayed sensor data is neither fresh nor secret: no HOST source.
+            self.src_btn.config(state="disabled")
+
         self.telem_on = True
         self.telem_btn = tk.Button(btns, text="Telemetry: ON", font=("Consolas", 12, "bold"),
                                    bg="#334455", fg=C_WHITE, command=self.toggle_telem)
         self.telem_btn.pack(fill="x", pady=(0,8))
 
+        self.telem_bin = False
+        self.bin_btn = tk.Button(btns, text="Framing: TEXT", font=("Consolas", 12, "bold"),
+                                 bg="#334455", fg=C_WHITE, command=self.toggle_bin)
+        self.bin_btn.pack(fill="x", pady=(0,8))
+
+        self.devices = None
+        self.devices_win = None
+        tk.Button(btns, text="DEVICES...", font=("Consolas", 12, "bold"),
+                  bg="#334455", fg=C_WHITE, command=self.open_devices).pack(fill="x", pady=(0,8))
+        tk.Button(btns, text="ENTROPY REPORT...", font=("Consolas", 12, "bold"),
+                  bg="#334455", fg=C_WHITE, command=self.export_quality).pack(fill="x", pady=(0,8))
+        self.diag_win = None
+        tk.Button(btns, text="DIAGNOSTICS...", font=("Consolas", 12, "bold"),
+                  bg="#334455", fg=C_WHITE, command=self.open_diagnostics).pack(fill="x", pady=(0,8))
+
         self.len_var = tk.StringVar(value="12")
         len_row = tk.Frame(btns, bg=BG_IDLE)
         len_row.pack(fill="x")
@@ -151,45 +595,404 @@ class App:
         tk.Button(len_row, text="SET (LEN:)", font=("Consolas", 11, "bold"),
                   bg="#6688ff", fg="#000000", command=self.send_len).pack(side="left", fill="x", expand=True)
 
+        self.words_var = tk.StringVar(value=str(WORDS_DEFAULT))
+        phrase_row = tk.Frame(btns, bg=BG_IDLE)
+        phrase_row.pack(fill="x", pady=(8,0))
+        tk.Label(phrase_row, text="Words:", font=("Consolas", 11, "bold"),
+                 fg=C_GRAY, bg=BG_IDLE).pack(side="left")
+        tk.Entry(phrase_row, textvariable=self.words_var, font=("Consolas", 11),
+                 bg="#0f1525", fg=C_WHITE, insertbackground=C_WHITE, width=6).pack(side="left", padx=(16,8))
+        self.phrase_btn = tk.Button(phrase_row, text="PHRASE (MODE:)", font=("Consolas", 11, "bold"),
+                                    bg="#334455", fg=C_WHITE, command=self.send_phrase)
+        self.phrase_btn.pack(side="left", fill="x", expand=True)
+        tk.Button(phrase_row, text="CHARS", font=("Consolas", 11, "bold"), bg="#334455", fg=C_WHITE,
+                  command=self.send_chars).pack(side="left", padx=(4,0))
+
+        rate_row = tk.Frame(btns, bg=BG_IDLE)
+        rate_row.pack(fill="x", pady=(8,0))
+        tk.Label(rate_row, text="Rate:", font=("Consolas", 11, "bold"),
+                 fg=C_GRAY, bg=BG_IDLE).pack(side="left")
+        self.rate_var = tk.StringVar(value="120")
+        tk.Entry(rate_row, textvariable=self.rate_var, font=("Consolas", 11),
+                 bg="#0f1525", fg=C_WHITE, insertbackground=C_WHITE, width=5).pack(side="left", padx=(16,4))
+        tk.Label(rate_row, text="ms  Δ>", font=("Consolas", 11),
+                 fg=C_GRAY, bg=BG_IDLE).pack(side="left")
+        self.th_var = tk.StringVar(value="0")
+        tk.Entry(rate_row, textvariable=self.th_var, font=("Consolas", 11),
+                 bg="#0f1525", fg=C_WHITE, insertbackground=C_WHITE, width=4).pack(side="left", padx=(4,4))
+        self.delta_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(rate_row, text="D:", variable=self.delta_var, font=("Consolas", 11),
+                       fg=C_GRAY, bg=BG_IDLE, selectcolor="#0f1525",
+                       activebackground=BG_IDLE).pack(side="left")
+        tk.Button(rate_row, text="APPLY", font=("Consolas", 11, "bold"),
+                  bg="#6688ff", fg="#000000", command=self.send_rate).pack(side="left", fill="x", expand=True)
+
+        bulk_row = tk.Frame(btns, bg=BG_IDLE)
+        bulk_row.pack(fill="x", pady=(8,0))
+        tk.Label(bulk_row, text="Bulk:", font=("Consolas", 11, "bold"),
+                 fg=C_GRAY, bg=BG_IDLE).pack(side="left")
+        self.bulk_var = tk.StringVar(value="50")
+        tk.Entry(bulk_row, textvariable=self.bulk_var, font=("Consolas", 11),
+                 bg="#0f1525", fg=C_WHITE, insertbackground=C_WHITE, width=6).pack(side="left", padx=(16,8))
+        tk.Button(bulk_row, text="EXPORT (GEN:n)", font=("Consolas", 11, "bold"),
+                  bg="#ffaa00", fg="#000000", command=self.send_bulk).pack(side="left", fill="x", expand=True)
+
+        rec_row = tk.Frame(btns, bg=BG_IDLE)
+        rec_row.pack(fill="x", pady=(8,0))
+        if self.player:
+            tk.Label(rec_row, text="Replay:", font=("Consolas", 11, "bold"),
+                     fg=C_GRAY, bg=BG_IDLE).pack(side="left")
+            for text, cmd in (("<GEN", lambda: self.seek_gen(-1)), ("GEN>", lambda: self.seek_gen(1)),
+                              ("1x", lambda: self.player.set_speed(1.0)),
+                              ("10x", lambda: self.player.set_speed(10.0)),
+                              ("MAX", lambda: self.player.set_speed(0))):
+                tk.Button(rec_row, text=text, font=("Consolas", 10, "bold"), bg="#6688ff", fg="#000000",
+                          command=cmd).pack(side="left", fill="x", expand=True, padx=(4,0))
+        else:
+            self.redact_var = tk.BooleanVar(value=True)
+            self.rec_btn = tk.Button(rec_row, text="Record: OFF", font=("Consolas", 11, "bold"),
+                                     bg="#334455", fg=C_WHITE, command=self.toggle_record)
+            self.rec_btn.pack(side="left", fill="x", expand=True)
+            tk.Checkbutton(rec_row, text="redact PW", variable=self.redact_var, font=("Consolas", 11),
+                           fg=C_GRAY, bg=BG_IDLE, selectcolor="#0f1525",
+                           activebackground=BG_IDLE).pack(side="left", padx=(8,0))
+
+        hist_row = tk.Frame(btns, bg=BG_IDLE)
+        hist_row.pack(fill="x", pady=(8,0))
+        tk.Label(hist_row, text="History:", font=("Consolas", 11, "bold"),
+                 fg=C_GRAY, bg=BG_IDLE).pack(side="left")
+        for text, span in CHART_SPANS:
+            tk.Button(hist_row, text=text, font=("Consolas", 10, "bold"), bg="#334455", fg=C_WHITE,
+                      command=lambda span=span: self.set_chart_span(span)).pack(side="left", fill="x",
+                                                                            expand=True, padx=(4,0))
+
         tip = ("Use A/B to change length on micro:bit. Press A+B to generate.\n"
-               "This GUI animates sensor changes BEFORE/DURING/AFTER generation.")
+               "This GUI animates sensor changes BEFORE/DURING/AFTER generation.\n"
+               "Click the password or press Esc to skip the reveal, + to speed it up.")
         self.tip_lbl = tk.Label(left, text=tip, font=("Consolas", 10),
                                 fg=C_GRAY, bg=BG_IDLE, justify="left")
         self.tip_lbl.pack(padx=6, pady=14, anchor="w")
 
-        self.canvas = tk.Canvas(right, bg="#070a12", highlightthickness=0)
+        self.canvas = tk.Canvas(right, bg=C_CANVAS, highlightthickness=0)
         self.canvas.pack(fill="both", expand=True)
-
-    def connect_serial(self):
-        self.port = auto_find_microbit_port()
-        if not self.port:
-            ports = list_serial_ports()
-            if not ports:
-                self.status_lbl.config(text="No COM ports found (plug micro:bit)", fg=C_RED)
-                return
-            msg = "Pick COM port: " + ", ".join([p.device for p in ports])
-            self.status_lbl.config(text=msg, fg=C_AMBER)
-            self.port = ports[0].device
-
+        self.scene = None
+        self.scene_size = (0, 0)
+        self.scene_cache = {}
+        self.canvas.bind("<Configure>", self.on_canvas_configure)
+
+    # ----------------------------
+    # Metrics: counters and gauges that read link/queue state lazily, plus
+    # timing histograms fed by ui_tick. F3 toggles the overlay.
+    # ----------------------------
+    def build_metrics(self):
+        m = self.metrics = Registry()
+
+        def link(attr):
+            return lambda: getattr(self.link, attr) if self.link else 0
+
+        def commands(attr):
+            return lambda: getattr(self.link.commands, attr) if self.link else 0
+
+        def reseq(attr):
+            return lambda: getattr(self.link.reseq, attr) if self.link else 0
+
+        def device(key):
+            return lambda: (self.device_stats or {}).get(key, 0)
+
+        self.m_lines = m.counter("lines_total", "Records consumed from the device, by type")
+        self.m_parse_errors = m.counter("parse_errors_total", "S:/D: records that failed to parse")
+        m.counter("queue_dropped_total", "Telemetry items shed by the bounded record queue", lambda: self.q.dropped)
+        m.counter("queue_dropped_samples_total", "Samples inside the shed items", lambda: self.q.dropped_samples)
+        m.counter("bytes_in_total", "Bytes read from the serial link", link("bytes_in"))
+        m.counter("bytes_out_total", "Bytes written to the serial link", link("bytes_out"))
+        m.counter("write_errors_total", "Serial writes that failed", link("write_errors"))
+        m.counter("tx_dropped_total", "Commands dropped while disconnected", link("tx_dropped"))
+        m.counter("frames_total", "Binary telemetry frames decoded", link("frames"))
+        m.counter("bad_frames_total", "Binary frames rejected by the checksum", link("bad_frames"))
+        m.counter("connects_total", "Successful (re)connections", link("connects"))
+        m.counter("bad_lines_total", "Received lines dropped as not valid UTF-8", link("bad_lines"))
+        m.counter("seq_received_total", "Sequenced records received", reseq("received"))
+        m.counter("seq_gaps_total", "Gaps in the record sequence", reseq("gaps"))
+        m.counter("seq_recovered_total", "Missing records recovered with RETX:", reseq("recovered"))
+        m.counter("seq_lost_total", "Records lost for good", reseq("lost"))
+        m.gauge("seq_loss_ratio", "Lost / (received + lost) sequenced records", reseq("loss_rate"))
+        m.gauge("device_mem_free_bytes", "gc.mem_free() on the device at the last STATS", device("free"))
+        m.gauge("device_mem_min_free_bytes", "Lowest gc.mem_free() seen in the last STATS window", device("minfree"))
+        m.gauge("device_missed_periods", "Telemetry periods skipped in the last STATS window", device("missed"))
+        m.gauge("device_section_avg_us", "Average firmware section time in the last STATS window",
+                lambda: {(("section", k),): us / n for k, (n, us, _) in
+                         (self.device_stats or {"sections": {}})["sections"].items() if n})
+        m.counter("command_retries_total", "Commands resent after an ack timeout", commands("retries"))
+        m.counter("commands_coalesced_total", "Queued commands replaced by a newer one", commands("coalesced"))
+        self.m_commands = m.counter("commands_total", "Finished commands, by command and status")
+        m.gauge("commands_pending", "Commands queued or waiting for an ack/reply",
+                lambda: len(self.link.commands) if self.link else 0)
+        m.gauge("connected", "1 while the serial link is up",
+                lambda: int(bool(self.link and self.link.connected)))
+        m.gauge("queue_depth", "Items waiting in the record queue", lambda: len(self.q))
+        m.gauge("history_samples", "Samples held in the telemetry history", lambda: self.tele.count if self.tele else 0)
+        self.h_parse = m.histogram("parse_seconds", "consume_serial_queue() time per UI tick")
+        self.h_draw = m.histogram("draw_seconds", "draw() time per UI tick")
+        self.h_tick = m.histogram("tick_interval_seconds", f"Time between UI ticks (target {FPS_MS} ms)")
+        self.h_gen = m.histogram("gen_latency_seconds", "GEN sent to PW: received")
+        self.h_cmd = m.histogram("command_rtt_seconds", "Command written to its AK:/NK: received")
+        self.gen_sent = None
+        self.tick_ts = None
+        self.rates = RateMeter()
+        self.metrics_ts = 0.0
+        self.metrics_file = None
+        self.overlay = False
+
+    def toggle_overlay(self, event=None):
+        self.overlay = not self.overlay
+
+    def metrics_tick(self, now):
+        if now - self.metrics_ts < METRICS_MS / 1000.0:
+            return
+        self.metrics_ts = now
+        lines = self.m_lines
+        vals = {dict(k).get("type"): c[0] for k, c in list(lines.children.items())}
+        vals["bytes_in"] = self.link.bytes_in if self.link else 0
+        self.rates.update(vals, now)
+        if self.metrics_file:
+            try:
+                self.metrics.write_textfile(self.metrics_file)
+            except OSError as e:
+                self.status_lbl.config(text=f"Metrics: {e}", fg=C_RED)
+                self.metrics_file = None
+
+    def overlay_text(self):
+        r = self.rates.rates
+        kinds = sorted(k for k in r if k and k != "bytes_in")
+        rate = "  ".join(f"{k} {r[k]:.0f}" for k in kinds) or "-"
+        ms = lambda h, q: h.quantile(q) * 1000.0
+        link = self.link
+        return "\n".join((
+            f"lines/s  {rate}",
+            f"rx {r.get('bytes_in', 0) / 1024:.1f} KiB/s   queue {len(self.q)}   dropped {self.q.dropped}"
+            f"   parse err {self.m_parse_errors.value()}",
+            f"link {'UP' if link and link.connected else 'DOWN'}"
+            + (f"   bad frames {link.bad_frames}   tx dropped {link.tx_dropped}   write err {link.write_errors}" if link else ""),
+            f"parse p50 {ms(self.h_parse, .5):.2f} p99 {ms(self.h_parse, .99):.2f} ms"
+            f"   draw p50 {ms(self.h_draw, .5):.2f} p99 {ms(self.h_draw, .99):.2f} ms",
+            f"tick p50 {ms(self.h_tick, .5):.0f} p99 {ms(self.h_tick, .99):.0f} ms"
+            + (f"   GEN->PW p50 {ms(self.h_gen, .5):.0f} ms (n={self.h_gen.count()})" if self.h_gen.count() else ""),
+            (f"seq loss {link.reseq.loss_rate * 100:.2f}%   gaps {link.reseq.gaps}   recovered {link.reseq.recovered}"
+             f"   lost {link.reseq.lost}   dup {link.reseq.duplicates}   bad lines {link.bad_lines}") if link else "seq -",
+            (f"cmd rtt p50 {ms(self.h_cmd, .5):.0f} p99 {ms(self.h_cmd, .99):.0f} ms   pending {len(link.commands)}"
+             f"   retries {link.commands.retries}   timeouts {link.commands.timeouts}"
+             f"   coalesced {link.commands.coalesced}") if link else "cmd -",
+        ))
+
+    def managed_ports(self):
+        return list(self.devices.links) if self.devices else ()
+
+    def poll_link_events(self):
+        if self.link is None:
+            return
+        for kind, port, data in drain_events(self.link.events):
+            if kind == "connecting":
+                note = " (last used)" if not self.link.scanned and not self.link.want else ""
+                if data > 1:
+                    note += f" (try {data})"
+                self.status_lbl.config(text=f"Connecting: {port}{note}", fg=C_AMBER)
+            elif kind == "connected":
+                self.port = port
+                self.recon.reset()
+                self.status_lbl.config(text=f"Connected: {port}", fg=C_GREEN)
+                if self.link.connects > 1:
+                    self.resync_device()
+            elif kind == "disconnected":
+                self.gen_sent = None
+                if self.bulk is not None:
+                    job, self.bulk = self.bulk, None
+                    job.fail("disconnected")
+                self.status_lbl.config(text=f"Disconnected: {port} ({data}), reconnecting", fg=C_RED)
+            elif kind == "error":
+                self.status_lbl.config(text=f"{port}: {data}", fg=C_RED)
+            elif kind == "command":
+                self.command_done(data)
+            elif kind == "waiting":
+                if data:
+                    self.status_lbl.config(text="No micro:bit found (ports: " + ", ".join(data) + ")", fg=C_AMBER)
+                else:
+                    self.status_lbl.config(text="No COM ports found (plug micro:bit)", fg=C_RED)
+
+    def resync_device(self):
+        # After a reconnect the board may have rebooted with its defaults:
+        # push the length and telemetry settings shown in the UI again.
+        self.send_line(f"LEN:{self.current_length()}")
+        if self.pw_mode == "PHRASE":
+            self.send_line(f"MODE:PHRASE,{self.current_size()}")
         try:
-            self.ser = serial.Serial(self.port, BAUD, timeout=0.5)
-            self.status_lbl.config(text=f"Connected: {self.port}", fg=C_GREEN)
-            t = threading.Thread(target=self.read_loop, daemon=True)
-            t.start()
-        except Exception as e:
-            self.status_lbl.config(text=str(e), fg=C_RED)
-
-    def send_line(self, s):
+            ms = clamp(int(self.rate_var.get().strip()), 10, 5000)
+            th = max(0, int(self.th_var.get().strip()))
+        except Exception:
+            ms, th = self.telem_cfg["ms"], self.telem_cfg["th"]
+        self.send_line(f"TELEM:MS:{ms}")
+        self.send_line(f"TELEM:TH:{th}")
+        self.send_line(f"TELEM:KF:{self.telem_cfg['kf']}")
+        self.send_line("TELEM:DELTA:ON" if self.delta_var.get() else "TELEM:DELTA:OFF")
+        self.send_line(f"TELEM:BIN,{BIN_BATCH}" if self.telem_bin else "TELEM:TXT")
+        self.send_line("TELEM:ON" if self.telem_on else "TELEM:OFF")
+
+    def send_line(self, s, on_done=None):
+        # Returns the queued Request (None while replaying a log).
+        if self.link:
+            return self.link.send(s, on_done)
+        return None
+
+    def command_done(self, req):
+        self.m_commands.inc(cmd=req.name, status=req.status)
+        if req.rtt is not None:
+            self.h_cmd.observe(req.rtt)
+        if req.status in ("timeout", "rejected"):
+            self.status_lbl.config(text=f"{req.line}: {req.status}", fg=C_RED)
+        if req.name == "GEN" and not req.ok:
+            self.gen_sent = None    # no PW: coming; don't time the next GEN from here
+        if req.on_done is not None:
+            req.on_done(req)
+
+    def start_recording(self, path, redact=True):
+        from Recorder import Recorder
+        self.stop_recording()
+        self.recorder = Recorder(path, redact=redact)
+        self.rec_btn.config(text=f"Record: {os.path.basename(path)}", bg="#663333")
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+            self.rec_btn.config(text="Record: OFF", bg="#334455")
+
+    def toggle_record(self):
+        if self.recorder is not None:
+            self.stop_recording()
+            return
+        path = filedialog.asksaveasfilename(
+            parent=self.root, title="Record telemetry", defaultextension=".mbrec",
+            filetypes=(("Telemetry log", "*.mbrec"),))
+        if path:
+            self.start_recording(path, redact=bool(self.redact_var.get()))
+
+    def export_quality(self):
+        path = filedialog.asksaveasfilename(
+            parent=self.root, title="Export entropy report", defaultextension=".json",
+            filetypes=(("JSON", "*.json"),))
+        if path:
+            qa = self.quality()
+            qa.update()
+            qa.export(path)
+            self.status_lbl.config(text=f"Entropy report: {os.path.basename(path)}", fg=C_GREEN)
+
+    def set_chart_span(self, span):
+        self.chart_span = span
+        self.chart_due = 0.0
+
+    def seek_gen(self, step):
+        p = self.player
+        if p.seek_gen(p.gen_i + step):
+            self.q.drain()
+            if self.tele is not None:
+                self.tele.clear()
+            self.gen_marks.clear()
+            self.recon.reset()
+            self.reveal.cancel()
+
+    def on_close(self):
+        self.stop_recording()
+        if self.link:
+            self.link.stop()
+        self.root.destroy()
+
+    def current_length(self):
         try:
-            if self.ser:
-                if not s.endswith("\n"):
-                    s += "\n"
-                self.ser.write(s.encode("utf-8", errors="ignore"))
+            return clamp(int(self.len_var.get().strip()), 8, 24)
         except Exception:
-            pass
+            return 12
 
     def send_gen(self):
-        self.send_line("GEN")
+        if self.gen_source == "HOST":
+            self.generate_local()
+        else:
+            if self.gen_sent is None:
+                self.gen_sent = time.perf_counter()
+            self.send_line("GEN")
+
+    def toggle_source(self):
+        self.gen_source = "HOST" if self.gen_source == "DEVICE" else "DEVICE"
+        self.src_btn.config(text=f"Source: {self.gen_source}",
+                            bg="#335544" if self.gen_source == "HOST" else "#334455")
+
+    def host_passwords(self, count, length):
+        # length is the word count in PHRASE mode.
+        from Entropy import NeedsReseed, SEED_BITS
+        from Wordlist import SEPARATOR
+        if self.player is not None:
+            self.status_lbl.config(text="Replay: HOST generation needs live sensor data", fg=C_AMBER)
+            return None
+        self.entropy_pool()
+        try:
+            if self.pw_mode == "PHRASE":
+                words = self.host_wordlist()
+                if words is None:
+                    return None
+                return self.hostgen.phrases(count, length, words, SEPARATOR)
+            return self.hostgen.passwords(count, length)
+        except NeedsReseed:
+            got = int(self.hostgen.seed_progress() * SEED_BITS)
+            self.status_lbl.config(text=f"Entropy pool warming up: {got}/{SEED_BITS} bits", fg=C_AMBER)
+            return None
+
+    def host_wordlist(self):
+        # Memory-mapped on first use; only the words drawn are ever read.
+        if self.host_words is None:
+            from Wordlist import Wordlist, HOST_LIST
+            try:
+                self.host_words = Wordlist(self.wordlist_path or HOST_LIST)
+            except (OSError, ValueError) as e:
+                self.status_lbl.config(text=f"Wordlist: {e}", fg=C_RED)
+                return None
+        return self.host_words
+
+    def phrase_list_size(self, source):
+        # Words in the list behind a passphrase from source; None in CHARS mode.
+        if self.pw_mode != "PHRASE":
+            return None
+        if source == "HOST":
+            return len(self.host_words) if self.host_words else None
+        from Wordlist import DEVICE_WORDS
+        return DEVICE_WORDS
+
+    def current_size(self):
+        # Characters, or words in PHRASE mode.
+        if self.pw_mode != "PHRASE":
+            return self.current_length()
+        try:
+            return clamp(int(self.words_var.get().strip()), WORDS_MIN, WORDS_MAX)
+        except Exception:
+            return WORDS_DEFAULT
+
+    def generate_local(self):
+        pws = self.host_passwords(1, self.current_size())
+        if pws:
+            self.animate_password(pws[0], self.phrase_list_size("HOST"))
+
+    def set_mode(self, mode, words=None):
+        self.pw_mode = mode
+        if words is not None:
+            self.words_var.set(str(words))
+        self.phrase_btn.config(bg="#335544" if mode == "PHRASE" else "#334455")
+
+    def send_phrase(self):
+        self.set_mode("PHRASE")
+        n = self.current_size()
+        self.words_var.set(str(n))
+        self.send_line(f"MODE:PHRASE,{n}")
+
+    def send_chars(self):
+        self.set_mode("CHARS")
+        self.send_line("MODE:CHARS")
 
     def send_len(self):
         try:
@@ -200,6 +1003,115 @@ class App:
         self.len_var.set(str(n))
         self.send_line(f"LEN:{n}")
 
+    def request_bulk(self, count, length=None, path=None, on_done=None, source=None):
+        if self.bulk is not None:
+            self.status_lbl.config(text=f"Bulk: still waiting for {self.bulk.count}", fg=C_AMBER)
+            return None
+        source = source or self.gen_source
+        count = clamp(int(count), 1, HOST_BULK_MAX if source == "HOST" else BULK_MAX)
+        if length is None:
+            length = self.current_size()
+        elif self.pw_mode == "PHRASE":
+            length = clamp(int(length), WORDS_MIN, WORDS_MAX)
+        else:
+            length = clamp(int(length), 8, 24)
+        job = BulkJob(count, length, path, on_done)
+        if source == "HOST":
+            pws = self.host_passwords(count, length)
+            if pws is None:
+                return None
+            job.list_size = self.phrase_list_size(source)
+            job.passwords = dict(enumerate(pws))
+            job.finish()
+            return job
+        job.list_size = self.phrase_list_size(source)
+        self.bulk = job
+        if self.send_line(job.command(), lambda req: self.bulk_command_done(job, req)) is None:
+            self.bulk = None
+            job.fail("no device")
+        return job
+
+    def bulk_command_done(self, job, req):
+        # NK (board busy), timeout or a dropped command: no BE: will follow.
+        if not req.ok and self.bulk is job:
+            self.bulk = None
+            job.fail(req.status)
+
+    def send_bulk(self):
+        try:
+            n = int(self.bulk_var.get().strip())
+        except Exception:
+            return
+        path = filedialog.asksaveasfilename(
+            title="Export passwords", defaultextension=".csv",
+            filetypes=(("CSV", "*.csv"), ("JSON Lines", "*.jsonl")))
+        if not path:
+            return
+        job = self.request_bulk(n, path=path, on_done=self.bulk_done)
+        if job and job.elapsed is None:
+            self.status_lbl.config(text=f"Bulk: generating {job.count}...", fg=C_AMBER)
+
+    def bulk_done(self, job):
+        missing = len(job.missing())
+        msg = f"Bulk: {len(job.passwords)}/{job.count} in {job.elapsed:.1f}s"
+        if job.failed:
+            msg += f" ({job.failed})"
+        if job.path and (job.failed is None or job.passwords):
+            msg += f" -> {os.path.basename(job.path)}"
+        color = C_AMBER if missing else C_GREEN
+        self.status_lbl.config(text=msg, fg=C_RED if job.failed else color)
+
+    def send_rate(self):
+        try:
+            ms = clamp(int(self.rate_var.get().strip()), 10, 5000)
+            th = max(0, int(self.th_var.get().strip()))
+        except Exception:
+            return
+        self.set_telemetry_rate(ms, th, delta=bool(self.delta_var.get()))
+
+    def set_telemetry_rate(self, ms=None, th=None, kf=None, delta=None):
+        cfg = self.telem_cfg
+        if ms is not None and ms != cfg["ms"]:
+            self.send_line(f"TELEM:MS:{ms}")
+        if th is not None and th != cfg["th"]:
+            self.send_line(f"TELEM:TH:{th}")
+        if kf is not None and kf != cfg["kf"]:
+            self.send_line(f"TELEM:KF:{kf}")
+        if delta is not None and delta != cfg["delta"]:
+            self.send_line("TELEM:DELTA:ON" if delta else "TELEM:DELTA:OFF")
+
+    def apply_telemetry_config(self, payload):
+        try:
+            ms, th, kf, delta = payload.split(",")
+            cfg = {"ms": int(ms), "th": int(th), "kf": int(kf), "delta": delta == "1"}
+        except Exception:
+            return
+        self.telem_cfg = cfg
+        self.recon.configure(cfg["ms"], cfg["th"], cfg["kf"])
+        self.rate_var.set(str(cfg["ms"]))
+        self.th_var.set(str(cfg["th"]))
+        self.delta_var.set(cfg["delta"])
+
+    def device_manager(self):
+        if self.devices is None:
+            from Devices import DeviceManager
+            self.devices = DeviceManager(BAUD).start()
+        return self.devices
+
+    def open_devices(self):
+        if self.devices_win is not None:
+            self.devices_win.win.lift()
+            return
+        mgr = self.device_manager()
+        mgr.connect_all(exclude=(self.port,))
+        self.devices_win = DevicesWindow(self, mgr)
+
+    def open_diagnostics(self):
+        if self.diag_win is not None:
+            self.diag_win.win.lift()
+            return
+        self.diag_win = DiagnosticsWindow(self)
+
     def toggle_telem(self):
         self.telem_on = not self.telem_on
         if self.telem_on:
@@ -209,18 +1121,14 @@ class App:
             self.telem_btn.config(text="Telemetry: OFF", bg="#552233")
             self.send_line("TELEM:OFF")
 
-    def read_loop(self):
-        while True:
-            try:
-                raw = self.ser.readline()
-                if not raw:
-                    continue
-                line = raw.decode("utf-8", errors="ignore").strip()
-                if not line:
-                    continue
-                self.q.put(line)
-            except Exception:
-                time.sleep(0.2)
+    def toggle_bin(self):
+        self.telem_bin = not self.telem_bin
+        if self.telem_bin:
+            self.bin_btn.config(text="Framing: BINARY", bg="#335544")
+            self.send_line(f"TELEM:BIN,{BIN_BATCH}")
+        else:
+            self.bin_btn.config(text="Framing: TEXT", bg="#334455")
+            self.send_line("TELEM:TXT")
 
     def set_state(self, st):
         self.gen_state = st
@@ -241,158 +1149,267 @@ class App:
         self.str_lbl.config(bg=bg)
         self.tip_lbl.config(bg=bg)
 
-    def animate_password(self, pw):
+    def animate_password(self, pw, list_size=None):
         self.last_pw = pw
-        self.pw_lbl.config(text="")
+        self.last_list_size = list_size
+        self.device_label = None
         self.str_lbl.config(text="STRENGTH: ANALYZING...", fg=C_GRAY)
+        self.reveal.start(pw, self.reveal_done)
+
+    def reveal_done(self, pw):
+        # The device's ST: label wins; both sides share the same rules, so
+        # this only matters for firmware that scores differently.
+        from Strength import LABEL_COLORS, strength, phrase_strength
+        from Wordlist import SEPARATOR
+        if self.last_list_size:
+            label, bits = phrase_strength(pw, self.last_list_size, SEPARATOR)
+        else:
+            label, bits = strength(pw)
+        label = self.device_label or label
+        color = LABEL_COLORS.get(label, C_GRAY)
+        self.last_strength = (label, color)
+        self.str_lbl.config(text=f"STRENGTH: {label}  (~{bits:.0f} bits)", fg=color)
 
-        def run():
-            shown = [" "] * len(pw)
-            charset = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789!@#$%^&*()-_=+[]{};:,.?/"
-            for i in range(len(pw)):
-                for _ in range(9):
-                    shown[i] = random.choice(charset)
-                    self.root.after(0, lambda s="".join(shown): self.pw_lbl.config(text=s))
-                    time.sleep(ANIM_CHAR_DELAY)
-                shown[i] = pw[i]
-                self.root.after(0, lambda s="".join(shown): self.pw_lbl.config(text=s))
-
-            label, color = evaluate_strength(pw)
-            self.last_strength = (label, color)
-            self.root.after(0, lambda: self.str_lbl.config(text=f"STRENGTH: {label}", fg=color))
-
-            if HAS_CLIPBOARD:
-                try:
-                    pyperclip.copy(pw)
-                except Exception:
-                    pass
+        copy_to_clipboard(pw)
 
-        threading.Thread(target=run, daemon=True).start()
+    def sample_password(self, pw):
+        # Replayed logs repeat old samples and redacted ones are all "*".
+        if self.player is not None or not pw.strip("*"):
+            return
+        self.entropy_pool().add_password(pw)
+        if self.pw_mode == "CHARS":
+            self.quality().add_password(pw)
+
+    # Built on first use: the entropy pool with the first record that
+    # feeds it, the history ring (HISTORY_N float64 columns) and the
+    # analyzer with the first samples.
+    def entropy_pool(self):
+        if self.pool is None:
+            from Entropy import EntropyPool, HostGenerator
+            self.pool = EntropyPool()
+            self.hostgen = HostGenerator(self.pool)
+        return self.pool
+
+    def history(self):
+        if self.tele is None:
+            from Telemetry import TelemetryRing
+            self.tele = TelemetryRing(HISTORY_N)
+        return self.tele
+
+    def quality(self):
+        if self.analyzer is None:
+            from Analyzer import EntropyAnalyzer
+            self.analyzer = EntropyAnalyzer()
+        return self.analyzer
+
+    def last_sample(self, name):
+        return self.tele.last(name) if self.tele is not None else 0.0
 
     def consume_serial_queue(self):
-        try:
-            while True:
-                line = self.q.get_nowait()
-
-                if line.startswith("S:"):
-                    try:
-                        payload = line[2:]
-                        parts = payload.split(",")
-                        ax = int(parts[1]); ay = int(parts[2]); az = int(parts[3])
-                        self.ax, self.ay, self.az = ax, ay, az
-                        mag = math.sqrt(ax*ax + ay*ay + az*az)
-                        self.ax_buf.append(ax)
-                        self.ay_buf.append(ay)
-                        self.az_buf.append(az)
-                        self.mag_buf.append(mag)
-                    except Exception:
-                        pass
-
-                elif line.startswith("EV:"):
-                    st = line[3:].strip().upper()
-                    if st in ("IDLE", "PRE", "GEN", "POST"):
-                        self.set_state(st)
-
-                elif line.startswith("PW:"):
-                    pw = line[3:]
-                    self.animate_password(pw)
-
-                elif line.startswith("LN:"):
-                    try:
-                        self.len_var.set(line[3:].strip())
-                    except Exception:
-                        pass
+        batch = []
+        recon = self.recon
+        items = self.q.drain()
+        if self.q.cut:
+            # Shed telemetry: later D: lines have no base until a keyframe.
+            recon.reset()
+        if self.recorder is not None:
+            self.recorder.write_items(items)
+        kinds = {}
+        errors = 0
+        marks = []
+        for line in items:
+            if not isinstance(line, str):
+                kinds["frame"] = kinds.get("frame", 0) + 1
+                recon.frame(line, batch)
+                continue
+            kind = line[:line.find(":")] if ":" in line[:4] else ""
+            if kind not in LINE_KINDS:
+                kind = "other"
+            kinds[kind] = kinds.get(kind, 0) + 1
+
+            if kind == "S":
+                try:
+                    parts = line[2:].split(",")
+                    recon.full((int(parts[0]), int(parts[1]), int(parts[2]),
+                                int(parts[3]), int(parts[4])), batch)
+                except (ValueError, IndexError):
+                    errors += 1
 
-        except queue.Empty:
-            return
+            elif kind == "D":
+                try:
+                    parts = line[2:].split(",")
+                    recon.delta((int(parts[0]), int(parts[1]), int(parts[2]),
+                                 int(parts[3]), int(parts[4])), batch)
+                except (ValueError, IndexError):
+                    errors += 1
+
+            elif line.startswith("SX:"):
+                self.device_stats = parse_device_stats(line[3:])
+
+            elif line.startswith("TM:CFG,"):
+                self.apply_telemetry_config(line[7:])
+
+            elif line.startswith("EV:"):
+                st = line[3:].strip().upper()
+                if self.player is None:
+                    self.entropy_pool().add_event(st)
+                if st == "GEN":
+                    self.pw_fresh = True
+                    marks.append(batch[-1][0] if batch else self.last_sample("t"))
+                    self.gen_marks.append(marks[-1])
+                if st in ("IDLE", "PRE", "GEN", "POST"):
+                    self.set_state(st)
+
+            elif line.startswith("PW:"):
+                pw = line[3:]
+                # A LAST reply repeats the previous password without EV:GEN.
+                if self.pw_fresh:
+                    self.pw_fresh = False
+                    if self.gen_sent is not None:
+                        self.h_gen.observe(time.perf_counter() - self.gen_sent)
+                        self.gen_sent = None
+                    self.sample_password(pw)
+                self.animate_password(pw, self.phrase_list_size("DEVICE"))
+
+            elif line.startswith("ST:"):
+                self.device_label = line[3:].strip().upper()
+
+            elif line.startswith("PB:"):
+                self.sample_password(line[3:].partition(",")[2])
+                if self.bulk:
+                    self.bulk.add(line[3:])
+
+            elif line.startswith("BE:"):
+                if self.bulk:
+                    job, self.bulk = self.bulk, None
+                    job.finish()
+
+            elif line.startswith("MD:"):
+                mode, _, n = line[3:].strip().partition(",")
+                if mode == "PHRASE":
+                    self.set_mode(mode, int(n) if n.isdigit() else None)
+                elif mode == "CHARS":
+                    self.set_mode(mode)
+
+            elif line.startswith("LN:"):
+                # A phrase GEN reports its word count after MD:PHRASE.
+                var = self.words_var if self.pw_mode == "PHRASE" else self.len_var
+                try:
+                    var.set(line[3:].strip())
+                except Exception:
+                    pass
 
-    def draw(self):
+        for kind, n in kinds.items():
+            self.m_lines.inc(n, type=kind)
+        if errors:
+            self.m_parse_errors.inc(errors)
+        if batch:
+            last = batch[-1][0]
+            if last < max(batch[0][0], self.last_sample("t")):
+                # Device clock reset: the charts start over (TelemetryRing.window)
+                # and older GEN marks would land at the wrong place.
+                self.gen_marks.clear()
+                self.gen_marks.extend(m for m in marks if m <= last)
+            # A replay repeats recorded samples: never credit them as entropy.
+            if self.player is None:
+                self.entropy_pool().add_samples(batch)
+            self.quality().add_samples(batch)
+            self.history().append_batch(batch)
+            _, self.ax, self.ay, self.az, _ = batch[-1]
+
+    # ----------------------------
+    # Retained-mode canvas: items are created once by build_scene() and
+    # later frames only touch the ones whose coords/options changed.
+    # <Configure> marks the scene dirty so it is rebuilt at the new size.
+    # ----------------------------
+    def on_canvas_configure(self, event):
+        size = (event.width, event.height)
+        if size != self.scene_size:
+            self.scene = None
+
+    def set_item(self, key, **opts):
+        changed = {}
+        cache = self.scene_cache
+        for k, v in opts.items():
+            ck = (key, k)
+            if cache.get(ck) != v:
+                cache[ck] = v
+                changed[k] = v
+        if changed:
+            self.canvas.itemconfigure(self.scene[key], **changed)
+
+    def set_coords(self, key, *xy):
+        ck = (key, "coords")
+        if self.scene_cache.get(ck) != xy:
+            self.scene_cache[ck] = xy
+            self.canvas.coords(self.scene[key], *xy)
+
+    def build_scene(self):
         c = self.canvas
         c.delete("all")
         w = c.winfo_width()
         h = c.winfo_height()
+        self.scene_size = (w, h)
+        self.scene_cache = {}
+        self.mb_offset = (0, 0)
+        sc = {}
 
-        bg = "#070a12"
-        c.create_rectangle(0, 0, w, h, fill=bg, outline="")
+        c.create_rectangle(0, 0, w, h, fill=C_CANVAS, outline="")
 
-        header = f"STATE: {self.gen_state}   ACCEL: ({self.ax},{self.ay},{self.az})"
-        c.create_text(14, 16, text=header, font=("Consolas", 12, "bold"), fill=C_GRAY, anchor="w")
-
-        state_age = time.time() - self.state_ts
-        pulse = 0.5 + 0.5 * math.sin(time.time() * (5.0 if self.gen_state == "GEN" else 2.5))
+        sc["header"] = c.create_text(14, 16, text="", font=("Consolas", 12, "bold"), fill=C_GRAY, anchor="w")
 
-        if self.gen_state == "IDLE":
-            glow = "#0c2b2b"
-        elif self.gen_state == "PRE":
-            glow = "#203a6b"
-        elif self.gen_state == "GEN":
-            glow = "#5a2b8a"
-        else:
-            glow = "#1f5a3a"
-
-        accel_mag = self.mag_buf[-1] if len(self.mag_buf) else 0
-        jitter = int(clamp((accel_mag / 2500.0) * 14.0, 0, 14))
-        jx = random.randint(-jitter, jitter) if jitter > 0 else 0
-        jy = random.randint(-jitter, jitter) if jitter > 0 else 0
-
-        mb_x = 60 + jx
-        mb_y = 60 + jy
+        mb_x = 60
+        mb_y = 60
         mb_w = 250
         mb_h = 240
 
-        c.create_rectangle(mb_x-8, mb_y-8, mb_x+mb_w+8, mb_y+mb_h+8, fill=glow, outline="", stipple="gray25")
-        c.create_rectangle(mb_x, mb_y, mb_x+mb_w, mb_y+mb_h, fill="#0e1424", outline="#1e2b44", width=2)
+        sc["glow"] = c.create_rectangle(mb_x-8, mb_y-8, mb_x+mb_w+8, mb_y+mb_h+8, fill="", outline="",
+                                        stipple="gray25", tags=("mb",))
+        c.create_rectangle(mb_x, mb_y, mb_x+mb_w, mb_y+mb_h, fill="#0e1424", outline="#1e2b44", width=2, tags=("mb",))
 
-        c.create_text(mb_x+10, mb_y+16, text="VIRTUAL micro:bit", font=("Consolas", 11, "bold"), fill=C_CYAN, anchor="w")
+        c.create_text(mb_x+10, mb_y+16, text="VIRTUAL micro:bit", font=("Consolas", 11, "bold"), fill=C_CYAN,
+                      anchor="w", tags=("mb",))
 
         grid_x0 = mb_x + 55
         grid_y0 = mb_y + 50
         cell = 28
         rad = 9
 
-        led_intensity = pulse
-        if self.gen_state == "IDLE":
-            led_intensity = 0.25 + 0.20 * pulse
-        elif self.gen_state == "PRE":
-            led_intensity = 0.35 + 0.35 * pulse
-        elif self.gen_state == "GEN":
-            led_intensity = 0.60 + 0.40 * pulse
-        else:
-            led_intensity = 0.30 + 0.25 * pulse
-
-        led_color = C_CYAN if self.gen_state != "GEN" else C_PINK
-        off_color = "#111827"
-
         for r in range(5):
             for col in range(5):
                 cx = grid_x0 + col * cell
                 cy = grid_y0 + r * cell
-                if (r + col) % 2 == 0:
-                    use = led_intensity
-                else:
-                    use = 0.2 + 0.6 * led_intensity
-
-                def blend(col_hex, t):
-                    col_hex = col_hex.lstrip("#")
-                    r0 = int(col_hex[0:2], 16)
-                    g0 = int(col_hex[2:4], 16)
-                    b0 = int(col_hex[4:6], 16)
-                    r1 = int(off_color[1:3], 16)
-                    g1 = int(off_color[3:5], 16)
-                    b1 = int(off_color[5:7], 16)
-                    rr = int(r1 + (r0 - r1) * t)
-                    gg = int(g1 + (g0 - g1) * t)
-                    bb = int(b1 + (b0 - b1) * t)
-                    return f"#{rr:02x}{gg:02x}{bb:02x}"
-
-                fill = blend(led_color, clamp(use, 0.0, 1.0))
-                c.create_oval(cx-rad, cy-rad, cx+rad, cy+rad, fill=fill, outline="")
-
-        c.create_text(mb_x+18, mb_y+210, text="A  B", font=("Consolas", 14, "bold"), fill=C_GRAY, anchor="w")
-        c.create_oval(mb_x+36, mb_y+224, mb_x+58, mb_y+246, fill="#19233a", outline="#2a3a5a")
-        c.create_oval(mb_x+76, mb_y+224, mb_x+98, mb_y+246, fill="#19233a", outline="#2a3a5a")
-
-        c.create_text(mb_x+150, mb_y+210, text="Shake / Noise -> Entropy", font=("Consolas", 10), fill=C_GRAY, anchor="w")
+                sc[("led", r, col)] = c.create_oval(cx-rad, cy-rad, cx+rad, cy+rad, fill="", outline="", tags=("mb",))
+
+        c.create_text(mb_x+18, mb_y+210, text="A  B", font=("Consolas", 14, "bold"), fill=C_GRAY, anchor="w", tags=("mb",))
+        c.create_oval(mb_x+36, mb_y+224, mb_x+58, mb_y+246, fill="#19233a", outline="#2a3a5a", tags=("mb",))
+        c.create_oval(mb_x+76, mb_y+224, mb_x+98, mb_y+246, fill="#19233a", outline="#2a3a5a", tags=("mb",))
+
+        c.create_text(mb_x+150, mb_y+210, text="Shake / Noise -> Entropy", font=("Consolas", 10), fill=C_GRAY,
+                      anchor="w", tags=("mb",))
+
+        # Strip charts under the board: AX/AY/AZ overlaid on top, |a| below,
+        # GEN events as vertical markers. One line item per trace.
+        ch_x0 = 20
+        ch_x1 = mb_x + mb_w + 14
+        ch_y0 = mb_y + mb_h + 40
+        ch_y1 = h - 20
+        self.chart_geom = None
+        self.chart_due = 0.0
+        if ch_y1 - ch_y0 >= 60:
+            lane = (ch_y1 - ch_y0 - 12) / 2
+            ax_mid = ch_y0 + 4 + lane / 2
+            mag_base = ch_y1 - 4
+            c.create_rectangle(ch_x0, ch_y0, ch_x1, ch_y1, fill="#0a1020", outline="#1e2b44")
+            c.create_line(ch_x0, ax_mid, ch_x1, ax_mid, fill="#243454")
+            c.create_line(ch_x0, ch_y0 + lane + 6, ch_x1, ch_y0 + lane + 6, fill="#1e2b44")
+            sc["chart_label"] = c.create_text(ch_x0, ch_y0 - 10, text="", font=("Consolas", 9),
+                                              fill=C_GRAY, anchor="w")
+            for i in range(GEN_MARKS):
+                sc[("mark", i)] = c.create_line(-10, -10, -10, -10, fill=C_MARK, dash=(2, 2))
+            for name, color in zip(("ax", "ay", "az", "mag"), BAR_COLORS + (C_MAG,)):
+                sc[("trace", name)] = c.create_line(-10, -10, -10, -10, fill=color)
+            self.chart_geom = (ch_x0, ch_x1, ch_y0, ch_y1, ax_mid, lane / 2, mag_base, lane)
 
         dash_x0 = 340
         dash_y0 = 55
@@ -406,38 +1423,222 @@ class App:
         bar_h = 190
         bar_w = 34
         gap = 36
+        self.bar_geom = (bar_y, bar_h, bar_w)
 
-        def draw_bar(label, val, x, color):
-            v = clamp(val / 2048.0, -1.0, 1.0)
+        for i, (label, color) in enumerate(zip(("AX", "AY", "AZ"), BAR_COLORS)):
+            x = bar_x + i * (bar_w + gap)
             mid = bar_y + bar_h/2
-            y1 = mid
-            y2 = mid - v*(bar_h/2)
-            c.create_rectangle(x, bar_y, x+bar_w, bar_y+bar_h, fill="#0f1525", outline="#243454")
+            c.create_rectangle(x, bar_y, x+bar_w, bar_y+bar_h, fill=C_BAR_BG, outline="#243454")
             c.create_line(x, mid, x+bar_w, mid, fill="#243454")
-            c.create_rectangle(x+4, min(y1,y2), x+bar_w-4, max(y1,y2), fill=color, outline="")
+            sc[("bar", i)] = c.create_rectangle(x+4, mid, x+bar_w-4, mid, fill=color, outline="")
             c.create_text(x+bar_w/2, bar_y+bar_h+18, text=label, font=("Consolas", 11, "bold"), fill=C_GRAY)
-            c.create_text(x+bar_w/2, bar_y-14, text=str(val), font=("Consolas", 10), fill=C_GRAY)
-
-        draw_bar("AX", self.ax, bar_x, "#66aaff")
-        draw_bar("AY", self.ay, bar_x + (bar_w+gap), "#66ffcc")
-        draw_bar("AZ", self.az, bar_x + 2*(bar_w+gap), "#ffaa66")
-
-        mag = self.mag_buf[-1] if len(self.mag_buf) else 0.0
-        c.create_text(bar_x, bar_y+bar_h+48, text=f"Accel magnitude: {mag:.0f}", font=("Consolas", 10, "bold"), fill=C_GRAY, anchor="w")
+            sc[("val", i)] = c.create_text(x+bar_w/2, bar_y-14, text="", font=("Consolas", 10), fill=C_GRAY)
+        self.bar_x = [bar_x + i * (bar_w + gap) for i in range(3)]
 
+        sc["mag"] = c.create_text(bar_x, bar_y+bar_h+48, text="", font=("Consolas", 10, "bold"), fill=C_GRAY, anchor="w")
+        sc["derived"] = c.create_text(bar_x, bar_y+bar_h+68, text="", font=("Consolas", 10), fill=C_GRAY, anchor="w")
+        sc["quality"] = c.create_text(bar_x, bar_y+bar_h+92, text="", font=("Consolas", 10, "bold"), fill=C_GRAY, anchor="w")
+        sc["quality_pw"] = c.create_text(bar_x, bar_y+bar_h+112, text="", font=("Consolas", 10), fill=C_GRAY, anchor="w")
 
+        sc["metrics"] = c.create_text(w-14, 34, text="", font=("Consolas", 9), fill="#c8d0e0",
+                                      anchor="ne", justify="left")
 
         phase_help = "PRE: entropy mix  |  GEN: password emit  |  POST: settle"
         c.create_text(dash_x0+12, dash_y0+dash_h-12, text=phase_help, font=("Consolas", 10), fill=C_GRAY, anchor="w")
 
+        self.scene = sc
+
+    def draw(self):
+        if self.scene is None:
+            self.build_scene()
+
+        header = f"STATE: {self.gen_state}   ACCEL: ({self.ax},{self.ay},{self.az})"
+        header += f"   POOL: {int(self.pool.bits) if self.pool else 0}b"
+        if self.q.dropped:
+            header += f"   DROPPED: {self.q.dropped_samples}"
+        if self.link and self.link.reseq.lost:
+            header += f"   LOSS: {self.link.reseq.loss_rate * 100:.1f}%"
+        if self.recorder is not None:
+            header += f"   REC: {self.recorder.offset // 1024} KiB"
+        if self.player:
+            p = self.player
+            header += f"   REPLAY: {p.t_log / 1000.0:.1f}/{p.log.index.duration_ms / 1000.0:.1f}s"
+            header += " (max)" if p.speed <= 0 else f" ({p.speed:g}x)"
+        self.set_item("header", text=header)
+
+        pulse = 0.5 + 0.5 * math.sin(time.time() * (5.0 if self.gen_state == "GEN" else 2.5))
+
+        glow = STATE_GLOW.get(self.gen_state, STATE_GLOW["POST"])
+        self.set_item("glow", fill=PALETTE.shade(glow, C_CANVAS, 0.75 + 0.25 * pulse))
+
+        accel_mag = self.last_sample("mag")
+        jitter = int(clamp((accel_mag / 2500.0) * 14.0, 0, 14))
+        jx = random.randint(-jitter, jitter) if jitter > 0 else 0
+        jy = random.randint(-jitter, jitter) if jitter > 0 else 0
+        ox, oy = self.mb_offset
+        if (jx, jy) != (ox, oy):
+            self.canvas.move("mb", jx - ox, jy - oy)
+            self.mb_offset = (jx, jy)
+
+        led_intensity = pulse
+        if self.gen_state == "IDLE":
+            led_intensity = 0.25 + 0.20 * pulse
+        elif self.gen_state == "PRE":
+            led_intensity = 0.35 + 0.35 * pulse
+        elif self.gen_state == "GEN":
+            led_intensity = 0.60 + 0.40 * pulse
+        else:
+            led_intensity = 0.30 + 0.25 * pulse
+
+        led_color = C_CYAN if self.gen_state != "GEN" else C_PINK
+        fills = (PALETTE.shade(led_color, C_LED_OFF, led_intensity),
+                 PALETTE.shade(led_color, C_LED_OFF, 0.2 + 0.6 * led_intensity))
+
+        for r in range(5):
+            for col in range(5):
+                self.set_item(("led", r, col), fill=fills[(r + col) % 2])
+
+        bar_y, bar_h, bar_w = self.bar_geom
+        mid = bar_y + bar_h/2
+        for i, val in enumerate((self.ax, self.ay, self.az)):
+            v = clamp(val / 2048.0, -1.0, 1.0)
+            y2 = mid - v*(bar_h/2)
+            x = self.bar_x[i]
+            self.set_coords(("bar", i), x+4, min(mid, y2), x+bar_w-4, max(mid, y2))
+            self.set_item(("bar", i), fill=PALETTE.shade(BAR_COLORS[i], C_BAR_BG, 0.55 + 0.45 * abs(v)))
+            self.set_item(("val", i), text=str(val))
+
+        mag = self.last_sample("mag")
+        self.set_item("mag", text=f"Accel magnitude: {mag:.0f}")
+        derived = f"RMS: {self.last_sample('rms'):.0f}   Jerk: {self.last_sample('jerk'):+.0f} mg/s"
+        self.set_item("derived", text=derived)
+
+        now = time.monotonic()
+        if self.chart_geom and now >= self.chart_due:
+            self.draw_charts()
+            width = self.chart_geom[1] - self.chart_geom[0]
+            self.chart_due = now + max(FPS_MS, self.chart_span / width) / 1000.0
+
+        self.set_item("metrics", text=self.overlay_text() if self.overlay else "")
+
+        qa = self.analyzer
+        if qa is None:
+            self.set_item("quality", text="H-min: waiting for samples", fill=C_GRAY)
+            return
+        from Analyzer import CHANNELS as QA_CHANNELS
+        if qa.latest:
+            hs = "  ".join(f"{ch} {qa.latest[ch]['min']:.1f}" for ch in QA_CHANNELS)
+            text = f"H-min/{qa.bits}b: {hs}  = {qa.sensor_bits():.1f} b/sample"
+        else:
+            text = f"H-min: collecting {qa.symbols}/{qa.window} samples"
+        health = qa.health()
+        self.set_item("quality", text=f"[{health}] {text}",
+                      fill={"OK": C_GREEN, "LOW": C_AMBER, "FAIL": C_RED}[health])
+        pw = qa.password_stats()
+        if pw:
+            text = f"Passwords: {pw['passwords']}  chi2 p={pw['p']:.3f}"
+            if pw["worst_position"] is not None:
+                text += f"  worst pos {pw['worst_position']} p={pw['worst_position_p']:.3f}"
+            self.set_item("quality_pw", text=text)
+
+    def draw_charts(self):
+        x0, x1, y0, y1, ax_mid, ax_half, mag_base, mag_h = self.chart_geom
+        if self.tele is None:
+            return
+        from Telemetry import decimate, strip_coords
+        span = self.chart_span
+        cols = self.tele.window(("t", "ax", "ay", "az", "mag"), span)
+        t = cols.pop("t")
+        t1 = float(t[-1]) if len(t) else 0.0
+        t0 = t1 - span
+        xs, ys = decimate(t, cols, t0, t1, x1 - x0)
+        sx = (x1 - x0) / span
+        for name in ("ax", "ay", "az", "mag"):
+            if len(xs) < 2:
+                xy = (-10, -10, -10, -10)
+            elif name == "mag":
+                xy = strip_coords(xs, ys[name], t0, x0, sx, mag_base, mag_h / MAG_FULL, 0, MAG_FULL)
+            else:
+                xy = strip_coords(xs, ys[name], t0, x0, sx, ax_mid, ax_half / 2048.0, -2048, 2048)
+            self.set_coords(("trace", name), *xy)
+
+        marks = [m for m in self.gen_marks if t0 <= m <= t1] if len(t) else []
+        for i in range(GEN_MARKS):
+            if i < len(marks):
+                x = round(x0 + (marks[i] - t0) * sx, 1)
+                self.set_coords(("mark", i), x, y0, x, y1)
+            else:
+                self.set_coords(("mark", i), -10, -10, -10, -10)
+
+        name = dict((v, k) for k, v in CHART_SPANS).get(span, f"{span / 1000:g}s")
+        self.set_item("chart_label", text=f"HISTORY {name}: {len(t)} samples -> {len(xs)} pts, {len(marks)} GEN")
+
     def ui_tick(self):
+        t0 = time.perf_counter()
+        if self.tick_ts is not None:
+            self.h_tick.observe(t0 - self.tick_ts)
+        self.tick_ts = t0
+        if self.player:
+            self.player.pump(self.q)
+        self.poll_link_events()
         self.consume_serial_queue()
+        t1 = time.perf_counter()
+        self.h_parse.observe(t1 - t0)
+        now = time.monotonic()
+        if now - self.analyze_ts >= ANALYZE_MS / 1000.0:
+            self.analyze_ts = now
+            if self.analyzer is not None:
+                self.analyzer.update()
+        self.metrics_tick(now)
+        t2 = time.perf_counter()
         self.draw()
+        self.h_draw.observe(time.perf_counter() - t2)
         self.root.after(FPS_MS, self.ui_tick)
 
 def main():
+    ap = argparse.ArgumentParser(description="Micro:bit password tool + sensor telemetry")
+    ap.add_argument("--port", help="serial port (default: auto-detect)")
+    ap.add_argument("--emulate", action="store_true", help="run MB.py in-process instead of using hardware")
+    ap.add_argument("--speed", type=float, default=1.0, help="emulator time acceleration (0 = as fast as possible)")
+    ap.add_argument("--replay", help="emulator sensor input: file of recorded S: lines")
+    ap.add_argument("--record", help="append received records to this telemetry log (.mbrec)")
+    ap.add_argument("--no-redact", action="store_true", help="keep passwords in the recording")
+    ap.add_argument("--play", help="replay a telemetry log instead of connecting to a device")
+    ap.add_argument("--play-speed", type=float, default=1.0, help="replay speed (0 = as fast as possible)")
+    ap.add_argument("--metrics-file", help="rewrite Prometheus text metrics to this file every second")
+    ap.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    ap.add_argument("--metrics-overlay", action="store_true", help="start with the metrics overlay shown (F3)")
+    ap.add_argument("--no-port-cache", action="store_true", help="do not use or update the last-port cache")
+    ap.add_argument("--wordlist", help="packed passphrase wordlist for host generation (.mbwl, default eff_large.mbwl)")
+    ap.add_argument("--devices", type=int, default=0, help="attach N extra emulated boards to the device manager")
+    args = ap.parse_args()
+
+    transport = None
+    if args.emulate:
+        from Emulator import emulated_transport, RecordedSensors
+        sensors = RecordedSensors.from_file(args.replay) if args.replay else None
+        transport, _ = emulated_transport(speed=args.speed, sensors=sensors)
+
     root = tk.Tk()
-    app = App(root)
+    app = App(root, transport=transport, port=args.port, play=args.play, play_speed=args.play_speed,
+              port_cache=None if args.no_port_cache else PORT_CACHE)
+    app.metrics_file = args.metrics_file
+    app.wordlist_path = args.wordlist
+    app.overlay = args.metrics_overlay
+    if args.metrics_port:
+        try:
+            app.metrics.serve(args.metrics_port)
+        except OSError as e:
+            app.status_lbl.config(text=f"Metrics port {args.metrics_port}: {e}", fg=C_RED)
+    if args.record and not args.play:
+        app.start_recording(args.record, redact=not args.no_redact)
+    if args.devices:
+        from Emulator import emulated_transport
+        mgr = app.device_manager()
+        for i in range(args.devices):
+            host, _ = emulated_transport(speed=args.speed)
+            mgr.add_transport(f"emu{i}", host)
+        app.devices_win = DevicesWindow(app, mgr)
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,243 @@
+import time
+from collections import deque
+
+# ----------------------------
+# Command pipeline
+# Commands are queued from any thread and written on the SerialEngine's
+# loop thread, so a slow serial write never blocks the UI. Each one goes
+# out as "@<id>:<command>"; MB.py answers AK:<id> (applied) or NK:<id>
+# (rejected) and announces late replies with RQ:<id>, which ties the
+# PW:/ST:/MD:/LN:/PB:/BE: lines that follow to the request that caused them.
+#
+# Settings (LEN:, TELEM:*, MODE:) coalesce: a newer command replaces a
+# queued, not yet written one with the same name, unless a GEN or other
+# command is queued between them. Unacked commands are resent after
+# ACK_TIMEOUT_S, up to RETRIES times; the device acks a repeated id
+# without running it again. Firmware that never acks is detected on the
+# first timeout and gets plain, untagged commands from then on; the
+# commands already sent tagged time out instead of being repeated.
+# ----------------------------
+ACK_TIMEOUT_S = 0.5
+REPLY_TIMEOUT_S = 30.0
+RETRIES = 2
+WINDOW = 8
+QUEUE_MAX = 64
+MAX_ID = 9999
+
+NAMES = (
+    ("GEN:", "GEN:n"),
+    ("LEN:", "LEN"),
+    ("TELEM:MS:", "TELEM:MS"),
+    ("TELEM:TH:", "TELEM:TH"),
+    ("TELEM:KF:", "TELEM:KF"),
+    ("TELEM:DELTA:", "TELEM:DELTA"),
+    ("TELEM:BIN", "TELEM:FRAMING"),
+    ("TELEM:TXT", "TELEM:FRAMING"),
+    ("TELEM:ON", "TELEM"),
+    ("TELEM:OFF", "TELEM"),
+    ("MODE:", "MODE"),
+)
+COALESCE = ("LEN", "TELEM:MS", "TELEM:TH", "TELEM:KF", "TELEM:DELTA", "TELEM:FRAMING", "TELEM", "MODE")
+CONTROL = ("AK:", "NK:", "RQ:")
+REPLY_KINDS = ("PW:", "ST:", "MD:", "LN:", "PB:", "BE:")
+# Commands answered after their ack, and the line that ends the answer.
+REPLY_END = {"GEN": "LN:", "GEN:n": "BE:", "LAST": "PW:"}
+
+
+def command_name(line):
+    for prefix, name in NAMES:
+        if line.startswith(prefix):
+            return name
+    return line.split(":", 1)[0]
+
+
+class Request:
+    # status: queued -> inflight -> (acked) -> ok | rejected | timeout |
+    #         coalesced | dropped, or "sent" for untagged firmware
+    def __init__(self, line, on_done=None):
+        self.line = line
+        self.name = command_name(line)
+        self.on_done = on_done
+        self.id = None
+        self.status = "queued"
+        self.tries = 0
+        self.queued = time.perf_counter()
+        self.sent = None
+        self.acked = None
+        self.done = None
+        self.replies = []
+        self.timer = None
+
+    @property
+    def ok(self):
+        return self.status in ("ok", "sent")
+
+    @property
+    def rtt(self):
+        # Last write to the first AK:/NK:/RQ: for it.
+        if self.acked is None or self.sent is None:
+            return None
+        return self.acked - self.sent
+
+    @property
+    def latency(self):
+        # Submitted to finished, including queueing and any late reply.
+        return None if self.done is None else self.done - self.queued
+
+
+class CommandChannel:
+    # All methods run on the owner's loop thread.
+    def __init__(self, loop, write, finished, window=WINDOW):
+        self.loop = loop
+        self.write = write
+        self.finished = finished
+        self.window = window
+        self.queue = deque()
+        self.inflight = {}      # id -> Request, in send order
+        self.owner = None       # request named by the last RQ:
+        self.tagged = None      # None until the firmware acks or times out
+        self.online = False
+        self.next_id = 0
+        self.retries = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.rejected = 0
+
+    def __len__(self):
+        return len(self.queue) + len(self.inflight)
+
+    def submit(self, req):
+        if req.name in COALESCE:
+            for i in range(len(self.queue) - 1, -1, -1):
+                old = self.queue[i]
+                if old.name not in COALESCE:
+                    break
+                if old.name == req.name:
+                    del self.queue[i]
+                    self.coalesced += 1
+                    self._finish(old, "coalesced")
+                    break
+        self.queue.append(req)
+        if len(self.queue) > QUEUE_MAX:
+            self._finish(self.queue.popleft(), "dropped")
+        self._pump()
+
+    def attached(self):
+        self.online = True
+        self.tagged = None      # may be another board or firmware
+        self._pump()
+
+    def detached(self):
+        self.online = False
+        for req in list(self.inflight.values()):
+            self._close(req, "dropped")
+        self.owner = None
+
+    def close(self):
+        # Owner gone for good: queued requests are dropped too.
+        self.detached()
+        while self.queue:
+            self._finish(self.queue.popleft(), "dropped")
+
+    def observe(self, items):
+        # Decoded records in, the same records minus AK:/NK:/RQ: out.
+        out = []
+        for item in items:
+            if isinstance(item, str):
+                head = item[:3]
+                if head in CONTROL:
+                    self._control(head, item[3:].strip())
+                    continue
+                if self.owner is not None and head in REPLY_KINDS:
+                    self._reply(self.owner, head, item)
+            out.append(item)
+        return out
+
+    def _pump(self):
+        while self.online and self.queue and len(self.inflight) < self.window:
+            req = self.queue.popleft()
+            if self.tagged is False:
+                self._send_plain(req)
+                continue
+            self.next_id = self.next_id % MAX_ID + 1
+            req.id = str(self.next_id)
+            self.inflight[req.id] = req
+            self._transmit(req)
+
+    def _transmit(self, req):
+        req.tries += 1
+        if req.tries > 1:
+            self.retries += 1
+        req.status = "inflight"
+        req.sent = time.perf_counter()
+        self.write(f"@{req.id}:{req.line}\n".encode("utf-8", errors="ignore"))
+        if self.inflight.get(req.id) is req:    # not dropped by a failed write
+            self._arm(req, ACK_TIMEOUT_S)
+
+    def _send_plain(self, req):
+        req.sent = time.perf_counter()
+        self.write(f"{req.line}\n".encode("utf-8", errors="ignore"))
+        self._finish(req, "sent")
+
+    def _arm(self, req, delay):
+        if req.timer is not None:
+            req.timer.cancel()
+        req.timer = self.loop.call_later(delay, self._expire, req)
+
+    def _expire(self, req):
+        req.timer = None
+        if req.status == "inflight" and req.tries <= RETRIES:
+            self._transmit(req)
+            return
+        if req.status == "inflight" and self.tagged is None:
+            # Nothing was ever acked: firmware without tagged commands, or
+            # a link slow enough that the acks are still on their way. The
+            # tagged copies may have run, so they time out rather than go
+            # out again; only requests still queued are sent plain.
+            self.tagged = False
+            for r in list(self.inflight.values()):
+                self.timeouts += 1
+                self._close(r, "timeout")
+            return
+        self.timeouts += 1
+        self._close(req, "timeout")
+
+    def _control(self, head, rid):
+        req = self.inflight.get(rid)
+        if req is None:
+            return              # a retry's duplicate ack, or already timed out
+        self.tagged = True
+        if req.acked is None:
+            req.acked = time.perf_counter()
+        if head == "NK:":
+            self.rejected += 1
+            self._close(req, "rejected")
+        elif head == "RQ:":
+            self.owner = req
+            self._arm(req, REPLY_TIMEOUT_S)
+        elif req.name not in REPLY_END:
+            self._close(req, "ok")
+        elif req.status == "inflight":
+            req.status = "acked"
+            if self.owner is not req:
+                self._arm(req, REPLY_TIMEOUT_S)
+
+    def _reply(self, req, head, line):
+        req.replies.append(line)
+        if head == REPLY_END.get(req.name):
+            self._close(req, "ok")
+
+    def _close(self, req, status):
+        if req.timer is not None:
+            req.timer.cancel()
+            req.timer = None
+        self.inflight.pop(req.id, None)
+        if self.owner is req:
+            self.owner = None
+        self._finish(req, status)
+        self._pump()
+
+    def _finish(self, req, status):
+        req.status = status
+        req.done = time.perf_counter()
+        self.finished(req)
@@ -0,0 +1,662 @@
+import asyncio
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+from Commands import CommandChannel, Request
+from Protocol import StreamDecoder, SampleReconstructor, Resequencer, HOLD_S
+from Transport import BAUD, open_serial
+
+TWIN_HISTORY = 4096
+POLL_S = 0.01
+READ_CHUNK = 4096
+RESCAN_S = 1.0
+BACKOFF_MIN_S = 0.25
+BACKOFF_MAX_S = 8.0
+MICROBIT_VID = 0x0D28
+PORT_CACHE = os.path.join(os.path.expanduser("~"), ".microbit_port.json")
+
+# ----------------------------
+# Serial connections on asyncio
+# One asyncio loop on one background thread per owner (SerialEngine for
+# the main window, DeviceManager for the device grid). Ports with a file
+# descriptor are watched with loop.add_reader(); others (Windows COM
+# ports, loopback/emulated transports) are polled. State changes are
+# reported to the UI as (kind, port, data) tuples on `.events`.
+# ----------------------------
+
+
+def is_microbit(p):
+    if getattr(p, "vid", None) == MICROBIT_VID:
+        return True
+    text = f"{p.description} {p.manufacturer or ''} {p.hwid}".lower()
+    return "micro:bit" in text or "microbit" in text or "mbed" in text or "bbc" in text
+
+
+def scan_ports():
+    # Returns (all port names, micro:bit port names, {port: hwid}).
+    from serial.tools import list_ports
+    ports = list_ports.comports()
+    return ([p.device for p in ports], [p.device for p in ports if is_microbit(p)],
+            {p.device: p.hwid for p in ports})
+
+
+def find_microbit_ports():
+    return scan_ports()[1]
+
+
+# The last port the engine connected to and its hardware ID, so the next
+# launch can open it before the first (possibly slow) port scan finishes.
+def load_port_cache(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            doc = json.load(f)
+        return doc["port"], doc.get("hwid")
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_port_cache(path, port, hwid):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"port": port, "hwid": hwid}, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _fileno(ser):
+    fileno = getattr(ser, "fileno", None)
+    try:
+        return fileno() if fileno else None
+    except Exception:
+        return None
+
+
+class LoopThread:
+    def __init__(self, name):
+        self.events = queue.SimpleQueue()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self._shutdown)
+        self.thread.join(2.0)
+
+    def _shutdown(self):
+        tasks = asyncio.all_tasks(self.loop)
+        for task in tasks:
+            task.cancel()
+
+        async def drain():
+            # wait_for() needs a few loop turns to unwind a cancellation.
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.loop.stop()
+        self.loop.create_task(drain())
+
+    def call(self, fn, *args):
+        # Run fn on the loop thread; returns a concurrent Future.
+        async def wrap():
+            return fn(*args)
+        return asyncio.run_coroutine_threadsafe(wrap(), self.loop)
+
+
+class DeviceLink:
+    # Per-board digital twin, updated on the manager thread only.
+    def __init__(self, port, ser):
+        self.port = port
+        self.ser = ser
+        self.dec = StreamDecoder()
+        self.recon = SampleReconstructor()
+        from Telemetry import TelemetryRing     # NumPy: only once a board attaches
+        self.tele = TelemetryRing(TWIN_HISTORY)
+        self.gen_state = "IDLE"
+        self.pw_len = 12
+        self.last_pw = ""
+        self.last_label = ""
+        self.passwords = 0
+        self.mode = "CHARS"
+        self.bulk = None
+        self.bulk_req = None
+        self.commands = None
+        self.bytes_in = 0
+        self.last_seen = time.monotonic()
+        self.connected = True
+
+    def feed(self, data, events):
+        self.bytes_in += len(data)
+        self.last_seen = time.monotonic()
+        batch = []
+        recon = self.recon
+        for item in self.commands.observe(self.dec.feed(data)):
+            if not isinstance(item, str):
+                recon.frame(item, batch)
+            elif item.startswith("S:") or item.startswith("D:"):
+                try:
+                    vals = tuple(int(v) for v in item[2:].split(",")[:5])
+                except ValueError:
+                    continue
+                if item[0] == "S":
+                    recon.full(vals, batch)
+                else:
+                    recon.delta(vals, batch)
+            elif item.startswith("EV:"):
+                self.gen_state = item[3:].strip().upper()
+                events.put(("state", self.port, self.gen_state))
+            elif item.startswith("PW:"):
+                self.last_pw = item[3:]
+                self.passwords += 1
+                events.put(("password", self.port, self.last_pw))
+            elif item.startswith("ST:"):
+                self.last_label = item[3:]
+            elif item.startswith("LN:") and self.mode != "PHRASE":
+                try:
+                    self.pw_len = int(item[3:])
+                except ValueError:
+                    pass
+            elif item.startswith("TM:CFG,"):
+                try:
+                    ms, th, kf, _ = item[7:].split(",")
+                    recon.configure(int(ms), int(th), int(kf))
+                except ValueError:
+                    pass
+            elif item.startswith("MD:"):
+                self.mode = item[3:].partition(",")[0].strip()
+            elif item.startswith("PB:"):
+                if self.bulk is not None:
+                    seq, _, pw = item[3:].partition(",")
+                    try:
+                        self.bulk.append((int(seq), pw))
+                    except ValueError:
+                        self.dec.bad_lines += 1
+            elif item.startswith("BE:"):
+                self.end_bulk(events)
+        if batch:
+            self.tele.append_batch(batch)
+
+    def end_bulk(self, events):
+        # ("bulk", port, ([(seq, pw), ...], mode)) once per dispatched share,
+        # complete or not, so the grid can count down its pending boards.
+        if self.bulk is not None:
+            done, self.bulk = self.bulk, None
+            self.bulk_req = None
+            events.put(("bulk", self.port, (done, self.mode)))
+
+
+class DeviceManager(LoopThread):
+    def __init__(self, baud=BAUD):
+        super().__init__("device-manager")
+        self.baud = baud
+        self.links = {}
+        self._polled = set()
+        self._poll_task = None
+
+    def _shutdown(self):
+        for link in list(self.links.values()):
+            self._drop(link, "stopped")
+        super()._shutdown()
+
+    # -- connections --
+    def connect_all(self, exclude=()):
+        return asyncio.run_coroutine_threadsafe(self._connect_all(set(exclude)), self.loop)
+
+    async def _connect_all(self, exclude):
+        ports = await self.loop.run_in_executor(None, find_microbit_ports)
+        ports = [p for p in ports if p not in exclude and p not in self.links]
+        await asyncio.gather(*(self._open(p) for p in ports))
+        return ports
+
+    async def _open(self, port):
+        try:
+            ser = await self.loop.run_in_executor(None, lambda: open_serial(port, self.baud, timeout=0))
+        except Exception as e:
+            self.events.put(("error", port, str(e)))
+            return None
+        return self._attach(port, ser)
+
+    def add_transport(self, port, transport):
+        # Attach an already open transport (e.g. an emulated board).
+        return self.call(self._attach, port, transport)
+
+    def _attach(self, port, ser):
+        link = DeviceLink(port, ser)
+        link.commands = CommandChannel(self.loop, lambda data: self._write_bytes(link, data),
+                                       lambda req: self._command_done(link, req))
+        link.commands.attached()
+        self.links[port] = link
+        fd = _fileno(ser)
+        if fd is not None:
+            try:
+                self.loop.add_reader(fd, self._on_readable, link)
+                link.fd = fd
+            except (NotImplementedError, ValueError, OSError):
+                fd = None
+        if fd is None:
+            link.fd = None
+            self._polled.add(port)
+            if self._poll_task is None:
+                self._poll_task = self.loop.create_task(self._poll())
+        self.events.put(("connected", port, None))
+        return link
+
+    def _drop(self, link, reason):
+        if link.fd is not None:
+            try:
+                self.loop.remove_reader(link.fd)
+            except Exception:
+                pass
+        self._polled.discard(link.port)
+        link.connected = False
+        self.links.pop(link.port, None)
+        link.commands.close()
+        try:
+            link.ser.close()
+        except Exception:
+            pass
+        self.events.put(("disconnected", link.port, reason))
+
+    def _read(self, link):
+        try:
+            n = link.ser.in_waiting
+            if not n:
+                return False
+            data = link.ser.read(min(n, READ_CHUNK))
+        except Exception as e:
+            self._drop(link, str(e))
+            return False
+        if data:
+            link.feed(data, self.events)
+        return bool(data)
+
+    def _on_readable(self, link):
+        # Always read at least one byte: a port that selects readable but
+        # has no data has gone away, and pyserial reports that on read().
+        try:
+            data = link.ser.read(min(link.ser.in_waiting or 1, READ_CHUNK))
+        except Exception as e:
+            self._drop(link, str(e))
+            return
+        if data:
+            link.feed(data, self.events)
+
+    async def _poll(self):
+        while self._polled:
+            busy = False
+            for port in list(self._polled):
+                link = self.links.get(port)
+                if link is not None:
+                    busy |= self._read(link)
+            # Yield every pass so a chatty board cannot starve the loop.
+            await asyncio.sleep(0 if busy else POLL_S)
+        self._poll_task = None
+
+    # -- commands --
+    # Each board has its own CommandChannel, so a bulk share that is
+    # rejected (NK:), times out or loses its board still finishes.
+    def _write_bytes(self, link, data):
+        if not link.connected:
+            return
+        try:
+            link.ser.write(data)
+        except Exception as e:
+            self._drop(link, str(e))
+
+    def _command_done(self, link, req):
+        if req is link.bulk_req and not req.ok:
+            link.end_bulk(self.events)
+
+    def send(self, port, line):
+        def go():
+            link = self.links.get(port)
+            if link:
+                link.commands.submit(Request(line))
+        self.loop.call_soon_threadsafe(go)
+
+    def broadcast(self, line):
+        def go():
+            for link in list(self.links.values()):
+                link.commands.submit(Request(line))
+        self.loop.call_soon_threadsafe(go)
+
+    def gen_all(self):
+        self.broadcast("GEN")
+
+    def bulk_all(self, total, length):
+        # Split one bulk request across every connected board; each board
+        # that gets a share reports once through DeviceLink.end_bulk().
+        # Returns the number of boards the request went to.
+        def go():
+            links = list(self.links.values())
+            if not links:
+                return 0
+            share, extra = divmod(total, len(links))
+            sent = 0
+            for i, link in enumerate(links):
+                n = share + (1 if i < extra else 0)
+                if n:
+                    link.bulk = []
+                    link.bulk_req = Request(f"GEN:{n},{length}")
+                    link.commands.submit(link.bulk_req)
+                    sent += 1
+            return sent
+        return self.call(go).result(2.0)
+
+    def snapshot(self):
+        return list(self.links.values())
+
+
+class SerialEngine(LoopThread):
+    # The main window's connection. Decoded records go to `sink` (a
+    # RecordQueue). With a fixed port the engine keeps reopening it; without
+    # one it follows the first micro:bit that is plugged in. Ports are
+    # rescanned every RESCAN_S, so unplugging drops the link at once and
+    # plugging a board back in cuts any pending backoff short.
+    #
+    # events: ("connecting", port, attempt), ("connected", port, None),
+    #         ("disconnected", port, reason), ("error", port, message),
+    #         ("waiting", None, [all ports]), ("ports", None, [all ports]),
+    #         ("command", port, finished Request)
+    #
+    # Each connection starts with SEQ:ON; a Resequencer on this thread
+    # restores the record order and asks for lost ranges with RETX:.
+    #
+    # With a `cache` path and no fixed port, the port remembered there is
+    # tried once before the first scan completes. Until the scan confirms it
+    # by hardware ID the link only reads: the command channel stays offline,
+    # so nothing (not even SEQ:ON) is written to a port that may now belong
+    # to another device. If it does, it is dropped.
+    def __init__(self, sink, port=None, transport=None, baud=BAUD, exclude=None, cache=None):
+        super().__init__("serial-engine")
+        self.sink = sink
+        self.want = port
+        self.transport = transport
+        self.baud = baud
+        self.exclude = exclude or (lambda: ())
+        self.ser = None
+        self.port = port
+        self.fd = None
+        self.dec = None
+        self.ports = []
+        self.microbits = []
+        self.hwids = {}
+        self.scanned = False
+        self.cache = cache
+        self.cached = load_port_cache(cache) if cache and not port and transport is None else None
+        self.try_cached = self.cached is not None
+        self.unconfirmed = False
+        self.backoff = BACKOFF_MIN_S
+        self.attempt = 0
+        self.connects = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.write_errors = 0
+        self.tx_dropped = 0
+        self._frames = 0
+        self._bad_frames = 0
+        self._bad_lines = 0
+        self.reseq = Resequencer()
+        self.wake = None
+        self._poll_task = None
+        self.commands = CommandChannel(self.loop, self._write, self._command_done)
+
+    def start(self):
+        super().start()
+        self.call(self._begin)
+        return self
+
+    def _begin(self):
+        self.wake = asyncio.Event()
+        self.loop.create_task(self._reorder())
+        if self.transport is not None:
+            # A supplied transport (emulator, loopback) cannot be reopened.
+            self._attach(getattr(self.transport, "port", "transport"), self.transport)
+            return
+        self.loop.create_task(self._watch())
+        self.loop.create_task(self._supervise())
+
+    def _shutdown(self):
+        self._drop("stopped")
+        super()._shutdown()
+
+    @property
+    def connected(self):
+        return self.ser is not None
+
+    @property
+    def frames(self):
+        return self._frames + (self.dec.frames if self.dec else 0)
+
+    @property
+    def bad_frames(self):
+        return self._bad_frames + (self.dec.bad_frames if self.dec else 0)
+
+    @property
+    def bad_lines(self):
+        return self._bad_lines + (self.dec.bad_lines if self.dec else 0)
+
+    # -- hot-plug --
+    async def _watch(self):
+        while True:
+            try:
+                ports, microbits, self.hwids = await self.loop.run_in_executor(None, scan_ports)
+            except Exception:
+                ports, microbits = self.ports, self.microbits
+            if not self.scanned:
+                self.scanned = True
+                self.wake.set()
+            if ports != self.ports:
+                gone = set(self.ports) - set(ports)
+                added = set(ports) - set(self.ports)
+                self.ports = ports
+                self.events.put(("ports", None, list(ports)))
+                if self.ser is not None and self.port in gone:
+                    self._drop("unplugged")
+                if added:
+                    self.wake.set()
+            self.microbits = microbits
+            if self.ser is not None:
+                self._check_cached()
+                self._remember()
+            await asyncio.sleep(RESCAN_S)
+
+    def _check_cached(self):
+        if self.cached is None or self.port != self.cached[0]:
+            return
+        if self.port not in self.microbits and self.hwids.get(self.port) != self.cached[1]:
+            self.cached = None
+            self._drop("cached port is now a different device")
+        elif self.unconfirmed:
+            self.unconfirmed = False
+            self._online()
+
+    def _remember(self):
+        if not self.cache:
+            return
+        hwid = self.hwids.get(self.port)
+        if hwid is None or self.cached == (self.port, hwid):
+            return
+        self.cached = (self.port, hwid)
+        save_port_cache(self.cache, self.port, hwid)
+
+    def _candidate(self):
+        if self.want:
+            return self.want
+        if self.try_cached and not self.scanned:
+            self.try_cached = False
+            return self.cached[0]
+        busy = set(self.exclude())
+        for p in self.microbits:
+            if p not in busy:
+                return p
+        return None
+
+    async def _pause(self, timeout):
+        try:
+            await asyncio.wait_for(self.wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.wake.clear()
+
+    async def _supervise(self):
+        await asyncio.sleep(0)
+        while True:
+            if self.ser is not None:
+                await self._pause(None)
+                continue
+            port = self._candidate()
+            if port is None:
+                if self.scanned:
+                    self.events.put(("waiting", None, list(self.ports)))
+                await self._pause(RESCAN_S)
+                continue
+            self.attempt += 1
+            self.events.put(("connecting", port, self.attempt))
+            try:
+                ser = await self.loop.run_in_executor(
+                    None, lambda: open_serial(port, self.baud, timeout=0))
+            except Exception as e:
+                self.events.put(("error", port, str(e)))
+                if not self.scanned and not self.want:
+                    # The cached port is gone; wait for the scan instead.
+                    continue
+                # Backoff with jitter; a newly plugged port ends it early.
+                await self._pause(self.backoff * random.uniform(0.8, 1.2))
+                self.backoff = min(BACKOFF_MAX_S, self.backoff * 2)
+                continue
+            self._attach(port, ser)
+
+    # -- link --
+    def _attach(self, port, ser):
+        self.ser = ser
+        self.port = port
+        if self.dec is not None:
+            self._frames += self.dec.frames
+            self._bad_frames += self.dec.bad_frames
+            self._bad_lines += self.dec.bad_lines
+        self.reseq.restart()
+        self.dec = StreamDecoder(self.reseq)
+        self.connects += 1
+        self.events.put(("connected", port, None))
+        self.unconfirmed = not self.scanned and self.cached is not None and port == self.cached[0]
+        if not self.unconfirmed:
+            self._online()
+        if self.scanned:
+            self._remember()
+        fd = _fileno(ser)
+        if fd is not None:
+            try:
+                self.loop.add_reader(fd, self._on_readable)
+            except (NotImplementedError, ValueError, OSError):
+                fd = None
+        self.fd = fd
+        if fd is None:
+            self._poll_task = self.loop.create_task(self._poll(ser))
+
+    def _online(self):
+        self.commands.attached()
+        self.commands.submit(Request("SEQ:ON"))
+
+    def _drop(self, reason):
+        ser = self.ser
+        if ser is None:
+            return
+        self.ser = None
+        self.unconfirmed = False
+        if self.fd is not None:
+            try:
+                self.loop.remove_reader(self.fd)
+            except Exception:
+                pass
+            self.fd = None
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+        try:
+            ser.close()
+        except Exception:
+            pass
+        self.commands.detached()
+        self.events.put(("disconnected", self.port, reason))
+        if self.wake is not None:
+            self.wake.set()
+
+    def _feed(self, data):
+        self.bytes_in += len(data)
+        if self.attempt:
+            # Data flowing again: the link is healthy, reset the backoff.
+            self.attempt = 0
+            self.backoff = BACKOFF_MIN_S
+        self.sink.put_batch(self.commands.observe(self.dec.feed(data)))
+        if self.reseq.requests:
+            self._request_lost()
+
+    def _request_lost(self):
+        for a, b in self.reseq.take_requests():
+            self.commands.submit(Request(f"RETX:{a},{b}" if a != b else f"RETX:{a}"))
+
+    async def _reorder(self):
+        # Releases records held behind a gap once it is filled or given up.
+        while True:
+            await asyncio.sleep(HOLD_S / 5)
+            items = self.reseq.expire()
+            if items:
+                self.sink.put_batch(self.commands.observe(items))
+
+    def _on_readable(self):
+        ser = self.ser
+        try:
+            data = ser.read(min(ser.in_waiting or 1, READ_CHUNK))
+        except Exception as e:
+            self._drop(str(e))
+            return
+        if data:
+            self._feed(data)
+
+    async def _poll(self, ser):
+        while self.ser is ser:
+            try:
+                n = ser.in_waiting
+                data = ser.read(min(n, READ_CHUNK)) if n else b""
+            except Exception as e:
+                self._drop(str(e))
+                return
+            if data:
+                self._feed(data)
+            await asyncio.sleep(0 if data else POLL_S)
+
+    # -- commands --
+    def _write(self, data):
+        if self.ser is None:
+            self.tx_dropped += 1
+            return
+        try:
+            self.ser.write(data)
+        except Exception as e:
+            self.write_errors += 1
+            self._drop(str(e))
+            return
+        self.bytes_out += len(data)
+
+    def send(self, line, on_done=None):
+        # Queues a command from any thread; returns its Request. Completion
+        # is reported as a ("command", port, req) event.
+        req = Request(line.strip(), on_done)
+        self.loop.call_soon_threadsafe(self.commands.submit, req)
+        return req
+
+    def _command_done(self, req):
+        if req.status == "dropped":
+            self.tx_dropped += 1
+        self.events.put(("command", self.port, req))
@@ -0,0 +1,380 @@
+import argparse
+import builtins
+import math
+import os
+import random
+import threading
+import time
+import types
+
+from Transport import loopback_pair, PtyEnd
+
+FIRMWARE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "MB.py")
+
+# ----------------------------
+# In-process micro:bit emulator
+# Runs the unmodified MB.py against a simulated `microbit` module. The
+# firmware's sleep()/running_time() go through a VirtualClock, so
+# speed=10 runs it ten times faster than wall-clock time and speed=0
+# runs it as fast as the host allows.
+#
+# utime.ticks_us() is the host's own clock, so STATS section timings show
+# what the firmware costs on this machine, not on the board. gc.mem_free()
+# follows a rough heap model: every byte written to the UART leaves
+# HEAP_GARBAGE bytes of string garbage behind until the next collection,
+# which runs on gc.collect() or when the heap is full.
+# ----------------------------
+HEAP_BYTES = 64 * 1024
+HEAP_LIVE = 22 * 1024
+HEAP_GARBAGE = 3
+
+
+class EmulatorStopped(BaseException):
+    pass
+
+
+class MicrobitFile:
+    # A host file cut down to what micro:bit MicroPython files offer, so
+    # firmware that calls seek()/tell() fails here as it would on a board.
+    def __init__(self, f):
+        self._f = f
+
+    def read(self, *args):
+        return self._f.read(*args)
+
+    def readinto(self, buf):
+        return self._f.readinto(buf)
+
+    def readline(self):
+        return self._f.readline()
+
+    def write(self, data):
+        return self._f.write(data)
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class VirtualClock:
+    def __init__(self, speed=1.0):
+        self.speed = speed
+        self.virt_ms = 0.0
+        self.t0 = time.monotonic()
+
+    def now_ms(self):
+        if self.speed <= 0:
+            return int(self.virt_ms)
+        return int(self.virt_ms + (time.monotonic() - self.t0) * 1000.0 * self.speed)
+
+    def sleep(self, ms):
+        if self.speed <= 0:
+            self.virt_ms += ms
+            return
+        time.sleep(ms / 1000.0 / self.speed)
+
+
+class RestingSensors:
+    # Board lying flat with sensor noise, optionally shaken now and then.
+    def __init__(self, noise=12, shake_every_ms=0, shake_ms=600, seed=None):
+        self.rng = random.Random(seed)
+        self.noise = noise
+        self.shake_every_ms = shake_every_ms
+        self.shake_ms = shake_ms
+
+    def __call__(self, t_ms):
+        n = self.noise
+        g = self.rng.gauss
+        ax, ay, az = g(0, n), g(0, n), g(-1024, n)
+        if self.shake_every_ms and (t_ms % self.shake_every_ms) < self.shake_ms:
+            ph = t_ms / 40.0
+            ax += 1400 * math.sin(ph)
+            ay += 900 * math.cos(ph * 1.3)
+            az += 600 * math.sin(ph * 0.7)
+        sl = int(clamp_i(g(40, 8), 0, 255))
+        return int(ax), int(ay), int(az), sl
+
+
+class RecordedSensors:
+    # Plays back (ms, ax, ay, az, sl) samples, looping over the recording.
+    def __init__(self, samples):
+        if not samples:
+            raise ValueError("empty recording")
+        self.samples = list(samples)
+        self.t0 = self.samples[0][0]
+        self.span = max(1, self.samples[-1][0] - self.t0 + 1)
+        self.i = 0
+
+    @classmethod
+    def from_file(cls, path):
+        samples = []
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                line = line.strip()
+                if not line.startswith("S:"):
+                    continue
+                try:
+                    samples.append(tuple(int(p) for p in line[2:].split(",")[:5]))
+                except ValueError:
+                    pass
+        return cls(samples)
+
+    def __call__(self, t_ms):
+        t = self.t0 + (t_ms % self.span)
+        s = self.samples
+        if s[self.i][0] > t:
+            self.i = 0
+        while self.i + 1 < len(s) and s[self.i + 1][0] <= t:
+            self.i += 1
+        return s[self.i][1:5]
+
+
+def clamp_i(x, a, b):
+    return a if x < a else (b if x > b else x)
+
+
+class _Button:
+    def __init__(self):
+        self.presses = 0
+        self.down = False
+
+    def was_pressed(self):
+        p = self.presses
+        self.presses = 0
+        return p > 0
+
+    def is_pressed(self):
+        return self.down
+
+    def get_presses(self):
+        p = self.presses
+        self.presses = 0
+        return p
+
+
+class DeviceEmulator:
+    def __init__(self, port, sensors=None, speed=1.0, mic=True, firmware=FIRMWARE):
+        self.port = port
+        port.timeout = 0
+        self.sensors = sensors or RestingSensors()
+        self.clock = VirtualClock(speed)
+        self.mic = mic
+        self.firmware = firmware
+        self.stop_evt = threading.Event()
+        self.thread = None
+        self.error = None
+        self.button_a = _Button()
+        self.button_b = _Button()
+        self.display_log = []
+        self._last = (0, 0, -1024, 0)
+        self._last_t = None
+        self._prev_mag = 1024.0
+        self._shake = False
+        self.heap_used = HEAP_LIVE
+        self.collections = 0
+        self.modules = self._build_modules()
+
+    # -- sensor sampling shared by accelerometer and microphone shims --
+    def _sample(self):
+        t = self.clock.now_ms()
+        if t != self._last_t:
+            self._last_t = t
+            self._last = tuple(self.sensors(t))
+            ax, ay, az, _ = self._last
+            mag = math.sqrt(ax * ax + ay * ay + az * az)
+            if abs(mag - self._prev_mag) > 900:
+                self._shake = True
+            self._prev_mag = mag
+        return self._last
+
+    def _sleep(self, ms):
+        if self.stop_evt.is_set():
+            raise EmulatorStopped()
+        self.clock.sleep(ms)
+
+    def _alloc(self, n):
+        self.heap_used += n
+        if self.heap_used > HEAP_BYTES:
+            self._collect()
+
+    def _collect(self):
+        self.heap_used = HEAP_LIVE
+        self.collections += 1
+
+    def _build_modules(self):
+        dev = self
+        port = self.port
+
+        mb = types.ModuleType("microbit")
+
+        class _Uart:
+            def init(self, baudrate=115200, **kw):
+                pass
+
+            def write(self, data):
+                if isinstance(data, memoryview):
+                    data = bytes(data)
+                dev._alloc(len(data) * HEAP_GARBAGE)
+                return port.write(data)
+
+            def any(self):
+                return port.in_waiting > 0
+
+            def readline(self):
+                return port.readline() or None
+
+            def read(self, n=None):
+                return port.read(n or port.in_waiting) or None
+
+        class _Accel:
+            def get_x(self):
+                return dev._sample()[0]
+
+            def get_y(self):
+                return dev._sample()[1]
+
+            def get_z(self):
+                return dev._sample()[2]
+
+            def get_values(self):
+                return tuple(dev._sample()[0:3])
+
+            def was_gesture(self, name):
+                if name == "shake" and dev._shake:
+                    dev._shake = False
+                    return True
+                return False
+
+        class _Display:
+            def scroll(self, text, **kw):
+                dev.display_log.append(str(text))
+
+            def show(self, img, **kw):
+                dev.display_log.append(img)
+
+            def clear(self):
+                pass
+
+        class _Image:
+            DIAMOND_SMALL = "DIAMOND_SMALL"
+            MUSIC_QUAVER = "MUSIC_QUAVER"
+
+        mb.uart = _Uart()
+        mb.accelerometer = _Accel()
+        mb.display = _Display()
+        mb.Image = _Image
+        mb.button_a = self.button_a
+        mb.button_b = self.button_b
+        mb.running_time = self.clock.now_ms
+        mb.sleep = self._sleep
+
+        mic = types.ModuleType("microphone")
+        mic.sound_level = lambda: dev._sample()[3]
+
+        utime = types.ModuleType("utime")
+        utime.ticks_us = lambda: int(time.perf_counter() * 1000000)
+        utime.ticks_ms = lambda: int(time.perf_counter() * 1000)
+        utime.ticks_diff = lambda a, b: a - b
+
+        gc = types.ModuleType("gc")
+        gc.collect = self._collect
+        gc.mem_free = lambda: HEAP_BYTES - dev.heap_used
+        gc.mem_alloc = lambda: dev.heap_used
+
+        return {"microbit": mb, "microphone": mic, "utime": utime, "gc": gc}
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if name in self.modules:
+            if name == "microphone" and not self.mic:
+                raise ImportError("no microphone")
+            return self.modules[name]
+        return builtins.__import__(name, globals, locals, fromlist, level)
+
+    def _open(self, path, mode="r", *args, **kwargs):
+        # The micro:bit filesystem is flat; files flashed next to MB.py
+        # (phrase.mbwl) are looked up beside the firmware, not in the cwd.
+        if not os.path.isabs(path):
+            path = os.path.join(os.path.dirname(os.path.abspath(self.firmware)), path)
+        return MicrobitFile(open(path, mode, *args, **kwargs))
+
+    # -- scripted input --
+    def press(self, which="ab", hold_ms=60):
+        buttons = [b for k, b in (("a", self.button_a), ("b", self.button_b)) if k in which]
+        for b in buttons:
+            b.down = True
+            b.presses += 1
+        t = threading.Timer(hold_ms / 1000.0 / (self.clock.speed or 1000.0), self._release, (buttons,))
+        t.daemon = True
+        t.start()
+
+    def _release(self, buttons):
+        for b in buttons:
+            b.down = False
+
+    # -- lifecycle --
+    def start(self):
+        with open(self.firmware, "r", encoding="utf-8") as f:
+            code = compile(f.read(), self.firmware, "exec")
+        env_builtins = dict(vars(builtins))
+        env_builtins["__import__"] = self._import
+        env_builtins["open"] = self._open
+        env = {"__name__": "__microbit__", "__builtins__": env_builtins}
+
+        def run():
+            try:
+                exec(code, env)
+            except EmulatorStopped:
+                pass
+            except Exception as e:
+                self.error = e
+
+        self.thread = threading.Thread(target=run, name="mb-emulator", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self.stop_evt.set()
+        if self.thread:
+            self.thread.join(timeout)
+
+
+def emulated_transport(speed=1.0, sensors=None, mic=True):
+    # Returns (host_end, emulator) with the emulator already running.
+    host, device = loopback_pair("emu")
+    emu = DeviceEmulator(device, sensors=sensors, speed=speed, mic=mic).start()
+    return host, emu
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run MB.py behind a pseudo-terminal.")
+    ap.add_argument("--speed", type=float, default=1.0, help="time acceleration (0 = as fast as possible)")
+    ap.add_argument("--replay", help="file of recorded S: lines to use as sensor input")
+    ap.add_argument("--shake-every", type=int, default=0, help="simulate a shake every N ms")
+    ap.add_argument("--no-mic", action="store_true", help="emulate a V1 board without microphone")
+    args = ap.parse_args()
+
+    if args.replay:
+        sensors = RecordedSensors.from_file(args.replay)
+    else:
+        sensors = RestingSensors(shake_every_ms=args.shake_every)
+    pty = PtyEnd()
+    emu = DeviceEmulator(pty, sensors=sensors, speed=args.speed, mic=not args.no_mic).start()
+    print(f"Emulated micro:bit on {pty.port} (speed {args.speed}x). Ctrl-C to stop.", flush=True)
+    try:
+        while emu.thread.is_alive():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    emu.stop()
+    pty.close()
+    if emu.error:
+        raise emu.error
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import hashlib
+import hmac
+import math
+import os
+import struct
+import threading
+import time
+
+# ----------------------------
+# Host-side entropy pool + HMAC-DRBG (NIST SP 800-90A, SHA-256)
+#
+# Every telemetry sample, device event timestamp and device password is
+# absorbed into a SHA-512 accumulator. Only sensor jitter is credited, and
+# conservatively so. The DRBG is instantiated once the pool holds
+# SEED_BITS credited bits and reseeded from fresh pool output as more
+# arrives, so passwords can be produced locally at any rate while staying
+# anchored to the board's physical noise.
+# ----------------------------
+SEED_BITS = 256
+RESEED_BITS = 128
+RESEED_INTERVAL = 4096          # generate() calls before a reseed is forced
+MAX_BITS_PER_AXIS = 2.0
+CREDIT_SCALE = 0.5              # safety factor applied to the jitter estimate
+EVENT_CREDIT = 0.5
+
+LOWER = "abcdefghijklmnopqrstuvwxyz"
+UPPER = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+DIGIT = "0123456789"
+SYMBOL = "!@#$%^&*()-_=+[]{};:,.?/"
+ALLSET = LOWER + UPPER + DIGIT + SYMBOL
+
+
+class EntropyPool:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.h = hashlib.sha512()
+        self.bits = 0.0
+        self.total_bits = 0.0
+        self.samples = 0
+        self.prev = None
+
+    def _credit(self, samples):
+        prev = self.prev
+        bits = 0.0
+        for s in samples:
+            if prev is not None:
+                for k in (1, 2, 3):
+                    d = abs(s[k] - prev[k])
+                    if d:
+                        bits += min(MAX_BITS_PER_AXIS, math.log2(1 + d))
+            prev = s
+        self.prev = prev
+        return bits * CREDIT_SCALE
+
+    def add_samples(self, samples):
+        if not samples:
+            return
+        flat = [v for s in samples for v in s[:5]]
+        data = struct.pack(f"<{len(flat)}i", *flat)
+        with self.lock:
+            self.h.update(b"S")
+            self.h.update(data)
+            self.h.update(struct.pack("<Q", time.perf_counter_ns()))
+            credit = self._credit(samples)
+            self.bits += credit
+            self.total_bits += credit
+            self.samples += len(samples)
+
+    def add_event(self, tag):
+        with self.lock:
+            self.h.update(b"E" + tag.encode("utf-8", "ignore"))
+            self.h.update(struct.pack("<Q", time.perf_counter_ns()))
+            self.bits += EVENT_CREDIT
+            self.total_bits += EVENT_CREDIT
+
+    def add_password(self, pw):
+        # Device passwords come from the same sensors, so they are mixed in
+        # without any entropy credit.
+        with self.lock:
+            self.h.update(b"P" + pw.encode("utf-8", "ignore"))
+
+    def extract(self):
+        with self.lock:
+            out = self.h.digest()
+            bits = min(self.bits, 8 * len(out))
+            self.h = hashlib.sha512(b"X" + out)
+            self.bits = 0.0
+        return out, bits
+
+
+class NeedsReseed(Exception):
+    pass
+
+
+class HmacDrbg:
+    def __init__(self, entropy, nonce=b"", personalization=b""):
+        self.K = b"\x00" * 32
+        self.V = b"\x01" * 32
+        self._update(entropy + nonce + personalization)
+        self.reseed_counter = 1
+
+    def _hmac(self, key, data):
+        return hmac.digest(key, data, "sha256")
+
+    def _update(self, data=b""):
+        self.K = self._hmac(self.K, self.V + b"\x00" + data)
+        self.V = self._hmac(self.K, self.V)
+        if data:
+            self.K = self._hmac(self.K, self.V + b"\x01" + data)
+            self.V = self._hmac(self.K, self.V)
+
+    def reseed(self, entropy, additional=b""):
+        self._update(entropy + additional)
+        self.reseed_counter = 1
+
+    def generate(self, n, additional=b""):
+        if self.reseed_counter > RESEED_INTERVAL:
+            raise NeedsReseed()
+        if additional:
+            self._update(additional)
+        out = bytearray()
+        while len(out) < n:
+            self.V = self._hmac(self.K, self.V)
+            out += self.V
+        self._update(additional)
+        self.reseed_counter += 1
+        return bytes(out[:n])
+
+
+class HostGenerator:
+    # Password generator on top of the pool-seeded DRBG. Same policy as
+    # MB.py (one of each class, filled from the full set, shuffled) but
+    # with rejection sampling so every index is unbiased.
+    def __init__(self, pool, chunk=4096):
+        self.pool = pool
+        self.chunk = chunk
+        self.drbg = None
+        self.buf = b""
+        self.pos = 0
+        self.reseeds = 0
+
+    def ready(self):
+        return self.drbg is not None or self.pool.bits >= SEED_BITS
+
+    def seed_progress(self):
+        if self.drbg is not None:
+            return 1.0
+        return min(1.0, self.pool.bits / SEED_BITS)
+
+    def _refill(self):
+        if self.drbg is None:
+            if self.pool.bits < SEED_BITS:
+                raise NeedsReseed()
+            seed, _ = self.pool.extract()
+            nonce = struct.pack("<Q", time.time_ns()) + os.urandom(16)
+            self.drbg = HmacDrbg(seed, nonce, b"microbit-password-vault")
+        elif self.pool.bits >= RESEED_BITS:
+            seed, _ = self.pool.extract()
+            self.drbg.reseed(seed)
+            self.reseeds += 1
+        self.buf = self.drbg.generate(self.chunk)
+        self.pos = 0
+
+    def _u32(self):
+        if self.pos + 4 > len(self.buf):
+            self._refill()
+        v = int.from_bytes(self.buf[self.pos:self.pos + 4], "little")
+        self.pos += 4
+        return v
+
+    def randbelow(self, n):
+        if n <= 1:
+            return 0
+        limit = (1 << 32) - ((1 << 32) % n)
+        while True:
+            v = self._u32()
+            if v < limit:
+                return v % n
+
+    def password(self, length):
+        length = max(8, int(length))
+        chars = [LOWER[self.randbelow(len(LOWER))],
+                 UPPER[self.randbelow(len(UPPER))],
+                 DIGIT[self.randbelow(len(DIGIT))],
+                 SYMBOL[self.randbelow(len(SYMBOL))]]
+        while len(chars) < length:
+            chars.append(ALLSET[self.randbelow(len(ALLSET))])
+        for i in range(len(chars) - 1, 0, -1):
+            j = self.randbelow(i + 1)
+            chars[i], chars[j] = chars[j], chars[i]
+        return "".join(chars)
+
+    def passwords(self, count, length):
+        return [self.password(length) for _ in range(count)]
+
+    def phrase(self, words, wordlist, sep="-"):
+        n = len(wordlist)
+        return sep.join(wordlist[self.randbelow(n)] for _ in range(max(1, int(words))))
+
+    def phrases(self, count, words, wordlist, sep="-"):
+        return [self.phrase(words, wordlist, sep) for _ in range(count)]
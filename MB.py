@@ -1,8 +1,18 @@
 from microbit import *
+import struct
+import gc
+try:
+    from utime import ticks_us, ticks_diff
+except ImportError:
+    def ticks_us():
+        return running_time() * 1000
+    def ticks_diff(a, b):
+        return a - b
 
 uart.init(baudrate=115200)
 
-# Micro:bit V2 microphone support (V1 will fall back automatically)
+# Micro:bit V2 microphone support. The script targets V2; a V1 has no
+# microphone and too little RAM (16 KB) to compile it.
 HAS_MIC = False
 try:
     import microphone
@@ -10,10 +20,84 @@ try:
 except ImportError:
     HAS_MIC = False
 
+# ----------------------------
+# Profiler (STATS)
+# Cheap enough to leave on: each timed section adds its ticks_us() span
+# to a count/total/max slot. Loop iterations, telemetry periods skipped
+# by a late send_sensor() and the lowest gc.mem_free() seen are kept as
+# well; STATS reports everything since the previous STATS on one line:
+#   SX:ms=..,loops=..,missed=..,free=..,minfree=..,gcs=..,<section>=n/us/max
+# A rise in mem_free between two samples means a collection ran.
+# ----------------------------
+SECTIONS = ("loop", "entropy", "sensor", "inputs", "uart", "phase", "display", "genpw")
+P_LOOP = 0
+P_ENTROPY = 1
+P_SENSOR = 2
+P_INPUTS = 3
+P_UART = 4
+P_PHASE = 5
+P_DISPLAY = 6
+P_GENPW = 7
+MEM_EVERY = 32
+
+_p_n = [0] * len(SECTIONS)
+_p_us = [0] * len(SECTIONS)
+_p_max = [0] * len(SECTIONS)
+_loops = 0
+_missed = 0
+_mem_free = 0
+_mem_min = 0
+_gcs = 0
+_stats_t = running_time()
+
+def prof(i, t0):
+    # -> now in ticks_us, so consecutive sections can chain.
+    t = ticks_us()
+    dt = ticks_diff(t, t0)
+    _p_n[i] += 1
+    _p_us[i] += dt
+    if dt > _p_max[i]:
+        _p_max[i] = dt
+    return t
+
+def sample_mem():
+    global _mem_free, _mem_min, _gcs
+    f = gc.mem_free()
+    if _mem_free and f > _mem_free:
+        _gcs += 1
+    _mem_free = f
+    if not _mem_min or f < _mem_min:
+        _mem_min = f
+
+def report_stats(now):
+    global _loops, _missed, _mem_min, _gcs, _stats_t
+    sample_mem()
+    s = ("SX:ms=" + str(now - _stats_t) + ",loops=" + str(_loops) + ",missed=" + str(_missed) +
+         ",free=" + str(_mem_free) + ",minfree=" + str(_mem_min) + ",gcs=" + str(_gcs))
+    for i in range(len(SECTIONS)):
+        s += "," + SECTIONS[i] + "=" + str(_p_n[i]) + "/" + str(_p_us[i]) + "/" + str(_p_max[i])
+        _p_n[i] = 0
+        _p_us[i] = 0
+        _p_max[i] = 0
+    emit(s + "\n")
+    _loops = 0
+    _missed = 0
+    _mem_min = _mem_free
+    _gcs = 0
+    _stats_t = now
+
 # ----------------------------
 # PRNG + entropy mixing
+# Sensor readings are folded into an 8-word (256-bit) pool, one word per
+# reading, round robin; button, gesture and sound events only step the
+# 32-bit mixer, whose state goes into the next pool word. Output is
+# never the pool itself: refill_word() takes a fresh reading, stirs the
+# whole pool through the mixer and hands out the mixer state.
 # ----------------------------
 _state = 0xA3C59AC3
+POOL_WORDS = 8
+_pool = [0] * POOL_WORDS
+_pool_i = 0
 
 def _u32(x):
     return x & 0xFFFFFFFF
@@ -26,7 +110,13 @@ def mix_entropy(v):
     _state ^= _u32(_state >> 17)
     _state ^= _u32(_state << 5)
 
-def sample_entropy():
+def pool_add(v):
+    global _pool_i
+    mix_entropy(v)
+    _pool[_pool_i] ^= _state
+    _pool_i = (_pool_i + 1) % POOL_WORDS
+
+def sensor_word():
     t = running_time()
     ax = accelerometer.get_x()
     ay = accelerometer.get_y()
@@ -34,13 +124,65 @@ def sample_entropy():
     v = t ^ (ax << 1) ^ (ay << 2) ^ (az << 3)
     if HAS_MIC:
         v ^= (microphone.sound_level() << 8)
-    mix_entropy(v)
+    return v
+
+def sample_entropy():
+    pool_add(sensor_word())
+
+def refill_word():
+    pool_add(sensor_word())
+    for w in _pool:
+        mix_entropy(w)
+    return _state
+
+# ----------------------------
+# Bit buffer + unbiased range reduction
+# Sensors are polled in the background (main loop, shake bursts, PRE
+# phase) to fill the pool. Draws are served 32 bits at a time, and every
+# 32-bit refill reads the sensors again and stirs the whole pool. A
+# 24-char password takes about 12 refills (7-bit draws for the 86-char
+# set, about 67% accepted, plus the shuffle) instead of ~50 sensor reads,
+# and never rests on a single 32-bit state. randbelow() rejects
+# out-of-range draws instead of taking _state % n, which was biased for
+# n that are not powers of two.
+# ----------------------------
+_bitbuf = 0
+_bitcnt = 0
+_widths = {}
+
+def getbits(k):
+    global _bitbuf, _bitcnt
+    if _bitcnt < k:
+        _bitbuf = (_bitbuf << 32) | refill_word()
+        _bitcnt += 32
+    _bitcnt -= k
+    v = _bitbuf >> _bitcnt
+    _bitbuf &= (1 << _bitcnt) - 1
+    return v
+
+def flush_bits():
+    # Drop buffered bits so the next draw reflects the latest sensor mix.
+    global _bitbuf, _bitcnt
+    _bitbuf = 0
+    _bitcnt = 0
+
+def bit_width(n):
+    k = _widths.get(n)
+    if k is None:
+        k = 0
+        while (1 << k) < n:
+            k += 1
+        _widths[n] = k
+    return k
 
 def randbelow(n):
-    sample_entropy()
     if n <= 1:
         return 0
-    return _state % n
+    k = bit_width(n)
+    while True:
+        v = getbits(k)
+        if v < n:
+            return v
 
 # ----------------------------
 # Password generation
@@ -49,6 +191,7 @@ LOWER = "abcdefghijklmnopqrstuvwxyz"
 UPPER = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
 DIGIT = "0123456789"
 SYMBOL = "!@#$%^&*()-_=+[]{};:,.?/"
+ALLSET = LOWER + UPPER + DIGIT + SYMBOL
 
 def shuffle_list(items):
     i = len(items) - 1
@@ -58,61 +201,308 @@ def shuffle_list(items):
         i -= 1
 
 def generate_password(length):
+    t0 = ticks_us()
     if length < 8:
         length = 8
+    sample_entropy()
+    flush_bits()
     chars = []
     chars.append(LOWER[randbelow(len(LOWER))])
     chars.append(UPPER[randbelow(len(UPPER))])
     chars.append(DIGIT[randbelow(len(DIGIT))])
     chars.append(SYMBOL[randbelow(len(SYMBOL))])
-    allset = LOWER + UPPER + DIGIT + SYMBOL
     while len(chars) < length:
-        chars.append(allset[randbelow(len(allset))])
+        chars.append(ALLSET[randbelow(len(ALLSET))])
     shuffle_list(chars)
-    return "".join(chars)
+    pw = "".join(chars)
+    prof(P_GENPW, t0)
+    return pw
 
 def strength_label(pw):
-    length = len(pw)
-    has_l = False
-    has_u = False
-    has_d = False
-    has_s = False
+    # Same rules and labels as Strength.py on the host. Anything that is
+    # not a letter or digit counts as a symbol.
+    mask = 0
     for c in pw:
         if c in LOWER:
-            has_l = True
+            mask |= 1
         elif c in UPPER:
-            has_u = True
+            mask |= 2
         elif c in DIGIT:
-            has_d = True
-        elif c in SYMBOL:
-            has_s = True
-    classes = (1 if has_l else 0) + (1 if has_u else 0) + (1 if has_d else 0) + (1 if has_s else 0)
+            mask |= 4
+        else:
+            mask |= 8
+    classes = (mask & 1) + ((mask >> 1) & 1) + ((mask >> 2) & 1) + (mask >> 3)
+    length = len(pw)
     if length >= 14 and classes == 4:
         return "STRONG"
     if length >= 12 and classes >= 3:
-        return "OK"
+        return "GOOD"
     if length >= 10 and classes >= 2:
         return "FAIR"
     return "WEAK"
 
+# ----------------------------
+# Passphrases (MODE:PHRASE,<words>)
+# The word list lives in its own file on the micro:bit filesystem
+# (phrase.mbwl, written by `python Wordlist.py firmware`), not in this
+# script, so it costs no RAM at compile time. The file holds words
+# grouped by length, each group a fixed-stride run of letters behind a
+# small header. micro:bit files have no seek(), so open_wordlist() reads
+# the whole list (about 10 KB) once, on the first MODE:PHRASE, and word i
+# is then a slice of it. 2048 words make randbelow() take exactly 11 bits
+# per word with no rejections.
+# Passphrases are labelled by entropy, with the same thresholds as
+# Strength.py: 55 bits FAIR, 66 GOOD, 77 STRONG.
+# ----------------------------
+SEPARATOR = "-"
+WORDS_MIN = 3
+WORDS_MAX = 10
+WORD_BITS = 11
+WORD_COUNT = 2048
+WORDLIST = "phrase.mbwl"
+word_groups = ()
+_wl = None
+
+def open_wordlist():
+    global _wl, word_groups
+    if _wl is not None:
+        return True
+    try:
+        with open(WORDLIST, "rb") as f:
+            data = f.read()
+    except (OSError, MemoryError):
+        return False
+    if len(data) < 10 or data[:4] != b"MBWL" or data[4] != 1:
+        return False
+    ngroups = data[5]
+    if struct.unpack("<I", data[6:10])[0] != WORD_COUNT:
+        return False
+    base = 10 + ngroups * 9
+    groups = []
+    for k in range(ngroups):
+        n, first, off = struct.unpack("<BII", data[10 + k * 9:19 + k * 9])
+        groups.append((n, first, base + off))
+    word_groups = tuple(groups)
+    _wl = data
+    return True
+
+def word_at(i):
+    g = word_groups[0]
+    for grp in word_groups:
+        if grp[1] > i:
+            break
+        g = grp
+    off = g[2] + (i - g[1]) * g[0]
+    return _wl[off:off + g[0]].decode()
+
+def generate_phrase(words):
+    t0 = ticks_us()
+    sample_entropy()
+    flush_bits()
+    out = []
+    for _ in range(words):
+        out.append(word_at(randbelow(WORD_COUNT)))
+    pw = SEPARATOR.join(out)
+    prof(P_GENPW, t0)
+    return pw
+
+def phrase_label(words):
+    bits = words * WORD_BITS
+    if bits >= 77:
+        return "STRONG"
+    if bits >= 66:
+        return "GOOD"
+    if bits >= 55:
+        return "FAIR"
+    return "WEAK"
+
+# ----------------------------
+# Sequenced output (SEQ:ON / SEQ:OFF)
+# With sequencing on, every record gets a 16-bit sequence number: text
+# lines as "#<seq>:<record>", binary frames as type 0x02 with seq:u16le
+# after the samples. The last RING_N records are kept as sent, so a lost
+# range can be requested again with RETX:<from>,<to>. Seqs that have left
+# the ring are answered with an unsequenced GP:<from>,<to>; a backwards
+# range is rejected (NK).
+# ----------------------------
+seq_on = False
+_seq = 0
+RING_N = 24
+_ring = [None] * RING_N
+_ring_seq = [-1] * RING_N
+
+def _keep(rec):
+    global _seq
+    i = _seq % RING_N
+    _ring[i] = rec
+    _ring_seq[i] = _seq
+    _seq = (_seq + 1) & 0xFFFF
+
+def emit(line):
+    if seq_on:
+        line = "#" + str(_seq) + ":" + line
+        _keep(line)
+    uart.write(line)
+
+def retransmit(a, b):
+    n = (b - a) & 0xFFFF
+    if n >= 0x8000:
+        return False            # backwards range
+    if n >= RING_N:
+        # More than the ring holds: give up on the old part at once.
+        uart.write("GP:" + str(a) + "," + str((b - RING_N) & 0xFFFF) + "\n")
+        a = (b - RING_N + 1) & 0xFFFF
+        n = RING_N - 1
+    lo = -1
+    prev = a
+    for k in range(n + 1):
+        s = (a + k) & 0xFFFF
+        i = s % RING_N
+        if _ring_seq[i] == s:
+            if lo >= 0:
+                uart.write("GP:" + str(lo) + "," + str(prev) + "\n")
+                lo = -1
+            uart.write(_ring[i])
+        elif lo < 0:
+            lo = s
+        prev = s
+    if lo >= 0:
+        uart.write("GP:" + str(lo) + "," + str(prev) + "\n")
+    return True
+
 # ----------------------------
 # Telemetry streaming
 # Protocol:
 #   S:<ms>,<ax>,<ay>,<az>,<sl>
 #   EV:IDLE / EV:PRE / EV:GEN / EV:POST
-#   PW:<password> / ST:<label> / LN:<len>
+#   PW:<password> / ST:<label> / LN:<len> (<words> in PHRASE mode)
+#   TM:TXT / TM:BIN,<batch>            (telemetry mode ack)
+#   PB:<seq>,<password> ... BE:<count>  (bulk batch from GEN:<n>[,<len>])
+#   D:<dms>,<dax>,<day>,<daz>,<dsl>     (delta vs. previous sent sample)
+#   TM:CFG,<ms>,<th>,<kf>,<delta>       (rate control ack)
+#   GP:<from>,<to>                      (RETX range no longer available)
+#   MD:PHRASE,<words> / MD:CHARS,<len> (MODE: ack; PHRASE also before LN:)
+#
+# Tagged commands: "@<id>:<command>" is answered with AK:<id> once the
+# command is applied, or NK:<id> if it was rejected. Replies that follow
+# later (PW/ST/LN of a GEN, PB.../BE of a GEN:<n>, the PW of LAST) are
+# preceded by RQ:<id>. A repeated id (a client retry) is acked again but
+# not executed twice. Untagged commands get no ack, as before.
+#
+# Rate control:
+#   TELEM:MS:<ms>      sample period (10..5000)
+#   TELEM:TH:<n>       deadband: samples whose accel/sound change is below n
+#                      since the last sent sample are suppressed (0 = off)
+#   TELEM:KF:<ms>      keyframe interval: a full S: sample at least this often
+#   TELEM:DELTA:ON|OFF text mode sends D: deltas between keyframes
+#
+# Binary mode (TELEM:BIN[,<batch>]) packs <batch> samples per frame:
+#   A5 5A | type:u8 | len:u16le | payload | fletcher16:u16le
+#   type 0x01 payload: N x <ms:u32le, ax, ay, az, sl:i16le>
 # ----------------------------
 telemetry_on = True
 telemetry_ms = 120
+telemetry_th = 0
+keyframe_ms = 2000
+telemetry_delta = False
 _last_send = 0
+_last_key = -100000
+_sent = None
+
+SAMPLE_FMT = "<Ihhhh"
+SAMPLE_SIZE = 12
+BIN_MAX_BATCH = 32
+
+telemetry_bin = False
+bin_batch = 8
+_bin_n = 0
+_bin_buf = bytearray(5 + BIN_MAX_BATCH * SAMPLE_SIZE + 2 + 2)
+_bin_buf[0] = 0xA5
+_bin_buf[1] = 0x5A
+_bin_buf[2] = 0x01
+
+def fletcher16(buf, start, end):
+    s1 = 0
+    s2 = 0
+    for i in range(start, end):
+        s1 = (s1 + buf[i]) % 255
+        s2 = (s2 + s1) % 255
+    return (s2 << 8) | s1
+
+def flush_bin():
+    global _bin_n
+    if _bin_n == 0:
+        return
+    plen = _bin_n * SAMPLE_SIZE
+    if seq_on:
+        _bin_buf[2] = 0x02
+        _bin_buf[5 + plen] = _seq & 0xFF
+        _bin_buf[6 + plen] = _seq >> 8
+        plen += 2
+    else:
+        _bin_buf[2] = 0x01
+    _bin_buf[3] = plen & 0xFF
+    _bin_buf[4] = plen >> 8
+    end = 5 + plen
+    crc = fletcher16(_bin_buf, 2, end)
+    _bin_buf[end] = crc & 0xFF
+    _bin_buf[end + 1] = crc >> 8
+    if seq_on:
+        frame = bytes(_bin_buf[0:end + 2])
+        _keep(frame)
+        uart.write(frame)
+    else:
+        uart.write(memoryview(_bin_buf)[0:end + 2])
+    _bin_n = 0
+
+def set_telemetry_mode(binary, batch):
+    global telemetry_bin, bin_batch
+    flush_bin()
+    if batch < 1:
+        batch = 1
+    if batch > BIN_MAX_BATCH:
+        batch = BIN_MAX_BATCH
+    telemetry_bin = binary
+    bin_batch = batch
+    force_keyframe()
+    if binary:
+        emit("TM:BIN," + str(batch) + "\n")
+    else:
+        emit("TM:TXT\n")
+
+def force_keyframe():
+    # Also restarts missed-deadline counting after a config change.
+    global _last_key, _sent
+    _last_key = -100000
+    _sent = None
+
+def telemetry_config(ms, th, kf, delta):
+    global telemetry_ms, telemetry_th, keyframe_ms, telemetry_delta
+    if ms < 10:
+        ms = 10
+    if ms > 5000:
+        ms = 5000
+    if th < 0:
+        th = 0
+    if kf < ms:
+        kf = ms
+    telemetry_ms = ms
+    telemetry_th = th
+    keyframe_ms = kf
+    telemetry_delta = delta
+    force_keyframe()
+    emit("TM:CFG," + str(ms) + "," + str(th) + "," + str(kf) + "," + ("1" if delta else "0") + "\n")
 
 def send_sensor():
-    global _last_send
+    global _last_send, _last_key, _sent, _bin_n, _missed
     if not telemetry_on:
         return
     now = running_time()
-    if now - _last_send < telemetry_ms:
+    late = now - _last_send
+    if late < telemetry_ms:
         return
+    if late >= 2 * telemetry_ms and _sent is not None:
+        _missed += late // telemetry_ms - 1
     _last_send = now
 
     ax = accelerometer.get_x()
@@ -121,122 +511,444 @@ def send_sensor():
     sl = -1
     if HAS_MIC:
         sl = microphone.sound_level()
-    uart.write("S:" + str(now) + "," + str(ax) + "," + str(ay) + "," + str(az) + "," + str(sl) + "\n")
+
+    key = now - _last_key >= keyframe_ms or _sent is None
+    if not key:
+        p = _sent
+        if telemetry_th:
+            dmax = max(abs(ax - p[1]), abs(ay - p[2]), abs(az - p[3]), abs(sl - p[4]))
+            if dmax < telemetry_th:
+                return
+    if key:
+        _last_key = now
+
+    if telemetry_bin:
+        _sent = (now, ax, ay, az, sl)
+        struct.pack_into(SAMPLE_FMT, _bin_buf, 5 + _bin_n * SAMPLE_SIZE, now, ax, ay, az, sl)
+        _bin_n += 1
+        if _bin_n >= bin_batch:
+            flush_bin()
+        return
+    if telemetry_delta and not key:
+        p = _sent
+        _sent = (now, ax, ay, az, sl)
+        emit("D:" + str(now - p[0]) + "," + str(ax - p[1]) + "," + str(ay - p[2]) + "," + str(az - p[3]) + "," + str(sl - p[4]) + "\n")
+        return
+    _sent = (now, ax, ay, az, sl)
+    emit("S:" + str(now) + "," + str(ax) + "," + str(ay) + "," + str(az) + "," + str(sl) + "\n")
 
 pw_len = 12
+pw_mode = "CHARS"
+phrase_words = 6
 last_pw = ""
 
 display.scroll("PW", wait=False, loop=False)
 sleep(250)
 
 def show_len():
-    display.scroll("L" + str(pw_len), wait=False, loop=False)
-
-def do_generate():
-    global last_pw
-    uart.write("EV:PRE\n")
-    for _ in range(14):
-        sample_entropy()
-        send_sensor()
-        sleep(25)
+    if pw_mode == "PHRASE":
+        display.scroll("W" + str(phrase_words), wait=False, loop=False)
+    else:
+        display.scroll("L" + str(pw_len), wait=False, loop=False)
+
+def clamp_len(n):
+    if n < 8:
+        return 8
+    if n > 24:
+        return 24
+    return n
+
+def clamp_words(n):
+    if n < WORDS_MIN:
+        return WORDS_MIN
+    if n > WORDS_MAX:
+        return WORDS_MAX
+    return n
+
+# Mode-aware wrappers: size is characters in CHARS mode, words in PHRASE.
+def secret_size():
+    return phrase_words if pw_mode == "PHRASE" else pw_len
+
+def clamp_size(n):
+    return clamp_words(n) if pw_mode == "PHRASE" else clamp_len(n)
+
+def set_size(n):
+    global pw_len, phrase_words
+    if pw_mode == "PHRASE":
+        phrase_words = clamp_words(n)
+    else:
+        pw_len = clamp_len(n)
+
+def generate_secret(n):
+    if pw_mode == "PHRASE":
+        return generate_phrase(n)
+    return generate_password(n)
+
+def secret_label(pw):
+    if pw_mode == "PHRASE":
+        return phrase_label(pw.count(SEPARATOR) + 1)
+    return strength_label(pw)
 
-    pw = generate_password(pw_len)
-    last_pw = pw
-    label = strength_label(pw)
-
-    uart.write("EV:GEN\n")
-    display.scroll(pw, wait=False, loop=False)
-    sleep(250)
-    display.scroll(label, wait=False, loop=False)
-
-    uart.write("PW:" + pw + "\n")
-    uart.write("ST:" + label + "\n")
-    uart.write("LN:" + str(pw_len) + "\n")
-
-    uart.write("EV:POST\n")
-    for _ in range(10):
-        send_sensor()
-        sleep(30)
+# ----------------------------
+# Cooperative scheduler
+# Nothing below blocks: every activity is a small step run when its
+# running_time() deadline passes, so UART commands and telemetry keep
+# their cadence while a generation or gesture animation is in flight.
+#
+#   phase: IDLE -> PRE -> GEN -> POST -> (HOLD) -> IDLE
+#          IDLE -> PRE -> BULK -> IDLE            (GEN:<n>[,<len>])
+# ----------------------------
+TICK_MS = 10
+ENTROPY_MS = 40
+PRE_STEPS = 14
+PRE_MS = 25
+LABEL_DELAY_MS = 250
+POST_STEPS = 10
+POST_MS = 30
+SHAKE_STEPS = 20
+SHAKE_MS = 10
+ICON_MS = 120
+
+BULK_MAX = 1000
+BULK_PREROLL = 14
+BULK_PREROLL_MS = 2
+BULK_PER_TICK = 4
+
+phase = "IDLE"
+phase_step = 0
+phase_due = 0
+from_buttons = False
+gen_pending = []
+gen_rid = ""
+bulk_rid = ""
+SEEN_IDS = 8
+_seen = []
+
+bulk_count = 0
+bulk_len = 12
+bulk_i = 0
+
+label_due = 0
+pending_label = ""
+icon_clear_due = 0
+shake_left = 0
+shake_due = 0
+entropy_due = 0
+
+_rx = b""
+
+def set_phase(p, now, delay, ev=None):
+    # ev overrides the reported event name; "" keeps the phase internal.
+    global phase, phase_step, phase_due
+    phase = p
+    phase_step = 0
+    phase_due = now + delay
+    if ev is None:
+        ev = p
+    if ev:
+        emit("EV:" + ev + "\n")
+
+def start_generate(now, buttons, rid=""):
+    global from_buttons, gen_rid
+    from_buttons = buttons
+    gen_rid = rid
+    set_phase("PRE", now, 0)
+
+def start_bulk(now, count, length, rid=""):
+    global bulk_count, bulk_len, bulk_i, bulk_rid
+    bulk_count = count
+    bulk_len = length
+    bulk_i = 0
+    bulk_rid = rid
+    set_phase("PRE", now, 0)
+
+def finish_idle(now):
+    set_phase("IDLE", now, 0)
+    show_len()
+    if gen_pending:
+        start_generate(now, False, gen_pending.pop(0))
+
+def step_phase(now):
+    global phase_step, phase_due, last_pw, label_due, pending_label, bulk_i, bulk_count
+    if phase == "IDLE" or now < phase_due:
+        return
 
-uart.write("EV:IDLE\n")
-show_len()
+    if phase == "PRE":
+        sample_entropy()
+        phase_step += 1
+        if bulk_count > 0:
+            if phase_step >= BULK_PREROLL:
+                set_phase("BULK", now, 0, "GEN")
+                if bulk_rid:
+                    emit("RQ:" + bulk_rid + "\n")
+                display.show(Image.DIAMOND_SMALL)
+            else:
+                phase_due = now + BULK_PREROLL_MS
+        elif phase_step >= PRE_STEPS:
+            pw = generate_secret(secret_size())
+            last_pw = pw
+            label = secret_label(pw)
+            set_phase("GEN", now, 0)
+            display.scroll(pw, wait=False, loop=False)
+            pending_label = label
+            label_due = now + LABEL_DELAY_MS
+            if gen_rid:
+                emit("RQ:" + gen_rid + "\n")
+            emit("PW:" + pw + "\n")
+            emit("ST:" + label + "\n")
+            if pw_mode == "PHRASE":
+                emit("MD:PHRASE," + str(phrase_words) + "\n")
+            emit("LN:" + str(secret_size()) + "\n")
+            set_phase("POST", now, 0)
+        else:
+            phase_due = now + PRE_MS
+
+    elif phase == "POST":
+        phase_step += 1
+        if phase_step >= POST_STEPS:
+            if from_buttons:
+                set_phase("HOLD", now, 0, "")
+            else:
+                finish_idle(now)
+        else:
+            phase_due = now + POST_MS
+
+    elif phase == "HOLD":
+        # Wait for A+B to be released before going back to IDLE.
+        if not (button_a.is_pressed() or button_b.is_pressed()):
+            finish_idle(now)
+
+    elif phase == "BULK":
+        n = 0
+        while n < BULK_PER_TICK and bulk_i < bulk_count:
+            pw = generate_secret(bulk_len)
+            emit("PB:" + str(bulk_i) + "," + pw + "\n")
+            last_pw = pw
+            bulk_i += 1
+            n += 1
+        if bulk_i >= bulk_count:
+            emit("BE:" + str(bulk_count) + "\n")
+            bulk_count = 0
+            display.clear()
+            finish_idle(now)
+
+def step_display(now):
+    global label_due, icon_clear_due
+    if label_due and now >= label_due:
+        label_due = 0
+        display.scroll(pending_label, wait=False, loop=False)
+    if icon_clear_due and now >= icon_clear_due:
+        icon_clear_due = 0
+        display.clear()
 
-while True:
-    sample_entropy()
-    send_sensor()
+def show_icon(img, now):
+    global icon_clear_due
+    # Gesture feedback only while idle so it never hides a password scroll.
+    if phase == "IDLE":
+        display.show(img)
+        icon_clear_due = now + ICON_MS
 
+def poll_inputs(now):
+    global shake_left, shake_due
     if button_a.was_pressed():
-        pw_len += 1
-        if pw_len > 24:
-            pw_len = 24
+        set_size(secret_size() + 1)
         mix_entropy(running_time() ^ 0xA55A)
         show_len()
 
     if button_b.was_pressed():
-        pw_len -= 1
-        if pw_len < 8:
-            pw_len = 8
+        set_size(secret_size() - 1)
         mix_entropy(running_time() ^ 0x5AA5)
         show_len()
 
-    if button_a.is_pressed() and button_b.is_pressed():
-        do_generate()
-        while button_a.is_pressed() or button_b.is_pressed():
-            sleep(20)
-        uart.write("EV:IDLE\n")
-        show_len()
+    if phase == "IDLE" and button_a.is_pressed() and button_b.is_pressed():
+        start_generate(now, True)
 
-    if accelerometer.was_gesture("shake"):
-        for _ in range(20):
-            sample_entropy()
-            send_sensor()
-            sleep(10)
-        display.show(Image.DIAMOND_SMALL)
-        sleep(120)
-        display.clear()
+    if accelerometer.was_gesture("shake") and shake_left == 0:
+        shake_left = SHAKE_STEPS
+        shake_due = now
+
+    if shake_left and now >= shake_due:
+        sample_entropy()
+        shake_left -= 1
+        shake_due = now + SHAKE_MS
+        if shake_left == 0:
+            show_icon(Image.DIAMOND_SMALL, now)
 
     if HAS_MIC:
         if microphone.sound_level() > 120:
             mix_entropy(microphone.sound_level() ^ running_time())
-            display.show(Image.MUSIC_QUAVER)
-            sleep(120)
-            display.clear()
-
-    if uart.any():
+            show_icon(Image.MUSIC_QUAVER, now)
+
+def handle_command(cmd, now, rid=""):
+    # -> False if the command was rejected (NK: for tagged commands).
+    global pw_len, telemetry_on, seq_on, pw_mode, phrase_words
+    if cmd == "GEN":
+        if phase == "IDLE":
+            start_generate(now, False, rid)
+        else:
+            gen_pending.append(rid)
+
+    elif cmd.startswith("GEN:"):
+        try:
+            args = cmd[4:].split(",")
+            count = int(args[0])
+            length = int(args[1]) if len(args) > 1 else secret_size()
+        except:
+            count = 0
+        if count <= 0 or phase != "IDLE":
+            return False
+        if count > BULK_MAX:
+            count = BULK_MAX
+        start_bulk(now, count, clamp_size(length), rid)
+
+    elif cmd.startswith("LEN:"):
         try:
-            cmd = uart.readline()
-            if cmd:
-                try:
-                    cmd = cmd.decode("utf-8").strip()
-                except:
-                    cmd = str(cmd).strip()
-
-                if cmd == "GEN":
-                    do_generate()
-                    uart.write("EV:IDLE\n")
-                    show_len()
-
-                elif cmd.startswith("LEN:"):
-                    try:
-                        n = int(cmd[4:])
-                        if n < 8:
-                            n = 8
-                        if n > 24:
-                            n = 24
-                        pw_len = n
-                        show_len()
-                    except:
-                        pass
-
-                elif cmd == "LAST" and last_pw:
-                    uart.write("PW:" + last_pw + "\n")
-
-                elif cmd == "TELEM:ON":
-                    telemetry_on = True
-                elif cmd == "TELEM:OFF":
-                    telemetry_on = False
+            pw_len = clamp_len(int(cmd[4:]))
+        except:
+            return False
+        if phase == "IDLE":
+            show_len()
 
+    elif cmd == "MODE:PHRASE" or cmd.startswith("MODE:PHRASE,"):
+        try:
+            n = int(cmd[12:]) if len(cmd) > 11 else phrase_words
         except:
-            pass
+            return False
+        if not open_wordlist():
+            return False
+        pw_mode = "PHRASE"
+        phrase_words = clamp_words(n)
+        emit("MD:PHRASE," + str(phrase_words) + "\n")
+        if phase == "IDLE":
+            show_len()
+    elif cmd == "MODE:CHARS":
+        pw_mode = "CHARS"
+        emit("MD:CHARS," + str(pw_len) + "\n")
+        if phase == "IDLE":
+            show_len()
+
+    elif cmd == "LAST":
+        if not last_pw:
+            return False
+        if rid:
+            emit("RQ:" + rid + "\n")
+        emit("PW:" + last_pw + "\n")
+
+    elif cmd == "TELEM:ON":
+        telemetry_on = True
+        force_keyframe()
+    elif cmd == "TELEM:OFF":
+        flush_bin()
+        telemetry_on = False
+
+    elif cmd.startswith("TELEM:MS:"):
+        telemetry_config(int(cmd[9:]), telemetry_th, keyframe_ms, telemetry_delta)
+    elif cmd.startswith("TELEM:TH:"):
+        telemetry_config(telemetry_ms, int(cmd[9:]), keyframe_ms, telemetry_delta)
+    elif cmd.startswith("TELEM:KF:"):
+        telemetry_config(telemetry_ms, telemetry_th, int(cmd[9:]), telemetry_delta)
+    elif cmd == "TELEM:DELTA:ON":
+        telemetry_config(telemetry_ms, telemetry_th, keyframe_ms, True)
+    elif cmd == "TELEM:DELTA:OFF":
+        telemetry_config(telemetry_ms, telemetry_th, keyframe_ms, False)
+
+    elif cmd == "SEQ:ON" or cmd == "SEQ:OFF":
+        flush_bin()
+        seq_on = cmd == "SEQ:ON"
+        force_keyframe()
+
+    elif cmd == "STATS":
+        report_stats(now)
+
+    elif cmd.startswith("RETX:"):
+        args = cmd[5:].split(",")
+        a = int(args[0]) & 0xFFFF
+        b = int(args[1]) & 0xFFFF if len(args) > 1 else a
+        if not retransmit(a, b):
+            return False
+
+    elif cmd == "TELEM:TXT":
+        set_telemetry_mode(False, bin_batch)
+    elif cmd.startswith("TELEM:BIN"):
+        try:
+            n = int(cmd[10:]) if len(cmd) > 10 else bin_batch
+        except:
+            n = bin_batch
+        set_telemetry_mode(True, n)
+
+    else:
+        return False
+    return True
+
+def run_command(cmd, now):
+    rid = ""
+    if cmd[0] == "@":
+        i = cmd.find(":")
+        if i < 0:
+            return
+        rid = cmd[1:i]
+        cmd = cmd[i + 1:]
+        for seen_id, seen_ok in _seen:
+            if seen_id == rid:
+                emit(("AK:" if seen_ok else "NK:") + rid + "\n")
+                return
+    try:
+        ok = handle_command(cmd, now, rid)
+    except:
+        ok = False
+    if rid:
+        _seen.append((rid, ok))
+        if len(_seen) > SEEN_IDS:
+            _seen.pop(0)
+        emit(("AK:" if ok else "NK:") + rid + "\n")
+
+def poll_uart(now):
+    # Commands are assembled across ticks, so a line that arrives in
+    # pieces is never mistaken for two commands.
+    global _rx
+    if not uart.any():
+        return
+    data = uart.read()
+    if not data:
+        return
+    _rx += data
+    while True:
+        i = _rx.find(b"\n")
+        if i < 0:
+            break
+        raw = _rx[:i]
+        _rx = _rx[i + 1:]
+        try:
+            cmd = raw.decode("utf-8").strip()
+        except:
+            cmd = str(raw).strip()
+        if cmd:
+            run_command(cmd, now)
+    if len(_rx) > 128:
+        _rx = b""
+
+emit("EV:IDLE\n")
+show_len()
 
-    sleep(40)
+while True:
+    t = t_loop = ticks_us()
+    now = running_time()
+    if now >= entropy_due:
+        sample_entropy()
+        entropy_due = now + ENTROPY_MS
+        t = prof(P_ENTROPY, t)
+    send_sensor()
+    t = prof(P_SENSOR, t)
+    poll_inputs(now)
+    t = prof(P_INPUTS, t)
+    poll_uart(now)
+    t = prof(P_UART, t)
+    step_phase(now)
+    t = prof(P_PHASE, t)
+    step_display(now)
+    prof(P_DISPLAY, t)
+    prof(P_LOOP, t_loop)
+    _loops += 1
+    if _loops % MEM_EVERY == 0:
+        sample_mem()
+    sleep(TICK_MS)
@@ -0,0 +1,237 @@
+import bisect
+import os
+import threading
+import time
+
+# ----------------------------
+# Client metrics: counters, gauges and histograms in one registry, exported
+# in the Prometheus text format (0.0.4) to a file or a localhost endpoint.
+#
+# Values owned by other objects (RecordQueue depth, SerialEngine byte
+# counts) are registered as callbacks and read at collection time, so the
+# hot paths never touch the registry for them.
+# ----------------------------
+PREFIX = "microbit_client_"
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _fmt_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels:
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _fmt_value(v):
+    if v == float("inf"):
+        return "+Inf"
+    if isinstance(v, float) and v.is_integer() and abs(v) < 1e15:
+        return str(int(v))
+    return repr(v) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, fn=None):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.lock = threading.Lock()
+        self.children = {}
+
+    def _child(self, labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            c = self.children.get(key)
+            if c is None:
+                c = self.children[key] = self._new()
+        return c
+
+    def samples(self):
+        if self.fn is not None:
+            val = self.fn()
+            if isinstance(val, dict):
+                return [(self.name, ((k, lv) for k, lv in key), v) for key, v in val.items()]
+            return [(self.name, (), val)]
+        with self.lock:
+            items = list(self.children.items())
+        return [(self.name, key, c[0]) for key, c in items]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new(self):
+        return [0]
+
+    def inc(self, n=1, **labels):
+        c = self._child(labels)
+        with self.lock:
+            c[0] += n
+
+    def value(self, **labels):
+        if self.fn is not None:
+            return self.fn()
+        return self._child(labels)[0]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, v, **labels):
+        self._child(labels)[0] = v
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(buckets)
+
+    def _new(self):
+        # per-bucket counts (not cumulative), then sum, count
+        return [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+    def observe(self, v, **labels):
+        c = self._child(labels)
+        i = bisect.bisect_left(self.buckets, v)
+        with self.lock:
+            c[0][i] += 1
+            c[1] += v
+            c[2] += 1
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def quantile(self, q, **labels):
+        # Bucket-interpolated estimate, as histogram_quantile() would do.
+        counts, _, n = self._child(labels)
+        if not n:
+            return 0.0
+        rank = q * n
+        seen = 0
+        lo = 0.0
+        for i, c in enumerate(counts):
+            hi = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+            if seen + c >= rank and c:
+                return lo + (hi - lo) * (rank - seen) / c
+            seen += c
+            lo = hi
+        return self.buckets[-1]
+
+    def count(self, **labels):
+        return self._child(labels)[2]
+
+    def samples(self):
+        out = []
+        with self.lock:
+            items = [(k, (list(c[0]), c[1], c[2])) for k, c in self.children.items()]
+        for key, (counts, total, n) in items:
+            acc = 0
+            for le, c in zip(self.buckets + (float("inf"),), counts):
+                acc += c
+                out.append((self.name + "_bucket", key + (("le", _fmt_value(float(le))),), acc))
+            out.append((self.name + "_sum", key, total))
+            out.append((self.name + "_count", key, n))
+        return out
+
+
+class _Timer:
+    def __init__(self, hist, labels):
+        self.hist = hist
+        self.labels = labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.t0, **self.labels)
+        return False
+
+
+class Registry:
+    def __init__(self, prefix=PREFIX):
+        self.prefix = prefix
+        self.metrics = {}
+
+    def _add(self, metric):
+        metric.name = self.prefix + metric.name
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, fn=None):
+        return self._add(Counter(name, help, fn))
+
+    def gauge(self, name, help, fn=None):
+        return self._add(Gauge(name, help, fn))
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, buckets))
+
+    def exposition(self):
+        lines = []
+        for m in self.metrics.values():
+            try:
+                samples = m.samples()
+            except Exception:
+                continue
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            for name, labels, v in samples:
+                lines.append(f"{name}{_fmt_labels(tuple(labels))} {_fmt_value(v)}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        # Atomic replace, so a scraper (e.g. node_exporter's textfile
+        # collector) never sees a half-written file.
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.exposition())
+        os.replace(tmp, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.exposition().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+class RateMeter:
+    # Per-second rates of a set of counter values between two snapshots.
+    def __init__(self):
+        self.prev = None
+        self.rates = {}
+
+    def update(self, values, now=None):
+        now = time.monotonic() if now is None else now
+        if self.prev is not None:
+            t0, old = self.prev
+            dt = now - t0
+            if dt > 0:
+                self.rates = {k: (v - old.get(k, 0)) / dt for k, v in values.items()}
+        self.prev = (now, dict(values))
+        return self.rates
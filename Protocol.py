@@ -0,0 +1,409 @@
+import struct
+import threading
+import time
+from operator import mul
+from collections import deque
+
+# ----------------------------
+# Binary telemetry framing (negotiated with TELEM:BIN[,<batch>] / TELEM:TXT)
+#
+#   A5 5A | type:u8 | len:u16le | payload[len] | fletcher16:u16le
+#
+# The checksum covers type, len and payload. Text lines are plain ASCII,
+# so the 0xA5 sync byte can never appear inside one.
+#
+#   FT_SAMPLES payload: N x <ms:u32le, ax:i16le, ay:i16le, az:i16le, sl:i16le>
+#   FT_SEQ_SAMPLES:     the same, then seq:u16le
+#
+# With SEQ:ON every text record arrives as "#<seq>:<record>". The decoder
+# strips the number and, given a Resequencer, hands records over in
+# sequence order. Lines that are not valid UTF-8 are counted in bad_lines
+# and dropped; with sequencing on they show up as gaps and can be resent.
+# ----------------------------
+SYNC0 = 0xA5
+SYNC1 = 0x5A
+HDR_LEN = 5
+CRC_LEN = 2
+MAX_PAYLOAD = 1024
+
+FT_SAMPLES = 0x01
+FT_SEQ_SAMPLES = 0x02
+
+SEQ_MOD = 0x10000
+HOLD_S = 0.25
+MAX_GAP = 512
+
+SAMPLE_FMT = "<Ihhhh"
+SAMPLE_SIZE = struct.calcsize(SAMPLE_FMT)
+
+_SYNC0_BYTE = bytes([SYNC0])
+
+
+def fletcher16(data):
+    # Same result as the byte-at-a-time loop in MB.py: s1 is the plain sum
+    # and s2 the position-weighted sum, both reduced mod 255 at the end.
+    n = len(data)
+    s1 = sum(data) % 255
+    s2 = sum(map(mul, range(n, 0, -1), data)) % 255
+    return (s2 << 8) | s1
+
+
+def pack_frame(ftype, payload):
+    body = struct.pack("<BH", ftype, len(payload)) + bytes(payload)
+    return bytes([SYNC0, SYNC1]) + body + struct.pack("<H", fletcher16(body))
+
+
+def pack_samples(samples):
+    payload = b"".join(struct.pack(SAMPLE_FMT, *s) for s in samples)
+    return pack_frame(FT_SAMPLES, payload)
+
+
+def unpack_samples(payload):
+    return list(struct.iter_unpack(SAMPLE_FMT, payload))
+
+
+class StreamDecoder:
+    # Incremental demultiplexer for the mixed text/binary UART stream.
+    # feed() returns decoded items in arrival order: text lines as str,
+    # sample frames as a list of (ms, ax, ay, az, sl) tuples.
+    def __init__(self, reseq=None):
+        self.buf = bytearray()
+        self.reseq = reseq
+        self.frames = 0
+        self.bad_frames = 0
+        self.bad_lines = 0
+
+    def _sequenced(self, seq, item, out):
+        if self.reseq is None:
+            out.append(item)
+        else:
+            out.extend(self.reseq.push(seq, item))
+
+    def _tagged(self, line, out):
+        # "#<seq>:<record>" or GP:<from>,<to>
+        if line[0] == "#":
+            i = line.find(":")
+            try:
+                if i < 0:
+                    raise ValueError(line)
+                seq = int(line[1:i])
+            except ValueError:
+                self.bad_lines += 1
+                return
+            self._sequenced(seq % SEQ_MOD, line[i + 1:], out)
+        elif self.reseq is not None:
+            try:
+                a, b = line[3:].split(",")
+                out.extend(self.reseq.gone(int(a), int(b)))
+            except ValueError:
+                self.bad_lines += 1
+
+    def feed(self, data):
+        buf = self.buf
+        buf += data
+        out = []
+        i = 0
+        n = len(buf)
+        while i < n:
+            if buf[i] == SYNC0:
+                if n - i < HDR_LEN:
+                    break
+                if buf[i + 1] != SYNC1:
+                    i += 1
+                    continue
+                plen = buf[i + 3] | (buf[i + 4] << 8)
+                if plen > MAX_PAYLOAD:
+                    self.bad_frames += 1
+                    i += 1
+                    continue
+                end = i + HDR_LEN + plen + CRC_LEN
+                if n < end:
+                    break
+                mv = memoryview(buf)
+                body = mv[i + 2:i + HDR_LEN + plen]
+                crc = buf[end - 2] | (buf[end - 1] << 8)
+                if fletcher16(body) != crc:
+                    # Header looked sane, so skip the whole damaged frame
+                    # rather than letting its payload bleed into text lines.
+                    body.release()
+                    mv.release()
+                    self.bad_frames += 1
+                    i = end
+                    continue
+                ftype = buf[i + 2]
+                payload = bytes(mv[i + HDR_LEN:i + HDR_LEN + plen])
+                body.release()
+                mv.release()
+                if ftype == FT_SAMPLES and plen % SAMPLE_SIZE == 0:
+                    out.append(unpack_samples(payload))
+                    self.frames += 1
+                elif ftype == FT_SEQ_SAMPLES and plen % SAMPLE_SIZE == 2:
+                    self.frames += 1
+                    self._sequenced(payload[-2] | (payload[-1] << 8), unpack_samples(payload[:-2]), out)
+                else:
+                    self.bad_frames += 1
+                i = end
+            else:
+                j = buf.find(b"\n", i)
+                k = buf.find(_SYNC0_BYTE, i, n if j == -1 else j)
+                if k != -1:
+                    # A frame starts before the line ends: whatever precedes
+                    # it is a fragment of a garbled line.
+                    i = k
+                    continue
+                if j == -1:
+                    break
+                try:
+                    line = buf[i:j].decode("utf-8").strip()
+                except UnicodeDecodeError:
+                    self.bad_lines += 1
+                    line = ""
+                if line:
+                    if line[0] == "#" or line.startswith("GP:"):
+                        self._tagged(line, out)
+                    else:
+                        out.append(line)
+                i = j + 1
+        if i:
+            del buf[:i]
+        return out
+
+
+class Resequencer:
+    # Puts sequenced records back in order. Records after a gap are held
+    # for up to hold_s while the missing range is asked for again (see
+    # take_requests); seqs still missing then, or reported gone (GP:),
+    # are counted as lost and skipped. A jump of more than MAX_GAP cannot
+    # be refilled from the device ring: it is counted as lost (or, if the
+    # counter went backwards, taken as a device restart) and followed.
+    def __init__(self, hold_s=HOLD_S):
+        self.hold_s = hold_s
+        self.received = 0
+        self.recovered = 0
+        self.lost = 0
+        self.duplicates = 0
+        self.gaps = 0
+        self.restart()
+
+    def restart(self):
+        self.next = None        # next seq to release
+        self.top = None         # one past the highest seq seen
+        self.held = {}
+        self.missing = {}       # seq -> give-up time
+        self.requests = []
+
+    @property
+    def loss_rate(self):
+        n = self.received + self.lost
+        return self.lost / n if n else 0.0
+
+    def push(self, seq, item, now=None):
+        now = time.monotonic() if now is None else now
+        out = []
+        if self.next is None:
+            self.next = self.top = seq
+        ahead = (seq - self.next) % SEQ_MOD
+        if ahead > MAX_GAP:
+            behind = SEQ_MOD - ahead
+            if behind <= MAX_GAP:
+                self.duplicates += 1        # already released or given up
+                return out
+            out = self._flush()
+            if ahead < SEQ_MOD // 2:
+                # Too far ahead to recover: count it lost and move on.
+                self.lost += (seq - self.top) % SEQ_MOD
+                self.gaps += 1
+            self.next = self.top = seq
+        if seq in self.held:
+            self.duplicates += 1
+            return out
+        self.received += 1
+        if seq in self.missing:
+            del self.missing[seq]
+            self.recovered += 1
+        else:
+            gap = (seq - self.top) % SEQ_MOD
+            if gap:
+                self.gaps += 1
+                until = now + self.hold_s
+                for k in range(gap):
+                    self.missing[(self.top + k) % SEQ_MOD] = until
+                self.requests.append((self.top, (seq - 1) % SEQ_MOD))
+            self.top = (seq + 1) % SEQ_MOD
+        self.held[seq] = item
+        out.extend(self._advance(now))
+        return out
+
+    def gone(self, a, b):
+        # Only forward ranges within MAX_GAP can name missing seqs; a
+        # backwards one would otherwise walk the whole 64k space.
+        span = (b - a) % SEQ_MOD
+        if span > MAX_GAP:
+            raise ValueError(f"bad range {a},{b}")
+        for k in range(span + 1):
+            s = (a + k) % SEQ_MOD
+            if s in self.missing:
+                self.missing[s] = 0.0
+        return self._advance(time.monotonic())
+
+    def expire(self, now=None):
+        if not self.missing:
+            return []
+        return self._advance(time.monotonic() if now is None else now)
+
+    def take_requests(self):
+        reqs = self.requests
+        self.requests = []
+        return reqs
+
+    def _advance(self, now):
+        out = []
+        held = self.held
+        missing = self.missing
+        while self.next != self.top:
+            s = self.next
+            if s in held:
+                out.append(held.pop(s))
+            elif s in missing:
+                if missing[s] > now:
+                    break
+                del missing[s]
+                self.lost += 1
+            self.next = (s + 1) % SEQ_MOD
+        return out
+
+    def _flush(self):
+        out = []
+        while self.next != self.top:
+            s = self.next
+            if s in self.held:
+                out.append(self.held.pop(s))
+            elif self.missing.pop(s, None) is not None:
+                self.lost += 1
+            self.next = (s + 1) % SEQ_MOD
+        self.held.clear()
+        self.missing.clear()
+        return out
+
+
+def is_telemetry(item):
+    return not isinstance(item, str) or item.startswith("S:") or item.startswith("D:")
+
+
+class RecordQueue:
+    # Bounded hand-off between the reader thread and the UI thread.
+    # Items move in batches (one lock round trip per read, not per line).
+    # On overflow the oldest telemetry is shed; control records (PW:, EV:,
+    # ST:, LN:, ...) are never dropped, even if that exceeds maxlen.
+    # A D: line is relative to the sample before it, so after a shed the
+    # consumer must not apply deltas until the next keyframe: cut is set
+    # when telemetry was shed ahead of the batch drain() just returned.
+    def __init__(self, maxlen=2048):
+        self.maxlen = maxlen
+        self.lock = threading.Lock()
+        self.items = deque()
+        self.dropped = 0
+        self.dropped_samples = 0
+        self.cut = False
+        self._cut = False
+
+    def put_batch(self, items):
+        if not items:
+            return
+        with self.lock:
+            self.items.extend(items)
+            over = len(self.items) - self.maxlen
+            if over > 0:
+                self._shed(over)
+
+    def _shed(self, n):
+        # The front is usually telemetry: pop it in place. Only a control
+        # record ahead of it costs a rebuild of the deque.
+        items = self.items
+        while n > 0 and items and is_telemetry(items[0]):
+            self._count(items.popleft())
+            n -= 1
+        if n <= 0:
+            return
+        kept = deque()
+        for item in items:
+            if n > 0 and is_telemetry(item):
+                n -= 1
+                self._count(item)
+                continue
+            kept.append(item)
+        self.items = kept
+
+    def _count(self, item):
+        self._cut = True
+        self.dropped += 1
+        self.dropped_samples += 1 if isinstance(item, str) else len(item)
+
+    def drain(self):
+        with self.lock:
+            items = self.items
+            self.items = deque()
+            self.cut, self._cut = self._cut, False
+        return items
+
+    def __len__(self):
+        return len(self.items)
+
+
+class SampleReconstructor:
+    # Rebuilds the full-rate series from keyframes (S: lines / binary
+    # frames), D: deltas and deadband gaps. A suppressed sample was within
+    # the deadband of the last one sent, so gaps shorter than a keyframe
+    # interval are filled by holding that sample at the sample period.
+    # Longer gaps (telemetry off, link down) are left alone.
+    def __init__(self, period_ms=120, deadband=0, keyframe_ms=2000):
+        self.last = None
+        self.filled = 0
+        self.orphans = 0
+        self.configure(period_ms, deadband, keyframe_ms)
+
+    def configure(self, period_ms, deadband, keyframe_ms):
+        self.period = max(1, int(period_ms))
+        self.deadband = max(0, int(deadband))
+        self.keyframe_ms = max(self.period, int(keyframe_ms))
+
+    def reset(self):
+        self.last = None
+
+    def _fill(self, t, out):
+        p = self.last
+        if p is None or not self.deadband:
+            return
+        gap = t - p[0]
+        if gap <= self.period or gap > self.keyframe_ms + self.period:
+            return
+        n = int(gap / self.period + 0.5) - 1
+        if n <= 0:
+            return
+        step = gap / (n + 1)
+        t0, ax, ay, az, sl = p
+        for i in range(1, n + 1):
+            out.append((int(t0 + i * step), ax, ay, az, sl))
+        self.filled += n
+
+    def full(self, s, out):
+        self._fill(s[0], out)
+        out.append(s)
+        self.last = s
+
+    def frame(self, samples, out):
+        if not samples:
+            return
+        if not self.deadband:
+            out.extend(samples)
+            self.last = samples[-1]
+            return
+        for s in samples:
+            self.full(s, out)
+
+    def delta(self, d, out):
+        p = self.last
+        if p is None:
+            self.orphans += 1
+            return
+        self.full((p[0] + d[0], p[1] + d[1], p[2] + d[2], p[3] + d[3], p[4] + d[4]), out)
@@ -0,0 +1,315 @@
+import argparse
+import bisect
+import json
+import mmap
+import os
+import struct
+import time
+
+from Protocol import SAMPLE_FMT, unpack_samples
+
+# ----------------------------
+# Telemetry log (.mbrec) + sidecar index (.mbrec.idx)
+#
+#   file:   "MBREC\x01" | start_ns:u64le | record*
+#   record: kind:u8 | t_ms:u32le | len:u16le | payload[len]
+#
+# t_ms is host time since the recording started. Records keep the queue
+# items as they were received, so a replay goes through exactly the same
+# consume_serial_queue path as live data:
+#   R_SAMPLES  N x SAMPLE_FMT   (binary frames and S: lines)
+#   R_DELTAS   N x SAMPLE_FMT   (D: lines)
+#   R_LINE     utf-8 text       (EV:, PW:, ST:, LN:, TM:, PB:, BE:)
+#
+# The index is JSON: a seek mark every INDEX_EVERY_MS of log time plus the
+# offset of every EV: record. It is written on close and rebuilt by
+# scanning the log if missing or stale (e.g. after a crash).
+# ----------------------------
+MAGIC = b"MBREC\x01"
+FILE_HDR = struct.Struct("<6sQ")
+REC_HDR = struct.Struct("<BIH")
+
+R_SAMPLES = 0x01
+R_DELTAS = 0x02
+R_LINE = 0x03
+
+INDEX_EVERY_MS = 1000
+MAX_REC_SAMPLES = 4096
+PREROLL_MS = 2000
+REPLAY_MAX_RECORDS = 256
+
+_SAMPLE = struct.Struct(SAMPLE_FMT)
+
+
+def index_path(path):
+    return path + ".idx"
+
+
+def _parse5(line):
+    p = line[2:].split(",")
+    return (int(p[0]), int(p[1]), int(p[2]), int(p[3]), int(p[4]))
+
+
+def redact_line(line):
+    if line.startswith("PW:"):
+        return "PW:" + "*" * len(line[3:])
+    if line.startswith("PB:"):
+        seq, _, pw = line[3:].partition(",")
+        return "PB:" + seq + "," + "*" * len(pw)
+    return line
+
+
+def decode_record(kind, payload):
+    # Record -> RecordQueue items.
+    if kind == R_SAMPLES:
+        return [unpack_samples(payload)]
+    if kind == R_DELTAS:
+        return ["D:%d,%d,%d,%d,%d" % d for d in unpack_samples(payload)]
+    if kind == R_LINE:
+        return [bytes(payload).decode("utf-8", "replace")]
+    return []
+
+
+class LogIndex:
+    def __init__(self):
+        self.marks = []         # (offset, t_ms)
+        self.events = []        # (offset, t_ms, name)
+        self.records = 0
+        self.bytes = FILE_HDR.size
+        self.duration_ms = 0
+
+    def add(self, offset, t, size, line=None):
+        if not self.marks or t - self.marks[-1][1] >= INDEX_EVERY_MS:
+            self.marks.append((offset, t))
+        if line is not None and line.startswith("EV:"):
+            self.events.append((offset, t, line[3:].strip().upper()))
+        self.records += 1
+        self.bytes = offset + size
+        self.duration_ms = t
+
+    def gens(self):
+        return [e for e in self.events if e[2] == "GEN"]
+
+    def mark_before(self, t):
+        # Last seek mark at or before log time t.
+        i = bisect.bisect_right([m[1] for m in self.marks], t) - 1
+        return self.marks[max(0, i)] if self.marks else (FILE_HDR.size, 0)
+
+    def save(self, path, **meta):
+        doc = {
+            "version": 1,
+            "records": self.records,
+            "bytes": self.bytes,
+            "duration_ms": self.duration_ms,
+            "marks": self.marks,
+            "events": self.events,
+        }
+        doc.update(meta)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(doc, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, size):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                doc = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if doc.get("version") != 1 or doc.get("bytes") != size:
+            return None
+        idx = cls()
+        idx.records = doc["records"]
+        idx.bytes = doc["bytes"]
+        idx.duration_ms = doc["duration_ms"]
+        idx.marks = [tuple(m) for m in doc["marks"]]
+        idx.events = [tuple(e) for e in doc["events"]]
+        return idx
+
+
+class Recorder:
+    def __init__(self, path, redact=False):
+        self.path = path
+        self.redact = redact
+        self.f = open(path, "wb")
+        self.t0 = time.monotonic()
+        self.f.write(FILE_HDR.pack(MAGIC, time.time_ns()))
+        self.offset = FILE_HDR.size
+        self.index = LogIndex()
+
+    def _put(self, kind, t, payload, line=None):
+        size = REC_HDR.size + len(payload)
+        self.index.add(self.offset, t, size, line)
+        self.f.write(REC_HDR.pack(kind, t, len(payload)))
+        self.f.write(payload)
+        self.offset += size
+
+    def _put_samples(self, kind, samples, t):
+        for i in range(0, len(samples), MAX_REC_SAMPLES):
+            chunk = samples[i:i + MAX_REC_SAMPLES]
+            try:
+                payload = b"".join([_SAMPLE.pack(*s) for s in chunk])
+            except struct.error:
+                continue
+            self._put(kind, t, payload)
+
+    def write_items(self, items):
+        if not items:
+            return
+        t = int((time.monotonic() - self.t0) * 1000)
+        run = []
+        run_kind = None
+        for item in items:
+            if not isinstance(item, str):
+                kind, vals = R_SAMPLES, item
+            elif item.startswith("S:") or item.startswith("D:"):
+                try:
+                    vals = [_parse5(item)]
+                except (ValueError, IndexError):
+                    continue
+                kind = R_SAMPLES if item[0] == "S" else R_DELTAS
+            else:
+                kind = R_LINE
+            if run and kind != run_kind:
+                self._put_samples(run_kind, run, t)
+                run = []
+            if kind == R_LINE:
+                line = redact_line(item) if self.redact else item
+                self._put(R_LINE, t, line.encode("utf-8", "ignore"), line)
+                run_kind = None
+            else:
+                run.extend(vals)
+                run_kind = kind
+        if run:
+            self._put_samples(run_kind, run, t)
+
+    def close(self):
+        if self.f.closed:
+            return
+        self.f.close()
+        self.index.save(index_path(self.path), redacted=self.redact)
+
+
+class LogReader:
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "rb")
+        self.size = os.fstat(self.f.fileno()).st_size
+        if self.size < FILE_HDR.size:
+            self.f.close()
+            raise ValueError(f"not a telemetry log: {path}")
+        self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.start_ns = FILE_HDR.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"not a telemetry log: {path}")
+        self.index = LogIndex.load(index_path(path), self.size) or self.build_index()
+
+    def records(self, offset=FILE_HDR.size):
+        # Yields (offset, t_ms, kind, payload); stops at a truncated tail.
+        mm = self.mm
+        end = self.size
+        hdr = REC_HDR.size
+        pos = offset
+        while pos + hdr <= end:
+            kind, t, n = REC_HDR.unpack_from(mm, pos)
+            stop = pos + hdr + n
+            if stop > end:
+                break
+            yield pos, t, kind, mm[pos + hdr:stop]
+            pos = stop
+
+    def build_index(self):
+        idx = LogIndex()
+        for off, t, kind, payload in self.records():
+            line = bytes(payload).decode("utf-8", "replace") if kind == R_LINE else None
+            idx.add(off, t, REC_HDR.size + len(payload), line)
+        return idx
+
+    def close(self):
+        self.mm.close()
+        self.f.close()
+
+
+class Player:
+    # Feeds a log into a RecordQueue paced by log time. speed=1 is real
+    # time, N is N times faster and 0 replays as fast as the consumer
+    # drains (REPLAY_MAX_RECORDS per pump).
+    def __init__(self, path, speed=1.0):
+        self.log = LogReader(path)
+        self.speed = speed
+        self.pos = FILE_HDR.size
+        self.t_log = 0
+        self.wall0 = None
+        self.gen_i = -1
+        self.done = False
+
+    def set_speed(self, speed):
+        self.speed = speed
+        self.wall0 = None
+
+    def seek(self, t_ms):
+        self.pos, self.t_log = self.log.index.mark_before(max(0, t_ms))
+        self.wall0 = None
+        self.done = False
+
+    def seek_gen(self, i):
+        # Jump to PREROLL_MS before the i-th EV:GEN so the lead-up is visible.
+        gens = self.log.index.gens()
+        if not gens:
+            return False
+        self.gen_i = max(0, min(len(gens) - 1, i))
+        self.seek(gens[self.gen_i][1] - PREROLL_MS)
+        return True
+
+    def pump(self, sink, now=None):
+        if self.done:
+            return 0
+        now = time.monotonic() if now is None else now
+        if self.wall0 is None:
+            self.wall0 = now
+            self.base = self.t_log
+        limit = None if self.speed <= 0 else self.base + (now - self.wall0) * 1000.0 * self.speed
+        items = []
+        n = 0
+        pos = self.pos
+        for off, t, kind, payload in self.log.records(pos):
+            if limit is not None and t > limit:
+                break
+            if limit is None and n >= REPLAY_MAX_RECORDS:
+                break
+            items.extend(decode_record(kind, payload))
+            self.t_log = t
+            pos = off + REC_HDR.size + len(payload)
+            n += 1
+        else:
+            self.done = True
+        self.pos = pos
+        if items:
+            sink.put_batch(items)
+        return n
+
+    def close(self):
+        self.log.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Inspect a telemetry log (.mbrec).")
+    ap.add_argument("log")
+    ap.add_argument("--reindex", action="store_true", help="rebuild the sidecar index")
+    args = ap.parse_args()
+
+    log = LogReader(args.log)
+    if args.reindex:
+        log.index = log.build_index()
+        log.index.save(index_path(args.log))
+    idx = log.index
+    print(f"{args.log}: {idx.records} records, {log.size} bytes, {idx.duration_ms / 1000.0:.1f} s")
+    for off, t, name in idx.events:
+        print(f"  {t / 1000.0:9.3f}s  @{off:<10d} EV:{name}")
+    log.close()
+
+
+if __name__ == "__main__":
+    main()
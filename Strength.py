@@ -0,0 +1,168 @@
+import argparse
+import math
+import sys
+from collections import Counter
+
+from Entropy import LOWER, UPPER, DIGIT, SYMBOL
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except Exception:
+    HAS_NUMPY = False
+
+# ----------------------------
+# Password strength
+# Same rules and labels as strength_label() in MB.py, so the label the
+# device sends on ST: and the one computed here always agree:
+#   STRONG  >= 14 chars, all four classes
+#   GOOD    >= 12 chars, three classes
+#   FAIR    >= 10 chars, two classes
+#   WEAK    anything else
+# Any character that is not a letter or digit counts as a symbol.
+#
+# Classes are found in one pass: the UTF-8 bytes are translated through a
+# 256-entry table to one bit per class, and the distinct bits are summed.
+# bits() is the brute-force size of the alphabets used, measured in the
+# generator's own LOWER/UPPER/DIGIT/SYMBOL sets.
+# ----------------------------
+C_LOWER = 1
+C_UPPER = 2
+C_DIGIT = 4
+C_SYMBOL = 8
+
+LABELS = ("WEAK", "FAIR", "GOOD", "STRONG")
+LABEL_COLORS = {
+    "STRONG": "#00ff99",
+    "GOOD": "#66ff66",
+    "FAIR": "#ffaa00",
+    "WEAK": "#ff4444",
+}
+
+
+def _table():
+    t = bytearray([C_SYMBOL]) * 256
+    for chars, bit in ((LOWER, C_LOWER), (UPPER, C_UPPER), (DIGIT, C_DIGIT)):
+        for ch in chars:
+            t[ord(ch)] = bit
+    return bytes(t)
+
+
+CLASS_TABLE = _table()
+POPCOUNT = [bin(m).count("1") for m in range(16)]
+POOL = [sum(n for bit, n in ((C_LOWER, len(LOWER)), (C_UPPER, len(UPPER)),
+                             (C_DIGIT, len(DIGIT)), (C_SYMBOL, len(SYMBOL))) if m & bit)
+        for m in range(16)]
+LOG2_POOL = [math.log2(p) if p else 0.0 for p in POOL]
+
+
+def class_mask(pw):
+    return sum(set(pw.encode("utf-8", "surrogatepass").translate(CLASS_TABLE)))
+
+
+def label_for(length, classes):
+    if length >= 14 and classes == 4:
+        return "STRONG"
+    if length >= 12 and classes >= 3:
+        return "GOOD"
+    if length >= 10 and classes >= 2:
+        return "FAIR"
+    return "WEAK"
+
+
+def strength(pw):
+    # -> (label, entropy bits)
+    mask = class_mask(pw)
+    n = len(pw)
+    return label_for(n, POPCOUNT[mask]), n * LOG2_POOL[mask]
+
+
+def label(pw):
+    return label_for(len(pw), POPCOUNT[class_mask(pw)])
+
+
+def strength_batch(pws):
+    # Scores a whole list in one call -> (labels, bits) lists.
+    if not HAS_NUMPY or len(pws) < 64:
+        out = [strength(pw) for pw in pws]
+        return [o[0] for o in out], [o[1] for o in out]
+    lengths = np.fromiter((len(pw) for pw in pws), np.int64, len(pws))
+    blob = "".join(pws).encode("utf-8", "surrogatepass")
+    codes = np.frombuffer(blob.translate(CLASS_TABLE), np.uint8)
+    if len(blob) != lengths.sum():
+        # Non-ASCII input: segment by encoded byte length instead.
+        seg = np.fromiter((len(pw.encode("utf-8", "surrogatepass")) for pw in pws), np.int64, len(pws))
+    else:
+        seg = lengths
+    starts = np.concatenate(([0], np.cumsum(seg)[:-1]))
+    masks = np.zeros(len(pws), np.uint8)
+    nz = seg > 0
+    if len(codes):
+        masks[nz] = np.bitwise_or.reduceat(codes, starts[nz])
+    classes = np.asarray(POPCOUNT, np.int64)[masks]
+    bits = lengths * np.asarray(LOG2_POOL)[masks]
+    idx = np.zeros(len(pws), np.int64)
+    idx[(lengths >= 10) & (classes >= 2)] = 1
+    idx[(lengths >= 12) & (classes >= 3)] = 2
+    idx[(lengths >= 14) & (classes == 4)] = 3
+    return [LABELS[i] for i in idx.tolist()], bits.tolist()
+
+
+def labels(pws):
+    return strength_batch(pws)[0]
+
+
+# ----------------------------
+# Passphrases
+# Scored by entropy alone, words x log2(list size): the words are all
+# lowercase, so the class rules above would call every passphrase WEAK.
+# phrase_label() in MB.py uses the same thresholds.
+# ----------------------------
+PHRASE_LABELS = ((77, "STRONG"), (66, "GOOD"), (55, "FAIR"))
+
+
+def phrase_label_for(bits):
+    for threshold, name in PHRASE_LABELS:
+        if bits >= threshold:
+            return name
+    return "WEAK"
+
+
+def phrase_strength(phrase, list_size, sep="-"):
+    # -> (label, entropy bits)
+    bits = (phrase.count(sep) + 1) * math.log2(list_size)
+    return phrase_label_for(bits), bits
+
+
+def phrase_batch(phrases, list_size, sep="-"):
+    out = [phrase_strength(p, list_size, sep) for p in phrases]
+    return [o[0] for o in out], [o[1] for o in out]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Score a password list (one per line).")
+    ap.add_argument("file", nargs="?", help="input file (default: stdin)")
+    ap.add_argument("--csv", help="write password,strength,bits rows here")
+    args = ap.parse_args()
+
+    if args.file:
+        with open(args.file, "r", encoding="utf-8", errors="surrogateescape") as f:
+            pws = f.read().splitlines()
+    else:
+        pws = sys.stdin.read().splitlines()
+    labs, bits = strength_batch(pws)
+    if args.csv:
+        import csv
+        with open(args.csv, "w", encoding="utf-8", errors="surrogateescape", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(("password", "strength", "bits"))
+            w.writerows(zip(pws, labs, (round(b, 1) for b in bits)))
+    counts = Counter(labs)
+    for name in reversed(LABELS):
+        print(f"{name:7s} {counts.get(name, 0)}")
+    if bits:
+        print(f"median bits {sorted(bits)[len(bits) // 2]:.1f}")
+
+
+if __name__ == "__main__":
+    main()
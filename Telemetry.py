@@ -0,0 +1,272 @@
+import math
+from array import array
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except Exception:
+    HAS_NUMPY = False
+
+# ----------------------------
+# Columnar telemetry history
+#   raw:     t (device ms), ax, ay, az, sl
+#   derived: mag = |a|, jerk = d|a|/dt (mg/s), rms = rolling RMS of mag
+# ----------------------------
+RAW_CHANNELS = ("t", "ax", "ay", "az", "sl")
+DERIVED_CHANNELS = ("mag", "jerk", "rms")
+CHANNELS = RAW_CHANNELS + DERIVED_CHANNELS
+
+RMS_WINDOW = 16
+
+
+def _zeros(n):
+    if HAS_NUMPY:
+        return np.zeros(n, dtype=np.float64)
+    return array("d", bytes(8 * n))
+
+
+class TelemetryRing:
+    # Preallocated ring of float64 columns, one per channel. Batches are
+    # appended in one call; with NumPy the derived channels are computed
+    # vectorised over the whole batch.
+    def __init__(self, capacity, rms_window=RMS_WINDOW):
+        self.capacity = max(2, int(capacity))
+        self.rms_window = max(1, int(rms_window))
+        self.cols = {name: _zeros(self.capacity) for name in CHANNELS}
+        self.head = 0
+        self.count = 0
+        self.total = 0
+
+    def __len__(self):
+        return self.count
+
+    def last(self, name, default=0.0):
+        if not self.count:
+            return default
+        return float(self.cols[name][(self.head - 1) % self.capacity])
+
+    def view(self, name, n=None):
+        # Chronological copy of the newest n values of a channel.
+        n = self.count if n is None else min(n, self.count)
+        col = self.cols[name]
+        start = (self.head - n) % self.capacity
+        if start + n <= self.capacity:
+            return col[start:start + n]
+        if HAS_NUMPY:
+            return np.concatenate((col[start:], col[:self.head]))
+        return col[start:] + col[:self.head]
+
+    def window(self, names, span):
+        # Columns for the samples within span ms of the newest one, starting
+        # after the last time the device clock went backwards (a reset).
+        if not self.count:
+            return {name: [] for name in names}
+        if HAS_NUMPY:
+            t = self.view("t")
+            back = np.flatnonzero(t[1:] < t[:-1])
+            first = back[-1] + 1 if len(back) else 0
+            n = len(t) - first - int(np.searchsorted(t[first:], t[-1] - span, "left"))
+        else:
+            col = self.cols["t"]
+            cap = self.capacity
+            i = (self.head - 1) % cap
+            lo = col[i] - span
+            prev = col[i]
+            n = 1
+            while n < self.count:
+                v = col[(i - n) % cap]
+                if v < lo or v > prev:
+                    break
+                prev = v
+                n += 1
+        return {name: self.view(name, n) for name in names}
+
+    def resize(self, capacity):
+        capacity = max(2, int(capacity))
+        keep = min(self.count, capacity)
+        cols = {}
+        for name in CHANNELS:
+            col = _zeros(capacity)
+            if keep:
+                col[0:keep] = self.view(name, keep)
+            cols[name] = col
+        self.cols = cols
+        self.capacity = capacity
+        self.count = keep
+        self.head = keep % capacity
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+    def append(self, t, ax, ay, az, sl):
+        self.append_batch(((t, ax, ay, az, sl),))
+
+    def append_batch(self, samples):
+        if not samples:
+            return
+        if HAS_NUMPY:
+            cols = self._derive_np(samples)
+        else:
+            cols = self._derive_py(samples)
+        k = len(cols["t"])
+        if k > self.capacity:
+            for name in CHANNELS:
+                cols[name] = cols[name][k - self.capacity:]
+            k = self.capacity
+        head = self.head
+        first = min(k, self.capacity - head)
+        for name in CHANNELS:
+            col = self.cols[name]
+            vals = cols[name]
+            col[head:head + first] = vals[:first]
+            if first < k:
+                col[0:k - first] = vals[first:]
+        self.head = (head + k) % self.capacity
+        self.count = min(self.capacity, self.count + k)
+        self.total += len(samples)
+
+    def _derive_np(self, samples):
+        raw = np.asarray(samples, dtype=np.float64).reshape(-1, 5)
+        t, ax, ay, az, sl = raw.T
+        mag = np.sqrt(ax * ax + ay * ay + az * az)
+
+        prev_t = self.last("t", t[0])
+        prev_mag = self.last("mag", mag[0])
+        dt = np.diff(t, prepend=prev_t)
+        dm = np.diff(mag, prepend=prev_mag)
+        jerk = np.divide(dm * 1000.0, dt, out=np.zeros_like(dm), where=dt > 0)
+
+        w = self.rms_window
+        tail = self.view("mag", w - 1)
+        ext = np.concatenate((tail, mag))
+        cs = np.concatenate(([0.0], np.cumsum(ext * ext)))
+        pos = np.arange(len(tail), len(ext))
+        lo = np.maximum(pos - w + 1, 0)
+        rms = np.sqrt((cs[pos + 1] - cs[lo]) / (pos + 1 - lo))
+
+        return {"t": t, "ax": ax, "ay": ay, "az": az, "sl": sl,
+                "mag": mag, "jerk": jerk, "rms": rms}
+
+    def _derive_py(self, samples):
+        cols = {name: array("d") for name in CHANNELS}
+        prev_t = self.last("t", None)
+        prev_mag = self.last("mag", None)
+        w = self.rms_window
+        win = list(self.view("mag", w - 1))
+        sq = sum(m * m for m in win)
+        for t, ax, ay, az, sl in samples:
+            mag = math.sqrt(ax * ax + ay * ay + az * az)
+            if prev_t is None or t <= prev_t:
+                jerk = 0.0
+            else:
+                jerk = (mag - prev_mag) * 1000.0 / (t - prev_t)
+            win.append(mag)
+            sq += mag * mag
+            if len(win) > w:
+                old = win.pop(0)
+                sq -= old * old
+            cols["t"].append(t)
+            cols["ax"].append(ax)
+            cols["ay"].append(ay)
+            cols["az"].append(az)
+            cols["sl"].append(sl)
+            cols["mag"].append(mag)
+            cols["jerk"].append(jerk)
+            cols["rms"].append(math.sqrt(max(sq, 0.0) / len(win)))
+            prev_t = t
+            prev_mag = mag
+        return cols
+
+
+# ----------------------------
+# Level of detail for strip charts
+# Samples are bucketed by time, one bucket per pixel column, and each
+# bucket is drawn as its min and max, in the order they occurred (as in
+# M4), so the polyline still runs forward in time. A chart never plots
+# more than 2 x width points however long the window is, and short
+# spikes (shakes) survive the reduction.
+# ----------------------------
+def decimate(t, cols, t0, t1, buckets):
+    # -> (xs, {name: ys}), two points per non-empty bucket.
+    n = len(t)
+    buckets = max(1, int(buckets))
+    if n <= 2 * buckets or t1 <= t0:
+        return t, cols
+    scale = buckets / (t1 - t0)
+    if HAS_NUMPY:
+        t = np.asarray(t)
+        b = ((t - t0) * scale).astype(np.int64)
+        starts = np.flatnonzero(np.concatenate(([True], b[1:] != b[:-1])))
+        bucket = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, n)))
+        idx = np.arange(n)
+        out = {}
+        for name, y in cols.items():
+            y = np.asarray(y)
+            lo = np.minimum.reduceat(y, starts)
+            hi = np.maximum.reduceat(y, starts)
+            # First index of each bucket's min and max.
+            ilo = np.minimum.reduceat(np.where(y == lo[bucket], idx, n), starts)
+            ihi = np.minimum.reduceat(np.where(y == hi[bucket], idx, n), starts)
+            first = ilo <= ihi
+            pair = np.empty(2 * len(starts))
+            pair[0::2] = np.where(first, lo, hi)
+            pair[1::2] = np.where(first, hi, lo)
+            out[name] = pair
+        return np.repeat(t[starts], 2), out
+
+    names = list(cols)
+    ys = [cols[name] for name in names]
+    xs = []
+    out = [[] for _ in names]
+    cur = None
+    lo = hi = ilo = ihi = x = None
+    for i in range(n):
+        b = int((t[i] - t0) * scale)
+        if b != cur:
+            if cur is not None:
+                _emit_pair(xs, out, x, lo, hi, ilo, ihi)
+            cur = b
+            x = t[i]
+            lo = [y[i] for y in ys]
+            hi = list(lo)
+            ilo = [i] * len(ys)
+            ihi = list(ilo)
+            continue
+        for k, y in enumerate(ys):
+            v = y[i]
+            if v < lo[k]:
+                lo[k] = v
+                ilo[k] = i
+            elif v > hi[k]:
+                hi[k] = v
+                ihi[k] = i
+    _emit_pair(xs, out, x, lo, hi, ilo, ihi)
+    return xs, dict(zip(names, out))
+
+
+def _emit_pair(xs, out, x, lo, hi, ilo, ihi):
+    xs.append(x)
+    xs.append(x)
+    for o, a, z, ia, iz in zip(out, lo, hi, ilo, ihi):
+        if ia <= iz:
+            o.append(a)
+            o.append(z)
+        else:
+            o.append(z)
+            o.append(a)
+
+
+def strip_coords(xs, ys, t0, x0, sx, y0, sy, lo, hi):
+    # Flat x,y list for Canvas.coords: x = x0 + (t - t0) * sx and
+    # y = y0 - v * sy, with v clamped to [lo, hi].
+    if HAS_NUMPY:
+        out = np.empty(2 * len(xs))
+        out[0::2] = x0 + (np.asarray(xs) - t0) * sx
+        out[1::2] = y0 - np.clip(ys, lo, hi) * sy
+        return np.round(out, 1).tolist()
+    out = []
+    for t, v in zip(xs, ys):
+        out.append(round(x0 + (t - t0) * sx, 1))
+        out.append(round(y0 - min(max(v, lo), hi) * sy, 1))
+    return out
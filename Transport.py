@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+
+BAUD = 115200
+
+# ----------------------------
+# Transports
+# Everything the client talks to exposes the small pyserial subset it uses:
+#   in_waiting, read(n), readinto(buf), write(data), close(), port
+# ----------------------------
+
+
+def open_serial(port, baud=BAUD, timeout=0.5):
+    import serial
+    return serial.Serial(port, baud, timeout=timeout)
+
+
+class _Pipe:
+    def __init__(self):
+        self.buf = bytearray()
+        self.cond = threading.Condition()
+        self.closed = False
+
+
+class LoopbackEnd:
+    # One end of an in-process byte pipe pair. read() blocks for up to
+    # `timeout` seconds like a serial port; write() never blocks.
+    def __init__(self, rx, tx, port, timeout=0.5):
+        self.rx = rx
+        self.tx = tx
+        self.port = port
+        self.timeout = timeout
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    @property
+    def in_waiting(self):
+        return len(self.rx.buf)
+
+    def _wait(self, timeout):
+        rx = self.rx
+        if not rx.buf and not rx.closed and timeout:
+            rx.cond.wait(timeout)
+
+    def read(self, n=1):
+        rx = self.rx
+        with rx.cond:
+            self._wait(self.timeout)
+            if rx.closed and not rx.buf:
+                raise OSError("loopback closed")
+            data = bytes(rx.buf[:n])
+            del rx.buf[:n]
+        self.bytes_in += len(data)
+        return data
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def readline(self):
+        rx = self.rx
+        deadline = time.monotonic() + (self.timeout or 0)
+        with rx.cond:
+            while True:
+                i = rx.buf.find(b"\n")
+                if i != -1:
+                    data = bytes(rx.buf[:i + 1])
+                    del rx.buf[:i + 1]
+                    break
+                left = deadline - time.monotonic()
+                if rx.closed or left <= 0:
+                    data = bytes(rx.buf)
+                    rx.buf.clear()
+                    break
+                rx.cond.wait(left)
+        self.bytes_in += len(data)
+        return data
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        tx = self.tx
+        with tx.cond:
+            if tx.closed:
+                raise OSError("loopback closed")
+            tx.buf += data
+            tx.cond.notify_all()
+        self.bytes_out += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        for p in (self.rx, self.tx):
+            with p.cond:
+                p.closed = True
+                p.cond.notify_all()
+
+
+def loopback_pair(name="loop", timeout=0.5):
+    # Returns (host_end, device_end).
+    a = _Pipe()
+    b = _Pipe()
+    return LoopbackEnd(a, b, name + ":host", timeout), LoopbackEnd(b, a, name + ":device", timeout)
+
+
+class PtyEnd:
+    # Master side of a pseudo-terminal (POSIX only). The slave path can be
+    # opened by any serial client, e.g. `python Client.py --port /dev/pts/N`.
+    def __init__(self, timeout=0.5):
+        import tty
+        self.fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        self.port = os.ttyname(self.slave_fd)
+        self.timeout = timeout
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    @property
+    def in_waiting(self):
+        import fcntl
+        import termios
+        import struct
+        raw = fcntl.ioctl(self.fd, termios.FIONREAD, b"\0\0\0\0")
+        return struct.unpack("i", raw)[0]
+
+    def read(self, n=1):
+        import select
+        r, _, _ = select.select([self.fd], [], [], self.timeout)
+        if not r:
+            return b""
+        data = os.read(self.fd, n)
+        self.bytes_in += len(data)
+        return data
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def readline(self):
+        out = bytearray()
+        while not out.endswith(b"\n"):
+            c = self.read(1)
+            if not c:
+                break
+            out += c
+        return bytes(out)
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        view = memoryview(data)
+        while view:
+            n = os.write(self.fd, view)
+            view = view[n:]
+        self.bytes_out += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        for fd in (self.fd, self.slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
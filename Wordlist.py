@@ -0,0 +1,195 @@
+import argparse
+import bisect
+import math
+import mmap
+import os
+import secrets
+import struct
+
+# ----------------------------
+# Packed wordlists for passphrases (MODE:PHRASE)
+# Words are grouped by length and each group is a fixed-stride run of
+# ASCII letters with no separators, so word i is found from a tiny group
+# table and one slice; nothing is decoded or split at load time:
+#   "MBWL" | version:u8 | groups:u8 | count:u32le
+#   groups x (length:u8, first index:u32le, offset:u32le)
+#   letters (offsets are relative to the start of this blob)
+# The host list is memory-mapped, so a 7772-word list costs one open().
+#
+# The device reads a DEVICE_WORDS-word subset in the same layout from
+# phrase.mbwl on the micro:bit filesystem: every hyphen-free word of up
+# to five letters and evenly spaced six-letter ones, all from the host
+# list, so a device word is exactly 11 bits. `python Wordlist.py
+# firmware` regenerates that file; copy it to the board next to MB.py.
+#
+# eff_large.mbwl is the EFF large wordlist (CC BY 3.0 US) without its
+# four hyphenated words.
+# ----------------------------
+MAGIC = b"MBWL"
+VERSION = 1
+HEADER = struct.Struct("<4sBBI")
+GROUP = struct.Struct("<BII")
+SEPARATOR = "-"
+DEVICE_WORDS = 2048
+HOST_LIST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eff_large.mbwl")
+DEVICE_LIST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "phrase.mbwl")
+
+
+def clean_words(lines):
+    # One word per line, or diceware "<dice> <word>" lines. Keeps lowercase
+    # ASCII letters only, so SEPARATOR can never appear inside a word.
+    seen = set()
+    out = []
+    for line in lines:
+        parts = line.split()
+        if not parts:
+            continue
+        w = parts[-1].lower()
+        if w.isascii() and w.isalpha() and w not in seen:
+            seen.add(w)
+            out.append(w)
+    return out
+
+
+def _layout(words):
+    # -> ([(length, first, offset)], letters) with words sorted by (length, word)
+    words = sorted(set(words), key=lambda w: (len(w), w))
+    groups = []
+    blob = []
+    off = 0
+    for i, w in enumerate(words):
+        if not groups or groups[-1][0] != len(w):
+            groups.append((len(w), i, off))
+        blob.append(w)
+        off += len(w)
+    return groups, "".join(blob).encode("ascii"), len(words)
+
+
+def pack(words):
+    groups, letters, count = _layout(words)
+    if len(groups) > 255 or any(n > 255 for n, _, _ in groups):
+        raise ValueError("words too long")
+    head = HEADER.pack(MAGIC, VERSION, len(groups), count)
+    return head + b"".join(GROUP.pack(*g) for g in groups) + letters
+
+
+def device_subset(words, n=DEVICE_WORDS):
+    by_len = {}
+    for w in sorted(set(words)):
+        by_len.setdefault(len(w), []).append(w)
+    out = []
+    for length in sorted(by_len):
+        group = by_len[length]
+        need = n - len(out)
+        if need <= 0:
+            break
+        if len(group) <= need:
+            out.extend(group)
+        else:
+            out.extend(group[i * len(group) // need] for i in range(need))
+    if len(out) < n:
+        raise ValueError(f"only {len(out)} words, need {n}")
+    return out
+
+
+class Wordlist:
+    def __init__(self, path=HOST_LIST):
+        self.path = path
+        with open(path, "rb") as f:
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._parse()
+
+    @classmethod
+    def from_words(cls, words):
+        wl = cls.__new__(cls)
+        wl.path = None
+        wl.buf = pack(words)
+        wl._parse()
+        return wl
+
+    def _parse(self):
+        buf = self.buf
+        if len(buf) < HEADER.size:
+            raise ValueError("not a packed wordlist")
+        magic, version, ngroups, count = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a packed wordlist")
+        base = HEADER.size + ngroups * GROUP.size
+        groups = [GROUP.unpack_from(buf, HEADER.size + i * GROUP.size) for i in range(ngroups)]
+        self.count = count
+        self.lens = [g[0] for g in groups]
+        self.firsts = [g[1] for g in groups]
+        self.offsets = [base + g[2] for g in groups]
+        end = self.offsets[-1] + (count - self.firsts[-1]) * self.lens[-1] if groups else base
+        if end != len(buf):
+            raise ValueError("truncated wordlist")
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        g = bisect.bisect_right(self.firsts, i) - 1
+        n = self.lens[g]
+        start = self.offsets[g] + (i - self.firsts[g]) * n
+        return self.buf[start:start + n].decode("ascii")
+
+    @property
+    def bits(self):
+        return math.log2(self.count) if self.count else 0.0
+
+    def words(self):
+        return [self[i] for i in range(self.count)]
+
+    def close(self):
+        if isinstance(self.buf, mmap.mmap):
+            self.buf.close()
+
+
+def load_words(path):
+    if path.endswith(".mbwl"):
+        wl = Wordlist(path)
+        try:
+            return wl.words()
+        finally:
+            wl.close()
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return clean_words(f)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build and inspect packed passphrase wordlists.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="pack a word-per-line or diceware list")
+    b.add_argument("src")
+    b.add_argument("-o", "--out", default=HOST_LIST)
+    fw = sub.add_parser("firmware", help="write the device wordlist file (phrase.mbwl)")
+    fw.add_argument("src", nargs="?", default=HOST_LIST)
+    fw.add_argument("-o", "--out", default=DEVICE_LIST)
+    info = sub.add_parser("info", help="show a packed list and a sample passphrase")
+    info.add_argument("src", nargs="?", default=HOST_LIST)
+    info.add_argument("--words", type=int, default=6)
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        words = load_words(args.src)
+        with open(args.out, "wb") as f:
+            f.write(pack(words))
+        print(f"{len(words)} words -> {args.out} ({os.path.getsize(args.out)} bytes)")
+    elif args.cmd == "firmware":
+        with open(args.out, "wb") as f:
+            f.write(pack(device_subset(load_words(args.src))))
+        print(f"{DEVICE_WORDS} words -> {args.out} ({os.path.getsize(args.out)} bytes)")
+    else:
+        wl = Wordlist(args.src)
+        print(f"{wl.count} words, {wl.bits:.2f} bits/word, {len(wl.buf)} bytes, "
+              f"{wl.lens[0]}-{wl.lens[-1]} letters")
+        print(SEPARATOR.join(wl[secrets.randbelow(wl.count)] for _ in range(args.words)))
+        wl.close()
+
+
+if __name__ == "__main__":
+    main()
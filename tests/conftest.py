@@ -0,0 +1,110 @@
+import ast
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIRMWARE = os.path.join(ROOT, "MB.py")
+
+
+def firmware_defs(*names):
+    # Top-level assignments and functions from MB.py, without running the
+    # rest of the script (no microbit module needed).
+    with open(FIRMWARE, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), FIRMWARE)
+    keep = []
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name in names:
+            keep.append(node)
+        elif isinstance(node, ast.Assign) and any(
+                isinstance(t, ast.Name) and t.id in names for t in node.targets):
+            keep.append(node)
+    env = {}
+    exec(compile(ast.Module(body=keep, type_ignores=[]), FIRMWARE, "exec"), env)
+    return env
+
+
+class FakeLoop:
+    # Just the call_later() the CommandChannel needs, on a manual clock.
+    def __init__(self):
+        self.now = 0.0
+        self.timers = []
+
+    def call_later(self, delay, fn, *args):
+        t = FakeTimer(self.now + delay, fn, args)
+        self.timers.append(t)
+        return t
+
+    def advance(self, dt):
+        end = self.now + dt
+        while True:
+            due = [t for t in self.timers if not t.cancelled and t.when <= end]
+            if not due:
+                break
+            t = min(due, key=lambda t: t.when)
+            self.timers.remove(t)
+            self.now = t.when
+            t.fn(*t.args)
+        self.now = end
+
+
+class FakeTimer:
+    def __init__(self, when, fn, args):
+        self.when = when
+        self.fn = fn
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+@pytest.fixture
+def loop():
+    return FakeLoop()
+
+
+class Device:
+    # Line-level access to an emulated board running MB.py.
+    def __init__(self, host, emu):
+        self.host = host
+        self.emu = emu
+        self.buf = b""
+
+    def send(self, line):
+        self.host.write((line + "\n").encode())
+
+    def lines(self):
+        data = self.host.read(1 << 16)
+        if data:
+            self.buf += data
+        *done, self.buf = self.buf.split(b"\n")
+        return [d.decode("utf-8", "replace").strip() for d in done]
+
+    def until(self, pred, timeout=10.0):
+        # Text lines up to and including the first one matching pred.
+        out = []
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            for line in self.lines():
+                out.append(line)
+                if pred(line):
+                    return out
+            time.sleep(0.01)
+        raise AssertionError(f"timed out, got {out[-10:]}")
+
+
+@pytest.fixture
+def device():
+    from Emulator import emulated_transport
+    host, emu = emulated_transport(speed=0)
+    host.timeout = 0
+    dev = Device(host, emu)
+    dev.send("TELEM:OFF")
+    yield dev
+    emu.stop()
+    assert emu.error is None
@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from Analyzer import (H_WARN, EntropyAnalyzer, chi2, chi2_sf, collision_times, h_collision,
+                      h_markov, h_mcv)
+from Entropy import EntropyPool, HmacDrbg, HostGenerator
+
+
+def random_samples(n, seed=3):
+    rng = random.Random(seed)
+    return [(i * 20, rng.randint(-2048, 2047), rng.randint(-2048, 2047),
+             rng.randint(-2048, 2047), rng.randint(0, 255)) for i in range(n)]
+
+
+def test_mcv_bounds():
+    assert h_mcv(1000, 1000) == 0.0
+    h = h_mcv(4096 // 16, 4096)
+    assert 3.5 < h < 4.0
+
+
+def test_collision_times():
+    assert collision_times([0, 0, 1, 0, 1, 1, 1]) == [2, 3, 2]
+    assert h_collision([2] * 100) == 0.0
+    assert h_collision([2, 3] * 500) > 0.6     # 99% lower bound at E[t] = 2.5
+
+
+def test_markov():
+    assert h_markov(500, 500, 0, 500, 500, 0) < 0.05         # 0101...
+    assert h_markov(500, 500, 250, 250, 250, 250) > 0.9
+
+
+def test_chi2():
+    stat, df, p = chi2([10, 10, 10], [10.0, 10.0, 10.0])
+    assert stat == 0.0 and df == 2 and p == 1.0
+    assert chi2_sf(100.0, 3) < 1e-6
+    assert chi2_sf(3.0, 3) == pytest.approx(0.39, abs=0.02)     # exact: 0.3916
+
+
+def test_uniform_sensor_noise_scores_near_full():
+    qa = EntropyAnalyzer()
+    qa.add_samples(random_samples(qa.window))
+    assert qa.update()
+    for ch, row in qa.latest.items():
+        assert row["min"] > 3.0, ch
+    assert qa.health() == "OK"
+
+
+def test_stuck_sensor_is_low():
+    qa = EntropyAnalyzer()
+    qa.add_samples([(i, 5, 5, 5, 5) for i in range(qa.window)])
+    assert qa.update()
+    assert qa.sensor_bits() < H_WARN
+    assert qa.health() == "LOW"
+
+
+def test_update_waits_for_a_window():
+    qa = EntropyAnalyzer()
+    qa.add_samples(random_samples(qa.window - 1))
+    assert not qa.update()
+    assert qa.latest == {}
+
+
+def test_generator_passwords_pass():
+    gen = HostGenerator(EntropyPool())
+    gen.drbg = HmacDrbg(b"\x11" * 32)
+    qa = EntropyAnalyzer()
+    qa.add_passwords(gen.passwords(2000, 16))
+    stats = qa.password_stats()
+    assert stats["passwords"] == 2000 and stats["foreign_chars"] == 0
+    assert stats["p"] > 0.001
+    assert qa.health() == "OK"
+
+
+def test_biased_passwords_fail():
+    rng = random.Random(5)
+    qa = EntropyAnalyzer()
+    qa.add_passwords("aA1!" + "".join(rng.choice("abcdef") for _ in range(12)) for _ in range(500))
+    assert qa.password_stats()["p"] < 0.001
+    assert qa.health() == "FAIL"
+
+
+def test_redacted_passwords_fail():
+    # "*" is a symbol, so a redacted log would read as heavy bias; the
+    # client keeps them out of the analyzer (App.sample_password).
+    qa = EntropyAnalyzer()
+    qa.add_passwords(["*" * 12] * 200)
+    assert qa.health() == "FAIL"
+
+
+def test_numpy_and_python_scores_agree(monkeypatch):
+    import Analyzer
+    if not Analyzer.HAS_NUMPY:
+        pytest.skip("NumPy not installed")
+    samples = random_samples(4096, seed=9)
+    fast = EntropyAnalyzer()
+    fast.add_samples(samples)
+    fast.update()
+    monkeypatch.setattr(Analyzer, "HAS_NUMPY", False)
+    slow = EntropyAnalyzer()
+    slow.add_samples(samples)
+    slow.update()
+    for ch in Analyzer.CHANNELS:
+        for k in ("mcv", "collision", "markov"):
+            assert fast.latest[ch][k] == pytest.approx(slow.latest[ch][k], rel=1e-6), (ch, k)
@@ -0,0 +1,116 @@
+import pytest
+
+from Commands import ACK_TIMEOUT_S, RETRIES, CommandChannel, Request
+
+
+@pytest.fixture
+def chan(loop):
+    wrote = []
+    done = []
+    ch = CommandChannel(loop, wrote.append, done.append)
+    ch.wrote = wrote
+    ch.done = done
+    return ch
+
+
+def test_tagged_and_acked(chan):
+    chan.attached()
+    req = Request("LEN:16")
+    chan.submit(req)
+    assert chan.wrote == [b"@1:LEN:16\n"]
+    assert chan.observe(["AK:1", "EV:IDLE"]) == ["EV:IDLE"]
+    assert req.status == "ok" and chan.done == [req]
+    assert req.rtt is not None
+    assert chan.tagged is True
+
+
+def test_replies_are_attributed(chan):
+    chan.attached()
+    req = Request("GEN")
+    chan.submit(req)
+    chan.observe(["AK:1"])
+    assert req.status == "acked"
+    out = chan.observe(["RQ:1", "PW:abc", "ST:WEAK", "LN:3"])
+    assert out == ["PW:abc", "ST:WEAK", "LN:3"]
+    assert req.status == "ok"
+    assert req.replies == ["PW:abc", "ST:WEAK", "LN:3"]
+
+
+def test_rejected(chan):
+    chan.attached()
+    req = Request("GEN:5")
+    chan.submit(req)
+    chan.observe(["NK:1"])
+    assert req.status == "rejected" and chan.rejected == 1
+
+
+def test_settings_coalesce_while_queued(chan):
+    a, b, c, d = Request("LEN:10"), Request("LEN:12"), Request("TELEM:ON"), Request("LEN:14")
+    for r in (a, b, c, d):
+        chan.submit(r)
+    assert [r.line for r in chan.queue] == ["TELEM:ON", "LEN:14"]
+    assert a.status == b.status == "coalesced" and chan.coalesced == 2
+    chan.attached()
+    assert chan.wrote == [b"@1:TELEM:ON\n", b"@2:LEN:14\n"]
+
+
+def test_command_between_settings_blocks_coalescing(chan):
+    for line in ("LEN:10", "GEN", "LEN:12"):
+        chan.submit(Request(line))
+    assert [r.line for r in chan.queue] == ["LEN:10", "GEN", "LEN:12"]
+    assert chan.coalesced == 0
+
+
+def test_retry_keeps_id_then_acks(chan, loop):
+    chan.attached()
+    req = Request("LEN:16")
+    chan.submit(req)
+    loop.advance(ACK_TIMEOUT_S + 0.01)
+    assert chan.wrote == [b"@1:LEN:16\n"] * 2
+    assert chan.retries == 1
+    chan.observe(["AK:1"])
+    assert req.status == "ok" and req.tries == 2
+
+
+def test_timeout_after_retries_once_tagging_is_known(chan, loop):
+    chan.attached()
+    first = Request("LEN:16")
+    chan.submit(first)
+    chan.observe(["AK:1"])
+    req = Request("LEN:12")
+    chan.submit(req)
+    loop.advance((RETRIES + 1) * ACK_TIMEOUT_S + 0.01)
+    assert len(chan.wrote) == 1 + RETRIES + 1
+    assert req.status == "timeout" and chan.timeouts == 1
+    assert chan.tagged is True
+
+
+def test_untagged_firmware_gets_plain_commands(chan, loop):
+    chan.window = 2
+    chan.attached()
+    reqs = [Request("GEN"), Request("LEN:16"), Request("TELEM:ON")]
+    for r in reqs:
+        chan.submit(r)
+    loop.advance((RETRIES + 1) * ACK_TIMEOUT_S + 0.01)
+    assert chan.tagged is False
+    # The tagged GEN may have run on a slow link: never repeated plain.
+    assert b"GEN\n" not in chan.wrote
+    assert [r.status for r in reqs] == ["timeout", "timeout", "sent"]
+    assert chan.wrote[-1] == b"TELEM:ON\n"
+    later = Request("LEN:12")
+    chan.submit(later)
+    assert chan.wrote[-1] == b"LEN:12\n"
+    assert later.status == "sent" and later.ok
+
+
+def test_detach_drops_inflight_and_close_drops_queue(chan):
+    chan.attached()
+    sent = Request("GEN")
+    chan.submit(sent)
+    chan.detached()
+    assert sent.status == "dropped"
+    queued = Request("LEN:10")
+    chan.submit(queued)
+    assert queued.status == "queued"
+    chan.close()
+    assert queued.status == "dropped"
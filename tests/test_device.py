@@ -0,0 +1,66 @@
+import Strength
+from Wordlist import DEVICE_LIST, DEVICE_WORDS, Wordlist
+
+# Round trips against MB.py running in the emulator.
+
+
+def test_len_and_gen(device):
+    device.send("@1:LEN:16")
+    assert device.until(lambda l: l.startswith(("AK:1", "NK:1")))[-1] == "AK:1"
+    device.send("@2:GEN")
+    lines = device.until(lambda l: l.startswith("LN:"))
+    assert "AK:2" in lines and "RQ:2" in lines
+    pw = next(l[3:] for l in lines if l.startswith("PW:"))
+    label = next(l[3:] for l in lines if l.startswith("ST:"))
+    assert len(pw) == 16
+    assert label == Strength.label(pw)
+    assert lines[-1] == "LN:16"
+
+
+def test_repeated_id_is_not_run_twice(device):
+    device.send("@5:GEN")
+    device.until(lambda l: l.startswith("LN:"))
+    device.send("@5:GEN")
+    assert device.until(lambda l: l == "AK:5")
+    device.send("@6:STATS")
+    lines = device.until(lambda l: l.startswith("SX:"))
+    assert not any(l.startswith("PW:") for l in lines)
+
+
+def test_phrase_mode(device):
+    device.send("@1:MODE:PHRASE,5")
+    lines = device.until(lambda l: l.startswith(("AK:1", "NK:1")))
+    assert lines[-2:] == ["MD:PHRASE,5", "AK:1"]
+    device.send("@2:GEN")
+    lines = device.until(lambda l: l.startswith("LN:"))
+    phrase = next(l[3:] for l in lines if l.startswith("PW:"))
+    label = next(l[3:] for l in lines if l.startswith("ST:"))
+    words = phrase.split("-")
+    assert len(words) == 5 and lines[-1] == "LN:5"
+    wl = Wordlist(DEVICE_LIST)
+    try:
+        assert set(words) <= set(wl.words())
+    finally:
+        wl.close()
+    assert label == Strength.phrase_strength(phrase, DEVICE_WORDS)[0]
+
+
+def test_emulated_files_cannot_seek(device):
+    # micro:bit files have no seek(); neither do the emulator's.
+    with device.emu._open("phrase.mbwl", "rb") as f:
+        assert f.read(4) == b"MBWL"
+        assert not hasattr(f, "seek")
+
+
+def test_bad_commands_are_rejected(device):
+    for i, cmd in enumerate(("MODE:PHRASEX5", "MODE:PHRASE,", "RETX:10,5", "LAST"), 1):
+        device.send(f"@{i}:{cmd}")
+        assert device.until(lambda l: l.startswith((f"AK:{i}", f"NK:{i}")))[-1] == f"NK:{i}"
+
+
+def test_bulk_export(device):
+    device.send("@1:GEN:20,12")
+    lines = device.until(lambda l: l.startswith("BE:"))
+    rows = [l[3:].partition(",") for l in lines if l.startswith("PB:")]
+    assert [int(seq) for seq, _, _ in rows] == list(range(20))
+    assert all(len(pw) == 12 for _, _, pw in rows)
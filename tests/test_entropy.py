@@ -0,0 +1,53 @@
+import pytest
+
+from Entropy import ALLSET, DIGIT, LOWER, SYMBOL, UPPER, EntropyPool, HmacDrbg, HostGenerator, NeedsReseed
+
+# NIST CAVP HMAC_DRBG (SHA-256), no reseed, no prediction resistance,
+# no personalization or additional input, COUNT = 0.
+NIST_ENTROPY = "ca851911349384bffe89de1cbdc46e6831e44d34a4fb935ee285dd14b71a7488"
+NIST_NONCE = "659ba96c601dc69fc902940805ec0ca8"
+NIST_RETURNED = (
+    "e528e9abf2dece54d47c7e75e5fe302149f817ea9fb4bee6f4199697d04d5b89"
+    "d54fbb978a15b5c443c9ec21036d2460b6f73ebad0dc2aba6e624abf07745bc1"
+    "07694bb7547bb0995f70de25d6b29e2d3011bb19d27676c07162c8b5ccde0668"
+    "961df86803482cb37ed6d5c0bb8d50cf1f50d476aa0458bdaba806f48be9dcb8"
+)
+
+
+def test_hmac_drbg_nist_vector():
+    drbg = HmacDrbg(bytes.fromhex(NIST_ENTROPY), bytes.fromhex(NIST_NONCE))
+    drbg.generate(128)
+    assert drbg.generate(128).hex() == NIST_RETURNED
+
+
+def test_hmac_drbg_reseed_changes_output():
+    a = HmacDrbg(b"\x01" * 32)
+    b = HmacDrbg(b"\x01" * 32)
+    b.reseed(b"\x02" * 32)
+    assert a.generate(32) != b.generate(32)
+
+
+def seeded_generator():
+    gen = HostGenerator(EntropyPool())
+    gen.drbg = HmacDrbg(b"\x42" * 32, b"test")
+    return gen
+
+
+def test_generator_needs_a_warm_pool():
+    with pytest.raises(NeedsReseed):
+        HostGenerator(EntropyPool()).password(16)
+
+
+def test_passwords_follow_policy():
+    gen = seeded_generator()
+    for pw in gen.passwords(200, 16):
+        assert len(pw) == 16
+        assert set(pw) <= set(ALLSET)
+        for cls in (LOWER, UPPER, DIGIT, SYMBOL):
+            assert any(c in cls for c in pw)
+
+
+def test_randbelow_range():
+    gen = seeded_generator()
+    draws = [gen.randbelow(7) for _ in range(2000)]
+    assert set(draws) == set(range(7))
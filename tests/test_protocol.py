@@ -0,0 +1,109 @@
+import struct
+
+from Protocol import (FT_SEQ_SAMPLES, SAMPLE_FMT, RecordQueue, Resequencer, StreamDecoder,
+                      fletcher16, pack_frame, pack_samples)
+
+SAMPLES = [(1000, -5, 12, 1024, 30), (1040, 2047, -2048, 0, 255)]
+
+
+def test_fletcher16_reference_vectors():
+    assert fletcher16(b"abcde") == 0xC8F0
+    assert fletcher16(b"abcdef") == 0x2057
+    assert fletcher16(b"abcdefgh") == 0x0627
+    assert fletcher16(b"") == 0
+
+
+def test_fletcher16_matches_bytewise_loop():
+    data = bytes(range(256)) * 3
+    s1 = s2 = 0
+    for b in data:
+        s1 = (s1 + b) % 255
+        s2 = (s2 + s1) % 255
+    assert fletcher16(data) == (s2 << 8) | s1
+
+
+def test_frame_round_trip():
+    dec = StreamDecoder()
+    assert dec.feed(pack_samples(SAMPLES)) == [SAMPLES]
+    assert dec.frames == 1 and dec.bad_frames == 0
+
+
+def test_frames_and_lines_split_at_every_byte():
+    stream = b"EV:IDLE\n" + pack_samples(SAMPLES) + b"PW:abc\n" + pack_samples(SAMPLES[:1])
+    dec = StreamDecoder()
+    out = []
+    for i in range(len(stream)):
+        out.extend(dec.feed(stream[i:i + 1]))
+    assert out == ["EV:IDLE", SAMPLES, "PW:abc", SAMPLES[:1]]
+
+
+def test_corrupt_frame_is_skipped_whole():
+    frame = bytearray(pack_samples(SAMPLES))
+    frame[8] ^= 0x01
+    dec = StreamDecoder()
+    assert dec.feed(bytes(frame) + b"ST:GOOD\n") == ["ST:GOOD"]
+    assert dec.bad_frames == 1
+
+
+def test_oversized_length_resyncs():
+    dec = StreamDecoder()
+    junk = bytes([0xA5, 0x5A, 0x01, 0xFF, 0xFF])
+    assert dec.feed(junk + b"\nLN:12\n") == ["LN:12"]
+    assert dec.bad_frames == 1
+
+
+def test_invalid_utf8_line_counted():
+    dec = StreamDecoder()
+    assert dec.feed(b"\xff\xfe\nEV:GEN\n") == ["EV:GEN"]
+    assert dec.bad_lines == 1
+
+
+def test_tagged_lines_without_resequencer():
+    dec = StreamDecoder()
+    assert dec.feed(b"#7:PW:abc\n#8:ST:WEAK\n") == ["PW:abc", "ST:WEAK"]
+
+
+def test_tag_without_colon_is_rejected():
+    dec = StreamDecoder(Resequencer())
+    assert dec.feed(b"#123\n#0:EV:IDLE\n") == ["EV:IDLE"]
+    assert dec.bad_lines == 1
+
+
+def test_sequenced_frame():
+    payload = b"".join(struct.pack(SAMPLE_FMT, *s) for s in SAMPLES) + struct.pack("<H", 5)
+    dec = StreamDecoder(Resequencer())
+    assert dec.feed(pack_frame(FT_SEQ_SAMPLES, payload)) == [SAMPLES]
+
+
+def test_backwards_gap_report_is_rejected():
+    dec = StreamDecoder(Resequencer())
+    assert dec.feed(b"#0:EV:IDLE\nGP:10,5\n") == ["EV:IDLE"]
+    assert dec.bad_lines == 1
+
+
+def test_queue_sheds_oldest_telemetry():
+    q = RecordQueue(maxlen=4)
+    q.put_batch(["S:1", "S:2", "S:3"])
+    q.put_batch([SAMPLES, "S:4"])
+    assert list(q.drain()) == ["S:2", "S:3", SAMPLES, "S:4"]
+    assert q.dropped == 1 and q.dropped_samples == 1
+
+
+def test_queue_never_sheds_control_records():
+    q = RecordQueue(maxlen=3)
+    q.put_batch(["PW:abc", "S:1", "EV:GEN", SAMPLES])
+    q.put_batch(["ST:GOOD", "S:2"])
+    assert list(q.drain()) == ["PW:abc", "EV:GEN", "ST:GOOD"]
+    assert q.dropped == 3 and q.dropped_samples == 2 + len(SAMPLES)
+    q.put_batch(["EV:IDLE"] * 5)
+    assert len(q) == 5
+
+
+def test_queue_marks_the_batch_after_a_shed():
+    # D: lines are relative: the consumer resets its reconstructor on cut.
+    q = RecordQueue(maxlen=2)
+    q.put_batch(["S:0,0,0,0,0", "D:40,1,1,1,1", "D:40,1,1,1,1"])
+    assert list(q.drain()) == ["D:40,1,1,1,1", "D:40,1,1,1,1"] and q.cut
+    q.put_batch(["D:40,1,1,1,1"])
+    q.drain()
+    assert not q.cut
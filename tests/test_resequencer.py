@@ -0,0 +1,79 @@
+import pytest
+
+from Protocol import HOLD_S, MAX_GAP, SEQ_MOD, Resequencer
+
+
+def test_in_order():
+    r = Resequencer()
+    assert r.push(0, "a", now=0) == ["a"]
+    assert r.push(1, "b", now=0) == ["b"]
+    assert r.received == 2 and r.lost == 0
+
+
+def test_gap_is_held_and_requested_until_filled():
+    r = Resequencer()
+    r.push(0, "a", now=0)
+    assert r.push(3, "d", now=0) == []
+    assert r.take_requests() == [(1, 2)]
+    assert r.take_requests() == []
+    assert r.push(2, "c", now=0.1) == []
+    assert r.push(1, "b", now=0.1) == ["b", "c", "d"]
+    assert r.recovered == 2 and r.lost == 0 and r.gaps == 1
+
+
+def test_gap_expires_as_lost():
+    r = Resequencer()
+    r.push(0, "a", now=0)
+    r.push(2, "c", now=0)
+    assert r.expire(now=HOLD_S / 2) == []
+    assert r.expire(now=HOLD_S + 0.01) == ["c"]
+    assert r.lost == 1
+    assert r.loss_rate == pytest.approx(1 / 3)
+
+
+def test_gone_releases_at_once():
+    r = Resequencer()
+    r.push(0, "a", now=0)
+    r.push(3, "d", now=0)
+    assert r.gone(1, 2) == ["d"]
+    assert r.lost == 2
+
+
+def test_gone_rejects_backwards_range():
+    r = Resequencer()
+    r.push(0, "a", now=0)
+    r.push(3, "d", now=0)
+    with pytest.raises(ValueError):
+        r.gone(2, 1)
+    assert r.lost == 0
+
+
+def test_duplicates():
+    r = Resequencer()
+    r.push(0, "a", now=0)
+    assert r.push(0, "a", now=0) == []
+    r.push(2, "c", now=0)
+    assert r.push(2, "c", now=0) == []
+    assert r.duplicates == 2
+
+
+def test_wraps_around():
+    r = Resequencer()
+    assert r.push(SEQ_MOD - 1, "a", now=0) == ["a"]
+    assert r.push(0, "b", now=0) == ["b"]
+    assert r.gaps == 0
+
+
+def test_jump_past_max_gap_is_followed():
+    r = Resequencer()
+    r.push(0, "a", now=0)
+    assert r.push(MAX_GAP + 10, "z", now=0) == ["z"]
+    assert r.lost == MAX_GAP + 9
+    assert r.take_requests() == []
+
+
+def test_restart_backwards_is_followed():
+    r = Resequencer()
+    r.push(5000, "a", now=0)
+    assert r.push(0, "b", now=0) == ["b"]
+    assert r.lost == 0
@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+import Strength
+from Entropy import ALLSET
+from conftest import firmware_defs
+
+MB = firmware_defs("LOWER", "UPPER", "DIGIT", "SYMBOL", "strength_label", "WORD_BITS", "phrase_label")
+
+
+def cases():
+    rng = random.Random(7)
+    pools = (ALLSET, "abc", "abcDEF", "abc123", "ABC!?", "aB3 ~\t`'\"\\|<>", ALLSET + " ~")
+    out = ["", "a", "aA1!", "aaaaaaaaaaaaaa", "aA1!aA1!aA1!aA", "aA1!aA1!aA1!a"]
+    for _ in range(3000):
+        pool = rng.choice(pools)
+        out.append("".join(rng.choice(pool) for _ in range(rng.randint(1, 24))))
+    return out
+
+
+def test_label_matches_firmware():
+    for pw in cases():
+        assert Strength.label(pw) == MB["strength_label"](pw), pw
+
+
+def test_batch_matches_single():
+    pws = cases()
+    labels, bits = Strength.strength_batch(pws)
+    assert labels == [Strength.label(pw) for pw in pws]
+    assert bits == pytest.approx([Strength.strength(pw)[1] for pw in pws])
+
+
+@pytest.mark.parametrize("words", range(1, 11))
+def test_phrase_label_matches_firmware(words):
+    phrase = "-".join(["word"] * words)
+    label, bits = Strength.phrase_strength(phrase, 1 << MB["WORD_BITS"])
+    assert bits == words * MB["WORD_BITS"]
+    assert label == MB["phrase_label"](words)
+
+
+def test_thresholds():
+    assert Strength.label("aA1!aA1!aA1!aA") == "STRONG"
+    assert Strength.label("aA1aA1aA1aA1") == "GOOD"
+    assert Strength.label("aaaaa11111") == "FAIR"
+    assert Strength.label("aaaaaaaaaaaaaaaaaaaa") == "WEAK"
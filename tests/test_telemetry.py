@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+import Telemetry
+from Telemetry import decimate
+
+
+def series(n, seed=4):
+    rng = random.Random(seed)
+    t = [i * 20 for i in range(n)]
+    return t, {"ax": [rng.randint(-2048, 2047) for _ in range(n)],
+               "mag": [rng.uniform(0, 3000) for _ in range(n)]}
+
+
+def pairs_in_time_order(t, y, xs, ys):
+    # Each bucket's pair is (first extreme, second extreme) by sample order.
+    for k in range(0, len(xs), 2):
+        idx = [i for i, v in enumerate(t) if v >= xs[k] and (k + 2 >= len(xs) or v < xs[k + 2])]
+        vals = [y[i] for i in idx]
+        lo, hi = min(vals), max(vals)
+        first = lo if vals.index(lo) <= vals.index(hi) else hi
+        assert (ys[k], ys[k + 1]) == (first, hi if first == lo else lo)
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+def test_pairs_follow_time(monkeypatch, numpy):
+    if numpy and not Telemetry.HAS_NUMPY:
+        pytest.skip("NumPy not installed")
+    monkeypatch.setattr(Telemetry, "HAS_NUMPY", numpy)
+    t, cols = series(1000)
+    xs, ys = decimate(t, cols, t[0], t[-1] + 1, 50)
+    assert len(xs) == 100
+    for name in cols:
+        pairs_in_time_order(t, cols[name], list(xs), list(ys[name]))
+
+
+def test_falling_bucket_draws_max_first():
+    t = list(range(8))
+    xs, ys = decimate(t, {"ax": [0, 9, 1, 2, 8, 7, 6, -5]}, 0, 8, 2)
+    assert list(xs) == [0, 0, 4, 4]
+    assert list(ys["ax"]) == [0, 9, 8, -5]
+
+
+def test_short_series_is_not_reduced():
+    t, cols = series(10)
+    xs, ys = decimate(t, cols, t[0], t[-1], 50)
+    assert xs is t and ys is cols
@@ -0,0 +1,70 @@
+import math
+
+import pytest
+
+from Wordlist import (DEVICE_LIST, DEVICE_WORDS, HOST_LIST, HEADER, Wordlist, clean_words,
+                      device_subset, load_words, pack)
+
+WORDS = ["pear", "fig", "apple", "kiwi", "plum", "banana", "yam"]
+
+
+def test_pack_round_trip_sorted_by_length():
+    wl = Wordlist.from_words(WORDS)
+    assert len(wl) == len(WORDS)
+    assert wl.words() == sorted(WORDS, key=lambda w: (len(w), w))
+    assert wl[0] == "fig" and wl[-1] == "banana"
+    assert wl.lens == [3, 4, 5, 6]
+
+
+def test_index_out_of_range():
+    wl = Wordlist.from_words(WORDS)
+    with pytest.raises(IndexError):
+        wl[len(WORDS)]
+
+
+def test_memory_mapped_file(tmp_path):
+    path = tmp_path / "fruit.mbwl"
+    path.write_bytes(pack(WORDS))
+    wl = Wordlist(str(path))
+    try:
+        assert wl.words() == Wordlist.from_words(WORDS).words()
+        assert wl.bits == pytest.approx(math.log2(len(WORDS)))
+    finally:
+        wl.close()
+
+
+def test_truncated_and_foreign_files_rejected(tmp_path):
+    data = pack(WORDS)
+    short = tmp_path / "short.mbwl"
+    short.write_bytes(data[:-1])
+    with pytest.raises(ValueError):
+        Wordlist(str(short))
+    other = tmp_path / "other.mbwl"
+    other.write_bytes(b"XXXX" + data[4:])
+    with pytest.raises(ValueError):
+        Wordlist(str(other))
+
+
+def test_clean_words_diceware_and_duplicates():
+    lines = ["11111\tabacus\n", "11112 Abdomen\n", "\n", "11113 ab-cd\n", "abacus\n", "café\n"]
+    assert clean_words(lines) == ["abacus", "abdomen"]
+
+
+def test_header_counts_words():
+    data = pack(WORDS)
+    assert HEADER.unpack_from(data, 0)[3] == len(WORDS)
+
+
+def test_device_subset_is_eleven_bits():
+    words = load_words(HOST_LIST)
+    sub = device_subset(words)
+    assert len(sub) == len(set(sub)) == DEVICE_WORDS == 1 << 11
+    assert set(sub) <= set(words)
+    with pytest.raises(ValueError):
+        device_subset(WORDS)
+
+
+def test_device_file_is_current():
+    # phrase.mbwl is what `python Wordlist.py firmware` writes.
+    with open(DEVICE_LIST, "rb") as f:
+        assert f.read() == pack(device_subset(load_words(HOST_LIST)))